@@ -10,8 +10,9 @@ CCDOps software in "planet" imaging mode.
 '''
 
 # Import #######################################################################################
-from astropy.io import fits
+import os
 from fileAndArrayHandling import fileAndArrayHandling
+from fitsHeaderIndex import fitsHeaderIndex
 ################################################################################################
 
 class CCDOpsPlanetMode(object):
@@ -31,36 +32,42 @@ class CCDOpsPlanetMode(object):
         
         XPIXSZ Floating Point - Pixel width in microns (after binning)
         YPIXSZ Floating Point - Pixel height in microns (after binning)
+        
+        Headers are served from the fitsHeaderIndex, so repeated calls for the
+        same directory do not reopen the FITS files.
         '''
         ###########################################################################
         ###planetModeBool == True Indicates Subframe
         ###########################################################################
         faah = fileAndArrayHandling()
-        #image sizes check and warning
-        for ii in range(imageArray4D.shape[0]):
-            if imageArray4D[ii].shape != imageArray4D[ii-1].shape:
+        headers = fitsHeaderIndex().directory(filelist)
+        headerList = [headers[os.path.abspath(fileName)] for fileName in filelist]
+        
+        #image sizes check and warning (NAXIS1/NAXIS2 from the headers, no image data is decoded)
+        for ii in range(len(headerList)):
+            if (headerList[ii]['NAXIS1'], headerList[ii]['NAXIS2']) != (headerList[ii-1]['NAXIS1'], headerList[ii-1]['NAXIS2']):
                 faah.pageLogging(consoleLog, logFile, 
                     "Image " + str(filelist[ii]) + " is not the same dimensions as the other images."
                     + ' are you sure that all images in the directory were taken in planet mode?'
                     + 'Not having all images be the same dimension WILL provoke centroid inaccuracies.')
                 
         #Read header of first image
-        hdul = fits.open(filelist[0])
+        header = headerList[0]
             
         #Find X and Y bin sizes
-        xBin = hdul[0].header['XBINNING']
-        yBin = hdul[0].header['YBINNING']
+        xBin = header['XBINNING']
+        yBin = header['YBINNING']
             
         #Find X and Y offsets
-        xOffset = hdul[0].header['XORGSUBF']
-        yOffset = hdul[0].header['YORGSUBF']
+        xOffset = header['XORGSUBF']
+        yOffset = header['YORGSUBF']
             
         #Convert from units of "bins" to pixels
         xOffset = int(xOffset)/int(xBin)
         yOffset = int(yOffset)/int(yBin)
         
         #Find pixel size (um)
-        pixelSize = hdul[0].header['XPIXSZ']
+        pixelSize = header['XPIXSZ']
             
         #log offsets
         if calibration == True:
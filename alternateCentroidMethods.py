@@ -48,6 +48,17 @@ def findPeak(image,x,y,radius=2):
 #   yWid (float): y-axis half width of the subimage in pixels
 #   axis (string): axis to centroid along, 'x', 'y', or 'both'
 #                  default: both
+#   fitter (string): marginal sum Gaussian fitter, one of
+#                    'fast' - fitSkyGauss(), analytic Jacobian and
+#                             moment starting values (default)
+#                    'closedForm' - fitSkyGauss() log-parabola closed
+#                             form, for high-SNR data only
+#                    'curve_fit' - scipy.optimize.curve_fit()
+#                    'fast' and 'closedForm' fall back to curve_fit()
+#                    if their fit fails
+#   bkg (float): background level, e.g. from backgroundEstimator
+#                (default: median of the subimage, only computed
+#                if curve_fit() is used)
 #   verbose (bool): print verbose output
 #
 # raises exceptions if garbage
@@ -58,8 +69,10 @@ def findPeak(image,x,y,radius=2):
 #
 
 
-def gmsCentroid(image,x,y,xWid,yWid,axis='both',verbose=False):
+def gmsCentroid(image,x,y,xWid,yWid,axis='both',fitter='fast',bkg=None,verbose=False):
     ny,nx = image.shape
+    if fitter not in ('fast','closedForm','curve_fit'):
+        raise Exception("Invalid fitter '%s' - must be one of {fast,closedForm,curve_fit}" % (fitter))
     if axis.lower() == 'both':
         doXaxis = True
         doYaxis = True
@@ -82,42 +95,62 @@ def gmsCentroid(image,x,y,xWid,yWid,axis='both',verbose=False):
     xmax = int(min(nx,x+xWid))
     ymin = int(max( 0,y-yWid))
     ymax = int(min(ny,y+yWid))
-    boxImg = np.array(image[ymin:ymax,xmin:xmax]) # cut out the sub image
+    boxImg = image[ymin:ymax,xmin:xmax] # sub image (a view, not converted)
 
     # Form the marginal sums along the working axis
 
     if doXaxis:
-        xMS  = boxImg.mean(axis=0)  # X marginal sum
+        xMS  = boxImg.mean(axis=0,dtype=np.float64)  # X marginal sum
         xPix = xmin+np.arange(len(xMS))
 
     if doYaxis:
-        yMS  = boxImg.mean(axis=1)  # Y marginal sum
+        yMS  = boxImg.mean(axis=1,dtype=np.float64)  # Y marginal sum
         yPix = ymin+np.arange(len(yMS))
 
-    # Guesses of the Gaussian fit parameters common to both axes
+    # Fast fits of the marginal sums (both axes in one call when the
+    # box is square), falling back to curve_fit() if they fail
+
+    gotX = False
+    gotY = False
+    if fitter != 'curve_fit':
+        closedForm = (fitter == 'closedForm')
+        if doXaxis and doYaxis and len(xMS) == len(yMS):
+            coeff,var,ok = fitSkyGauss(np.vstack((xPix,yPix)),np.vstack((xMS,yMS)),closedForm=closedForm)
+            xCoeff,varX,gotX = coeff[0],var[0],ok[0]
+            yCoeff,varY,gotY = coeff[1],var[1],ok[1]
+        else:
+            if doXaxis:
+                xCoeff,varX,gotX = fitSkyGauss(xPix,xMS,closedForm=closedForm)
+            if doYaxis:
+                yCoeff,varY,gotY = fitSkyGauss(yPix,yMS,closedForm=closedForm)
+
+    # Guesses of the curve_fit() parameters common to both axes
 
-    bkg0 = np.median(boxImg)
-    s0 = 1.0
+    if (doXaxis and not gotX) or (doYaxis and not gotY):
+        bkg0 = np.median(boxImg) if bkg is None else bkg
+        s0 = 1.0
 
     # Marginal sum Gaussian fits
     
     if doXaxis:
-        maxX = np.amax(xMS)
-        x0 = xPix[np.argwhere(xMS==maxX)][0]
-        a0 = maxX-bkg0
-        px=[bkg0,a0,x0,s0]
-        xCoeff,varX = curve_fit(skyGauss,xPix,xMS,p0=px)
+        if not gotX:
+            maxX = np.amax(xMS)
+            x0 = xPix[np.argwhere(xMS==maxX)[0][0]]
+            a0 = maxX-bkg0
+            px=[bkg0,a0,x0,s0]
+            xCoeff,varX = curve_fit(skyGauss,xPix,xMS,p0=px)
         xFit = skyGauss(xPix,*xCoeff)
         xCen = xCoeff[2]
         xErr = math.sqrt(varX[2,2])
         xBkg = xCoeff[0]
 
     if doYaxis:
-        maxY = np.amax(yMS)
-        y0 = yPix[np.argwhere(yMS==maxY)][0]
-        a0 = maxY-bkg0
-        py=[bkg0,a0,y0,s0]
-        yCoeff,varY = curve_fit(skyGauss,yPix,yMS,p0=py)
+        if not gotY:
+            maxY = np.amax(yMS)
+            y0 = yPix[np.argwhere(yMS==maxY)[0][0]]
+            a0 = maxY-bkg0
+            py=[bkg0,a0,y0,s0]
+            yCoeff,varY = curve_fit(skyGauss,yPix,yMS,p0=py)
         yFit = skyGauss(yPix,*yCoeff)
         yCen = yCoeff[2]
         yErr = math.sqrt(varY[2,2])
@@ -153,6 +186,153 @@ def gmsCentroid(image,x,y,xWid,yWid,axis='both',verbose=False):
     elif doYaxis and not doXaxis:
         return yCen,yErr
 
+#----------------------------------------------------------------
+#
+# gmsCentroidBatch() - GMS centroids for many frames or objects
+#
+# Batch version of gmsCentroid().  The marginal sums of every box
+# are formed in one numpy reduction and all X and Y marginal sums
+# are fitted together by fitSkyGauss(), so a whole focus sweep is
+# centroided in about the time of a few gmsCentroid() calls.
+#
+# Every box is 2*xWid x 2*yWid pixels; a box that would run off
+# the image is shifted back inside it, or with truncate=True it is
+# centroided on its own by gmsCentroid(), which truncates it at the
+# image edge (the same result as gmsCentroid() for every box).  Any
+# fit that fitSkyGauss() can not do is redone with
+# gmsCentroid(fitter='curve_fit'), and set to NaN if that fails.
+#
+# arguments:
+#   images - 3D stack (one object per frame), or 2D image (many
+#            objects in one frame).  Any stack indexed by frame
+#            works (fitsImageStack, raggedImageStack); stacks with
+#            a section() method only have the boxes read.
+#   x (float or array): x pixel coordinates of the box centers
+#   y (float or array): y pixel coordinates of the box centers
+#   xWid (float): x-axis half width of the boxes in pixels
+#   yWid (float): y-axis half width of the boxes in pixels
+#   fitter (string): 'fast' or 'closedForm' (see gmsCentroid)
+#   truncate (bool): truncate boxes at the image edge like
+#                    gmsCentroid() instead of shifting them
+#                    (default: False)
+#   bkg (float or array): background level of the image (2D) or of
+#                         each frame (3D), e.g. from backgroundEstimator,
+#                         passed to the curve_fit() fallback
+#                         (default: median of each box)
+#   verbose (bool): print fits that needed curve_fit()
+#
+# returns: xCen, yCen, xErr, yErr, arrays with one value per
+#          frame (3D stack) or per x,y position (2D image)
+#
+
+def gmsCentroidBatch(images,x,y,xWid,yWid,fitter='fast',truncate=False,bkg=None,verbose=False):
+    if fitter not in ('fast','closedForm'):
+        raise Exception("Invalid fitter '%s' - must be one of {fast,closedForm}" % (fitter))
+    xPix,xMS,yPix,yMS,frames = marginalSumsBatch(images,x,y,xWid,yWid)
+    nfit = len(frames)
+    closedForm = (fitter == 'closedForm')
+
+    # Fit all X and Y marginal sums together
+
+    if xMS.shape[1] == yMS.shape[1]:
+        coeff,cov,ok = fitSkyGauss(np.vstack((xPix,yPix)),np.vstack((xMS,yMS)),closedForm=closedForm)
+        xCoeff,xCov,xOK = coeff[:nfit],cov[:nfit],ok[:nfit]
+        yCoeff,yCov,yOK = coeff[nfit:],cov[nfit:],ok[nfit:]
+    else:
+        xCoeff,xCov,xOK = fitSkyGauss(xPix,xMS,closedForm=closedForm)
+        yCoeff,yCov,yOK = fitSkyGauss(yPix,yMS,closedForm=closedForm)
+
+    xCen = xCoeff[:,2].copy()
+    yCen = yCoeff[:,2].copy()
+    xErr = np.sqrt(xCov[:,2,2])
+    yErr = np.sqrt(yCov[:,2,2])
+
+    # Redo failed fits one at a time with curve_fit(), and with
+    # truncate=True the boxes that were shifted inside the image
+
+    x = np.broadcast_to(np.asarray(x,dtype=np.float64),(nfit,))
+    y = np.broadcast_to(np.asarray(y,dtype=np.float64),(nfit,))
+    redo = ~(xOK & yOK)
+    if truncate:
+        shifted = ((xPix[:,0] != (x-xWid).astype(int)) | (yPix[:,0] != (y-yWid).astype(int)) |
+                   (xPix.shape[1] != 2*int(xWid)) | (yPix.shape[1] != 2*int(yWid)))
+        redo = redo | shifted
+    else:
+        shifted = np.zeros(nfit,dtype=bool)
+    oneImage = isinstance(images,np.ndarray) and images.ndim == 2
+    for i in np.flatnonzero(redo):
+        redoFitter = fitter if shifted[i] else 'curve_fit'
+        if verbose:
+            print("  gmsCentroidBatch: fit %d redone with gmsCentroid(fitter='%s')" % (i,redoFitter))
+        image = images if oneImage else np.asarray(images[frames[i]])
+        bkgI = None if bkg is None else np.broadcast_to(bkg,(frames.max()+1,))[frames[i]]
+        try:
+            xCen[i],yCen[i],xErr[i],yErr[i] = gmsCentroid(image,x[i],y[i],xWid,yWid,fitter=redoFitter,bkg=bkgI)
+        except Exception:
+            xCen[i],yCen[i],xErr[i],yErr[i] = np.nan,np.nan,np.nan,np.nan
+
+    return xCen,yCen,xErr,yErr
+
+#----------------------------------------------------------------
+#
+# marginalSumsBatch() - X and Y marginal sums of many boxes
+#
+# Cuts a 2*xWid x 2*yWid box around each x,y (shifted to lie inside
+# the image) and returns the marginal sums of all of them, formed
+# in one reduction over a (nbox,ny,nx) array of boxes.
+#
+# returns: xPix, xMS, yPix, yMS, frames
+#    xPix,xMS = x pixel coordinates and X marginal sums (nbox,nx)
+#    yPix,yMS = y pixel coordinates and Y marginal sums (nbox,ny)
+#    frames = frame index of each box (all 0 for a 2D image)
+#
+
+def marginalSumsBatch(images,x,y,xWid,yWid):
+    if isinstance(images,np.ndarray) and images.ndim == 2:
+        images = images[None]
+        nbox = np.broadcast(np.asarray(x),np.asarray(y)).size
+        frames = np.zeros(nbox,dtype=int)
+    else:
+        frames = np.arange(len(images))
+        nbox = len(frames)
+    x = np.broadcast_to(np.asarray(x,dtype=np.float64),(nbox,))
+    y = np.broadcast_to(np.asarray(y,dtype=np.float64),(nbox,))
+
+    # Frame sizes (a ragged stack can have a different size per frame)
+
+    if isinstance(images,np.ndarray):
+        shapes = np.broadcast_to(np.array(images.shape[1:]),(nbox,2))
+    elif hasattr(images,'frameShape'):
+        shapes = np.array([images.frameShape(i) for i in frames])
+    else:
+        shapes = np.array([np.shape(images[i]) for i in frames])
+
+    # Boxes of one size, shifted inside each frame
+
+    nx = int(min(2*int(xWid),shapes[:,1].min()))
+    ny = int(min(2*int(yWid),shapes[:,0].min()))
+    xmin = np.clip((x-xWid).astype(int),0,shapes[:,1]-nx)
+    ymin = np.clip((y-yWid).astype(int),0,shapes[:,0]-ny)
+
+    if isinstance(images,np.ndarray):
+        rows = ymin[:,None]+np.arange(ny)
+        cols = xmin[:,None]+np.arange(nx)
+        boxes = images[frames[:,None,None],rows[:,:,None],cols[:,None,:]]
+    elif hasattr(images,'section'):
+        boxes = np.array([images.section(frames[i],slice(ymin[i],ymin[i]+ny),slice(xmin[i],xmin[i]+nx))
+                          for i in range(nbox)])
+    else:
+        boxes = np.array([np.asarray(images[frames[i]])[ymin[i]:ymin[i]+ny,xmin[i]:xmin[i]+nx]
+                          for i in range(nbox)])
+
+    # Marginal sums of every box (boxes stay in the image type, sums in float64)
+
+    xMS = boxes.mean(axis=1,dtype=np.float64)
+    yMS = boxes.mean(axis=2,dtype=np.float64)
+    xPix = xmin[:,None]+np.arange(nx)
+    yPix = ymin[:,None]+np.arange(ny)
+    return xPix,xMS,yPix,yMS,frames
+
 #---------------------------------------------------------------------------
 #
 # smsBisector() - Sobel Marginal Sum (SMS) Bisector Method
@@ -169,6 +349,8 @@ def gmsCentroid(image,x,y,xWid,yWid,axis='both',verbose=False):
 #                  default: both
 #   clipStars (bool): clip stars within the box (default: False)
 #   wfac (float): width factor for inner/outer box for clipping (default: 1)
+#   bkg (float): background level used for star clipping, e.g. from
+#                backgroundEstimator (default: median of the inner box)
 #   verbose (bool): print verbose output
 #
 # raises exceptions if garbage
@@ -184,7 +366,7 @@ def gmsCentroid(image,x,y,xWid,yWid,axis='both',verbose=False):
 #
 
 
-def smsBisector(image,x,y,xWid,yWid,axis='both',clipStars=False,wfac=1,verbose=False):
+def smsBisector(image,x,y,xWid,yWid,axis='both',clipStars=False,wfac=1,bkg=None,verbose=False):
     ny,nx = image.shape
     if axis.lower() == 'both':
         doXaxis = True
@@ -225,7 +407,7 @@ def smsBisector(image,x,y,xWid,yWid,axis='both',clipStars=False,wfac=1,verbose=F
         y2=int(y+yhw) 
         x1=int(x-xhw) 
         x2=int(x+xhw)
-        bkgMed = np.median(image[y1:y2,x1:x2])
+        bkgMed = np.median(image[y1:y2,x1:x2]) if bkg is None else bkg
         bkgSig = math.sqrt(bkgMed)
         thresh = bkgMed + 2*bkgSig
         if np.any(subImg>thresh):
@@ -361,15 +543,227 @@ def skyGauss(x,*p):
     b,a,m,s=p
     return b + a*np.exp(-(x-m)**2/(2*s**2))
 
+#----------------------------------------------------------------
+#
+# fitSkyGauss() - fast least-squares fit of skyGauss()
+#
+# Levenberg-Marquardt fit using the analytic skyGauss Jacobian,
+# started from moments of the profile: median background, peak
+# height, first moment (center) and second moment (sigma) of the
+# samples above half maximum around the peak.  These starting
+# values are usually within a few percent of the answer, so only
+# a handful of iterations are needed.  All profiles of a batch are
+# fitted together (one numpy operation per iteration), so the same
+# code fits one marginal sum or many.
+#
+# arguments:
+#   xx - pixel coordinates, shape (npts,) or (nfit,npts)
+#   yy - profiles to fit, shape (npts,) or (nfit,npts)
+#   maxiter (int): maximum number of iterations (default: 20)
+#   tol (float): converged when the center and sigma steps are
+#                smaller than tol pixels (default: 1e-4)
+#   closedForm (bool): return the log-parabola closed form through
+#                      the peak and its two neighbours instead of
+#                      iterating; only good for high-SNR data
+#                      (default: False)
+#   p0 - optional starting [b,a,m,s] (e.g. the previous fit, for a
+#        warm start), shape (4,) or (nfit,4); replaces the moments
+#
+# returns: coeff, cov, ok
+#    coeff = [b,a,m,s], shape (4,) or (nfit,4)
+#    cov = covariance of coeff, shape (4,4) or (nfit,4,4), scaled
+#          by the reduced chi-square as curve_fit() does
+#    ok = True where the fit gave finite, usable values
+#
+
+def fitSkyGauss(xx,yy,maxiter=20,tol=1.0e-4,closedForm=False,p0=None):
+    yy = np.asarray(yy,dtype=np.float64)
+    single = (yy.ndim == 1)
+    yy = np.atleast_2d(yy)
+    xx = np.broadcast_to(np.asarray(xx,dtype=np.float64),yy.shape)
+    nfit,npts = yy.shape
+
+    # Starting values from moments, or the closed form
+
+    if p0 is None:
+        p = skyGaussMoments(xx,yy)
+    else:
+        p = np.array(np.broadcast_to(np.asarray(p0,dtype=np.float64),(nfit,4)))
+    if closedForm:
+        p = skyGaussLogParabola(xx,yy,p)
+    model,jac = skyGaussJacobian(xx,p)
+    resid = yy - model
+    chi2 = np.einsum('nk,nk->n',resid,resid)
+
+    # Levenberg-Marquardt iterations, all fits at once
+
+    if not closedForm:
+        lam = np.full(nfit,1.0e-3)
+        active = np.isfinite(chi2)
+        diag = np.arange(4)
+        for i in range(maxiter):
+            alpha = np.einsum('nki,nkj->nij',jac,jac)
+            alpha[:,diag,diag] *= (1.0+lam)[:,None]
+            step = solveBatch(alpha,np.einsum('nki,nk->ni',jac,resid))
+            pNew = p + step
+            pNew[:,3] = np.abs(pNew[:,3])
+            modelNew,jacNew = skyGaussJacobian(xx,pNew)
+            residNew = yy - modelNew
+            chi2New = np.einsum('nk,nk->n',residNew,residNew)
+            better = active & (chi2New <= chi2)
+            if better.all():
+                p,resid,jac,chi2 = pNew,residNew,jacNew,chi2New
+            else:
+                p = np.where(better[:,None],pNew,p)
+                resid = np.where(better[:,None],residNew,resid)
+                jac = np.where(better[:,None,None],jacNew,jac)
+                chi2 = np.where(better,chi2New,chi2)
+            lam = np.where(better,lam*0.1,lam*10.0)
+            active &= ~((better & (np.abs(step[:,2]) < tol) & (np.abs(step[:,3]) < tol)) | (lam > 1.0e10))
+            if not active.any():
+                break
+
+    # Covariance, scaled like curve_fit() (absolute_sigma=False)
+
+    alpha = np.einsum('nki,nkj->nij',jac,jac)
+    cov = invertBatch(alpha)*(chi2/max(npts-4,1))[:,None,None]
+    ok = (np.isfinite(p).all(axis=1) & np.isfinite(cov).all(axis=(1,2)) &
+          (cov[:,2,2] >= 0.0) & (p[:,3] > 0.0))
+
+    if single:
+        return p[0],cov[0],bool(ok[0])
+    return p,cov,ok
+
+#----------------------------------------------------------------
+#
+# skyGaussMoments() - skyGauss() starting values from moments
+#
+# b = median of the profile, a = peak above b, and m, s from the
+# first and second moments of the contiguous run of samples above
+# half maximum around the peak.  The second moment of a Gaussian
+# cut at half maximum is 0.3828*s^2, which is corrected for.
+#
+# returns [b,a,m,s] for each profile, shape (nfit,4)
+#
+
+def skyGaussMoments(xx,yy):
+    nfit,npts = yy.shape
+    idx = np.arange(npts)
+    b0 = np.median(yy,axis=1)
+    signal = yy - b0[:,None]
+    peak = np.argmax(signal,axis=1)
+    a0 = signal[np.arange(nfit),peak]
+
+    # contiguous run above half maximum around the peak
+    below = signal <= 0.5*a0[:,None]
+    left = np.where(below & (idx < peak[:,None]),idx,-1).max(axis=1)
+    right = np.where(below & (idx > peak[:,None]),idx,npts).min(axis=1)
+    inRun = (idx > left[:,None]) & (idx < right[:,None])
+
+    w = np.where(inRun,signal,0.0)
+    wSum = w.sum(axis=1)
+    m0 = (w*xx).sum(axis=1)/wSum
+    var = (w*(xx-m0[:,None])**2).sum(axis=1)/wSum
+    s0 = np.maximum(np.sqrt(var/0.3828),0.5)
+    return np.column_stack((b0,a0,m0,s0))
+
+#----------------------------------------------------------------
+#
+# skyGaussLogParabola() - closed form skyGauss() fit
+#
+# The log of a Gaussian is a parabola, so a parabola through
+# ln(y-b) at the peak sample and its two neighbours gives m, s and
+# a directly.  Profiles where that is not possible (peak on the
+# edge, a neighbour at or below the background, no curvature) keep
+# the starting values p0.
+#
+
+def skyGaussLogParabola(xx,yy,p0):
+    nfit,npts = yy.shape
+    rows = np.arange(nfit)
+    p = p0.copy()
+    signal = yy - p0[:,0:1]
+    peak = np.clip(np.argmax(signal,axis=1),1,npts-2)
+    sm,s0,sp = signal[rows,peak-1],signal[rows,peak],signal[rows,peak+1]
+    valid = (sm > 0) & (s0 > 0) & (sp > 0)
+    with np.errstate(divide='ignore',invalid='ignore'):
+        lm,l0,lp = np.log(sm),np.log(s0),np.log(sp)
+        curve = lm - 2.0*l0 + lp
+        valid &= (curve < 0)
+        h = xx[rows,peak+1] - xx[rows,peak]
+        shift = 0.5*(lm-lp)/curve
+        m = xx[rows,peak] + h*shift
+        s = h*np.sqrt(-1.0/curve)
+        a = np.exp(l0 - 0.25*(lm-lp)*shift)
+    p[valid,1] = a[valid]
+    p[valid,2] = m[valid]
+    p[valid,3] = s[valid]
+    return p
+
+#----------------------------------------------------------------
+#
+# skyGaussJacobian() - skyGauss() and its analytic derivatives
+#
+# Evaluates the model and its partial derivatives together, so the
+# exponential is only computed once per iteration.
+#
+# returns: model, shape (nfit,npts)
+#          d(skyGauss)/d[b,a,m,s], shape (nfit,npts,4)
+#
+
+def skyGaussJacobian(xx,p):
+    b,a,m,s = p[:,0:1],p[:,1:2],p[:,2:3],p[:,3:4]
+    dx = xx-m
+    g = np.exp(-dx**2/(2*s**2))
+    ag = a*g
+    jac = np.empty(g.shape+(4,))
+    jac[:,:,0] = 1.0
+    jac[:,:,1] = g
+    jac[:,:,2] = ag*dx/s**2
+    jac[:,:,3] = jac[:,:,2]*dx/s
+    return b+ag,jac
+
+#----------------------------------------------------------------
+#
+# solveBatch(), invertBatch() - stacks of small linear systems
+#
+# np.linalg.solve/inv on the whole stack, falling back to the
+# pseudo-inverse if any matrix of the stack is singular.
+#
+
+def solveBatch(a,b):
+    try:
+        return np.linalg.solve(a,b[:,:,None])[:,:,0]
+    except np.linalg.LinAlgError:
+        return np.einsum('nij,nj->ni',np.linalg.pinv(a),b)
+
+def invertBatch(a):
+    try:
+        return np.linalg.inv(a)
+    except np.linalg.LinAlgError:
+        return np.linalg.pinv(a)
+
 #----------------------------------------------------------------
 #
 # findCentroid() - iterative GMS method centroid fitting
 #
-# Uses gmsCentroid() and sets up an iterative centroid loop
-# to try to get the best centroid.  Convergence is change in 
-# centroid less than tol (computed as a radial offset between
-# the pre- and post-iteration measurements).  Wil iterate up
-# to maxiter times.
+# Iterative centroid loop that re-centers the GMS box on each new
+# centroid until the centroid stops moving.  Convergence is the
+# change in the fit parameters (centroid, as a radial offset, and
+# the Gaussian sigmas) being less than tol between iterations.
+# Will iterate up to maxiter times.
+#
+# Each iteration is cheap compared with calling gmsCentroid():
+#   - the marginal sums are updated incrementally by
+#     boxMarginalSums() when the box moves (only the rows and
+#     columns entering or leaving the box are summed),
+#   - the fit is warm started from the previous fit parameters
+#     (background included, so no median is computed),
+#   - if the re-centered box lands on the same pixels as the last
+#     one the fit would not change, so the loop stops there.
+# A fit fitSkyGauss() can not do is redone cold with
+# gmsCentroid(fitter='curve_fit'), given bkg (background level of
+# img, e.g. from backgroundEstimator) if it is set.
 #
 # Example of how to implement gmsCentroid().  Substitute a
 # suitable version of smsBisector() for centroiding flat-topped
@@ -377,44 +771,160 @@ def skyGauss(x,*p):
 #
 
 
-def findCentroid(img,x0,y0,cenRad,maxiter=5,tol=0.01,verbose=False):
-    # first iteration: use the guess provided
-    try:
-        xCen0,yCen0,xErr,yErr = gmsCentroid(img,x0,y0,cenRad,cenRad,axis='both')
-        gotStar = True
-    except Exception as err:
-        errStr = err
-        gotStar = False
+def findCentroid(img,x0,y0,cenRad,maxiter=5,tol=0.01,bkg=None,verbose=False):
+    ny,nx = img.shape
+    sums = {}
+    coeff = None
+    lastBox = None
+    xCen0 = x0
+    yCen0 = y0
 
-    if not gotStar:
-        raise Exception('initial centroid failed - %s' % (errStr))
+    for i in range(maxiter):
 
-    if verbose:
-        print("  iteration 1: X=%.3f+/-%.3f Y=%.3f+/-%.3f"  % (xCen0+1,yCen0+1,xErr,yErr))
+        # Box around the current centroid; unchanged box means converged
 
-    # Iterate until convergence or maxiter
+        xmin = int(max( 0,xCen0-cenRad))
+        xmax = int(min(nx,xCen0+cenRad))
+        ymin = int(max( 0,yCen0-cenRad))
+        ymax = int(min(ny,yCen0+cenRad))
+        box = (xmin,xmax,ymin,ymax)
+        if box == lastBox and coeff is not None:
+            return xCen0,yCen0,xErr,yErr
+        lastBox = box
 
-    for i in range(maxiter-1):
-        try:
-            xCen,yCen,xErr,yErr = gmsCentroid(img,xCen0,yCen0,cenRad,cenRad,axis='both')
-            gotStar = True
-        except:
-            gotStar = False
+        # Warm started fit of the incrementally updated marginal sums
+
+        xPix,xMS,yPix,yMS = boxMarginalSums(img,xmin,xmax,ymin,ymax,sums)
+        gotStar = False
+        if len(xMS) == len(yMS):
+            newCoeff,cov,ok = fitSkyGauss(np.vstack((xPix,yPix)),np.vstack((xMS,yMS)),p0=coeff)
+            gotStar = bool(ok.all())
+        if gotStar:
+            xCen,yCen = newCoeff[0,2],newCoeff[1,2]
+            xErr,yErr = math.sqrt(cov[0,2,2]),math.sqrt(cov[1,2,2])
+        else:
+            newCoeff = None
+            try:
+                xCen,yCen,xErr,yErr = gmsCentroid(img,xCen0,yCen0,cenRad,cenRad,axis='both',fitter='curve_fit',bkg=bkg)
+                gotStar = True
+            except Exception as err:
+                errStr = err
 
         if not gotStar:
+            if i == 0:
+                raise Exception('initial centroid failed - %s' % (errStr))
             raise Exception('Could not compute refined centroid')
 
+        # Parameter change since the last iteration
+
         dX = xCen - xCen0
         dY = yCen - yCen0
-        if verbose:
-            print("  iteration %d: X=%.3f+/-%.3f Y=%.3f+/-%.3f dX=%.3f dY=%.3f"  % (i+2,xCen+1,xErr,yCen+1,yErr,dX,dY))
         dR = math.sqrt(dX*dX+dY*dY)
-        if dR <= tol:
-            return xCen,yCen,xErr,yErr
+        if newCoeff is not None and coeff is not None:
+            dP = max(dR,np.abs(newCoeff[:,3]-coeff[:,3]).max())
         else:
-            xCen0 = xCen
-            yCen0 = yCen
+            dP = dR
+        if verbose:
+            if i == 0:
+                print("  iteration 1: X=%.3f+/-%.3f Y=%.3f+/-%.3f"  % (xCen+1,xErr,yCen+1,yErr))
+            else:
+                print("  iteration %d: X=%.3f+/-%.3f Y=%.3f+/-%.3f dX=%.3f dY=%.3f"  % (i+1,xCen+1,xErr,yCen+1,yErr,dX,dY))
+        if i > 0 and dP <= tol:
+            return xCen,yCen,xErr,yErr
+        xCen0 = xCen
+        yCen0 = yCen
+        coeff = newCoeff
     
     # no convergence, raise exception
 
     raise Exception('Did not converge within %.2f pix in %d iterations' % (tol,maxiter))
+
+#----------------------------------------------------------------
+#
+# boxMarginalSums() - marginal sums of a box, updated incrementally
+#
+# cache (a dict, empty on the first call) keeps the column and row
+# sums of the previous box.  When the box moves by less than its
+# size only the columns and rows that entered or left it are
+# summed, instead of copying and summing the whole box.
+#
+# returns: xPix, xMS, yPix, yMS (as in gmsCentroid)
+#
+
+def boxMarginalSums(image,xmin,xmax,ymin,ymax,cache):
+    old = cache.get('box')
+    if (old is None or old[1]-old[0] != xmax-xmin or old[3]-old[2] != ymax-ymin or
+        abs(xmin-old[0]) >= xmax-xmin or abs(ymin-old[2]) >= ymax-ymin):
+        colSums = image[ymin:ymax,xmin:xmax].sum(axis=0,dtype=np.float64)
+        rowSums = image[ymin:ymax,xmin:xmax].sum(axis=1,dtype=np.float64)
+    else:
+        oxmin,oxmax,oymin,oymax = old
+        colSums = cache['colSums']
+        rowSums = cache['rowSums']
+
+        # shift in x along the old rows
+        if xmin > oxmin:
+            leaving = image[oymin:oymax,oxmin:xmin]
+            entering = image[oymin:oymax,oxmax:xmax]
+            rowSums = rowSums - leaving.sum(axis=1,dtype=np.float64) + entering.sum(axis=1,dtype=np.float64)
+            colSums = np.concatenate((colSums[xmin-oxmin:],entering.sum(axis=0,dtype=np.float64)))
+        elif xmin < oxmin:
+            leaving = image[oymin:oymax,xmax:oxmax]
+            entering = image[oymin:oymax,xmin:oxmin]
+            rowSums = rowSums - leaving.sum(axis=1,dtype=np.float64) + entering.sum(axis=1,dtype=np.float64)
+            colSums = np.concatenate((entering.sum(axis=0,dtype=np.float64),colSums[:xmax-oxmin]))
+
+        # then in y along the new columns
+        if ymin > oymin:
+            leaving = image[oymin:ymin,xmin:xmax]
+            entering = image[oymax:ymax,xmin:xmax]
+            colSums = colSums - leaving.sum(axis=0,dtype=np.float64) + entering.sum(axis=0,dtype=np.float64)
+            rowSums = np.concatenate((rowSums[ymin-oymin:],entering.sum(axis=1,dtype=np.float64)))
+        elif ymin < oymin:
+            leaving = image[ymax:oymax,xmin:xmax]
+            entering = image[ymin:oymin,xmin:xmax]
+            colSums = colSums - leaving.sum(axis=0,dtype=np.float64) + entering.sum(axis=0,dtype=np.float64)
+            rowSums = np.concatenate((entering.sum(axis=1,dtype=np.float64),rowSums[:ymax-oymin]))
+
+    cache['box'] = (xmin,xmax,ymin,ymax)
+    cache['colSums'] = colSums
+    cache['rowSums'] = rowSums
+    xPix = xmin+np.arange(xmax-xmin)
+    yPix = ymin+np.arange(ymax-ymin)
+    return xPix,colSums/(ymax-ymin),yPix,rowSums/(xmax-xmin)
+
+#----------------------------------------------------------------
+#
+# benchmarkGMSCentroid() - gmsCentroid() latency for each fitter
+#
+# Centroids ntrials synthetic noisy Gaussian pinholes (random
+# sub-pixel positions, Poisson noise on a sky background) with
+# every gmsCentroid() fitter and prints the time per call and the
+# RMS centroid error against the true positions.
+#
+# returns: {fitter: (seconds per call, RMS error in pixels)}
+#
+
+def benchmarkGMSCentroid(ntrials=200,size=200,halfWidth=50,sigma=3.0,peak=2000.0,sky=1000.0,seed=0):
+    import time
+    rng = np.random.RandomState(seed)
+    yy,xx = np.mgrid[0:size,0:size]
+    images = []
+    truth = rng.uniform(size/2-5,size/2+5,size=(ntrials,2))
+    for xt,yt in truth:
+        model = sky + peak*np.exp(-((xx-xt)**2+(yy-yt)**2)/(2*sigma**2))
+        images.append(rng.poisson(model).astype(np.float64))
+
+    results = {}
+    for fitter in ('curve_fit','fast','closedForm'):
+        found = np.zeros((ntrials,2))
+        startTime = time.perf_counter()
+        for i in range(ntrials):
+            x0,y0 = np.round(truth[i])
+            xCen,yCen,xErr,yErr = gmsCentroid(images[i],x0,y0,halfWidth,halfWidth,fitter=fitter)
+            found[i] = xCen,yCen
+        perCall = (time.perf_counter()-startTime)/ntrials
+        rms = math.sqrt(np.mean(np.sum((found-truth)**2,axis=1)))
+        results[fitter] = (perCall,rms)
+        print("  %-10s %8.3f ms/call  RMS error %.4f pix" % (fitter,1000*perCall,rms))
+    return results
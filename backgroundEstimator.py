@@ -0,0 +1,195 @@
+'''
+@title backgroundEstimator
+@author: agent
+Updated on Oct 18, 2026
+Created on Oct 18, 2026
+
+backgroundEstimator
+This module holds the background (sky/floor) estimate shared by the centroid
+routines. 8 and 16-bit images (the SBIG/CCDOps frames) are reduced to a
+histogram with one np.bincount pass, from which the exact median and
+sigma-clipped statistics are read in linear time without sorting or copying
+the frame. Other images use a strided sample (every sampleStride-th row and
+column). Results are cached per frame, so every centroid method working on the
+same image reuses them.
+
+The cache is keyed on the array that owns the image memory (its base array) and
+on the position, shape and strides of the image in it, so a new view of the same
+pixels (e.g. stack[index] or a subarray taken again) reuses the results. The
+entries of a base array are dropped when it is deleted. An image that is modified
+in place must be passed to forget() before it is measured again.
+
+Modules:
+median
+    Median of an image (exact for 8/16-bit images).
+statistics
+    Sigma-clipped (median, mean, standard deviation) of an image.
+forget
+    Drop the cached results for an image (and every other view of its base array).
+'''
+
+# Import #######################################################################################
+import threading, weakref
+import numpy as np
+################################################################################################
+
+class backgroundEstimator(object):
+
+    #Sample every sampleStride-th row and column of images that are not 8/16-bit
+    sampleStride = 4
+
+    #Images smaller than this (pixels) are measured directly rather than sampled
+    smallImage = 65536
+
+    #Sigma clipping
+    clipSigma = 3.0
+    clipIterations = 10
+
+    #Results shared by every instance:
+    #{id(base array): (weak reference to base array, {view key: {result name: value}})}
+    _cache = {}
+    _lock = threading.RLock()
+
+    def __init__(self):
+        '''
+        Constructor
+        '''
+
+    def median(self, image):
+        '''
+        Median of image. Exact (the same as np.median) for 8 and 16-bit unsigned images
+        and for images smaller than smallImage; the median of a strided sample otherwise.
+        '''
+        return self._cached(image, 'median', self._median)
+
+    def statistics(self, image):
+        '''
+        Sigma-clipped statistics of image: pixels more than clipSigma standard deviations
+        from the median are rejected until nothing changes (or clipIterations).
+
+        Returns (median, mean, standard deviation) of the remaining pixels.
+        '''
+        return self._cached(image, 'statistics', self._statistics)
+
+    def forget(self, image):
+        '''
+        Drop the cached results for image (use after modifying it in place). The
+        results of every view of the same base array are dropped as well.
+        '''
+        if isinstance(image, np.ndarray):
+            with self._lock:
+                self._cache.pop(id(self._key(image)[0]), None)
+
+    def _key(self, image):
+        '''
+        Return (base array, view key) of image: the array that owns its memory, and
+        the data address, shape, strides and type of image inside it.
+        '''
+        base = image
+        while isinstance(base.base, np.ndarray):
+            base = base.base
+        return base, (image.__array_interface__['data'][0], image.shape, image.strides, image.dtype.str)
+
+    def _cached(self, image, name, function):
+        '''
+        Return function(image) from the cache, computing it on a miss.
+        '''
+        if not isinstance(image, np.ndarray):
+            #e.g. a list: nothing to key the cache on
+            return function(np.asarray(image))
+        base, viewKey = self._key(image)
+        key = id(base)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0]() is base and name in entry[1].get(viewKey, {}):
+                return entry[1][viewKey][name]
+        value = function(image)
+        try:
+            reference = weakref.ref(base, lambda _, key = key: self._cache.pop(key, None))
+        except TypeError:
+            #array can not be weakly referenced: do not cache
+            return value
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None or entry[0]() is not base:
+                entry = (reference, {})
+                self._cache[key] = entry
+            entry[1].setdefault(viewKey, {})[name] = value
+        return value
+
+    def _useHistogram(self, image):
+        return image.dtype.kind in 'ub' and image.dtype.itemsize <= 2
+
+    def _histogram(self, image):
+        '''
+        Pixel value histogram of an 8/16-bit image (counts[value]).
+        '''
+        return np.bincount(image.reshape(-1).view(np.uint8) if image.dtype.kind == 'b' else image.reshape(-1))
+
+    def _sample(self, image):
+        '''
+        Pixels used for images that are not 8/16-bit: all of a small image, otherwise
+        every sampleStride-th row and column.
+        '''
+        if image.size > self.smallImage and image.ndim == 2:
+            image = image[::self.sampleStride, ::self.sampleStride]
+        return np.asarray(image, dtype = np.float64).reshape(-1)
+
+    def _median(self, image):
+        if self._useHistogram(image):
+            return self._histogramMedian(np.cumsum(self._histogram(image)))
+        return float(np.median(self._sample(image)))
+
+    def _histogramMedian(self, cumulative, start = 0):
+        '''
+        Median from a cumulative histogram (np.median convention: mean of the two
+        middle values for an even number of pixels). start is the value of bin 0.
+        '''
+        count = cumulative[-1]
+        lower = np.searchsorted(cumulative, (count - 1)//2, side = 'right')
+        upper = np.searchsorted(cumulative, count//2, side = 'right')
+        return start + 0.5*(lower + upper)
+
+    def _statistics(self, image):
+        if self._useHistogram(image):
+            return self._histogramStatistics(self._histogram(image))
+        return self._sampleStatistics(self._sample(image))
+
+    def _histogramStatistics(self, counts):
+        '''
+        Sigma-clipped statistics computed on the histogram bins.
+        '''
+        values = np.arange(len(counts), dtype = np.float64)
+        lower, upper = 0, len(counts)
+        median = mean = std = np.nan
+        for _ in range(self.clipIterations):
+            binCounts = counts[lower:upper]
+            binValues = values[lower:upper]
+            count = binCounts.sum()
+            if count == 0:
+                break
+            mean = np.dot(binCounts, binValues)/count
+            std = np.sqrt(np.dot(binCounts, (binValues - mean)**2)/count)
+            median = self._histogramMedian(np.cumsum(binCounts), lower)
+            newLower = max(0, int(np.ceil(median - self.clipSigma*std)))
+            newUpper = min(len(counts), int(np.floor(median + self.clipSigma*std)) + 1)
+            if (newLower, newUpper) == (lower, upper) or newUpper <= newLower:
+                break
+            lower, upper = newLower, newUpper
+        return float(median), float(mean), float(std)
+
+    def _sampleStatistics(self, sample):
+        '''
+        Sigma-clipped statistics of a 1D sample.
+        '''
+        keep = np.isfinite(sample)
+        for _ in range(self.clipIterations):
+            kept = sample[keep]
+            median = np.median(kept)
+            mean = kept.mean()
+            std = kept.std()
+            newKeep = np.abs(sample - median) <= self.clipSigma*std
+            if std == 0 or np.array_equal(newKeep, keep):
+                break
+            keep = newKeep
+        return float(median), float(mean), float(std)
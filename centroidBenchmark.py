@@ -0,0 +1,170 @@
+'''
+@title centroidBenchmark
+@author: agent
+Updated on Oct 18, 2026
+Created on Oct 18, 2026
+
+centroidBenchmark
+This module measures the speed and accuracy of the registered centroid
+methods (centroidMethods) on synthetic images with known sub-pixel positions.
+Images are either a focused pinhole (2D Gaussian) or a defocused pinhole (an
+annulus: the pupil with its central obscuration, with soft edges), drawn with
+a sky background, Poisson and read noise, on-chip binning and saturation.
+Every method centroids the same set of images from the same seeds, and the
+wall time, throughput, RMS error, bias and failure rate of each are reported.
+
+Modules:
+syntheticImage
+    Draw one synthetic pinhole or annulus image (16-bit, like a CCDOps frame).
+syntheticStack
+    Draw a stack of synthetic images at random sub-pixel positions.
+run
+    Benchmark centroid methods on one synthetic scenario.
+runSuite
+    Benchmark centroid methods on a standard set of scenarios.
+'''
+
+# Import #######################################################################################
+import time
+import numpy as np
+from scipy.special import erf
+from centroidMethods import centroidMethods
+################################################################################################
+
+class centroidBenchmark(object):
+
+    #Default synthetic image settings (sizes in binned pixels, levels in counts)
+    imageSettings = {'shape': (200, 200),    #image rows, columns
+                     'profile': 'pinhole',   #'pinhole' or 'annulus'
+                     'sigma': 3.0,           #pinhole Gaussian sigma (unbinned pixels)
+                     'outerRadius': 20.0,    #annulus outer radius (unbinned pixels)
+                     'innerRadius': 8.0,     #annulus inner radius (unbinned pixels)
+                     'edgeWidth': 1.5,       #annulus edge softness (unbinned pixels)
+                     'peak': 3000.0,         #peak signal above background
+                     'background': 1000.0,   #sky/bias level
+                     'readNoise': 10.0,      #read noise
+                     'binning': 1,           #on-chip binning (1, 2, 3)
+                     'saturation': 65535}    #full well/ADC limit
+
+    #A centroid further than this from the truth counts as a failure (pixels)
+    failureDistance = 3.0
+
+    #Half width of the centroiding box (pixels)
+    halfWidth = 50
+
+    #Scenarios run by runSuite: {name: settings that differ from imageSettings}
+    suite = {'focused pinhole': {},
+             'faint pinhole': {'peak': 300.0},
+             'binned 2x2': {'binning': 2},
+             'saturated': {'peak': 80000.0},
+             'defocused annulus': {'profile': 'annulus'}}
+
+    def __init__(self):
+        '''
+        Constructor
+        '''
+
+    def syntheticImage(self, x, y, rng = None, **settings):
+        '''
+        Draw a synthetic 16-bit image with a pinhole (or annulus) centered at (x, y),
+        x = column, y = row in binned pixels. settings override imageSettings.
+        '''
+        settings = dict(self.imageSettings, **settings)
+        rng = np.random.RandomState() if rng is None else rng
+        binning = int(settings['binning'])
+        rows, columns = settings['shape']
+
+        ###########################################################################
+        ###Model on the unbinned pixel grid (pixel centers), then binned
+        ###########################################################################
+        rowGrid = (np.arange(rows*binning) + 0.5)/binning - 0.5
+        columnGrid = (np.arange(columns*binning) + 0.5)/binning - 0.5
+        radius = np.hypot(rowGrid[:, None] - y, columnGrid[None, :] - x)*binning
+        if settings['profile'] == 'pinhole':
+            model = np.exp(-radius**2/(2*settings['sigma']**2))
+        elif settings['profile'] == 'annulus':
+            edge = np.sqrt(2)*settings['edgeWidth']
+            model = 0.5*(erf((settings['outerRadius'] - radius)/edge) - erf((settings['innerRadius'] - radius)/edge))
+        else:
+            raise Exception("Unknown profile '" + str(settings['profile']) + "', must be 'pinhole' or 'annulus'.")
+        model = settings['peak']*model.reshape(rows, binning, columns, binning).sum(axis = (1, 3))
+
+        ###########################################################################
+        ###Noise and saturation
+        ###########################################################################
+        image = rng.poisson(model + settings['background']) + rng.normal(0, settings['readNoise'], model.shape)
+        return np.clip(np.round(image), 0, settings['saturation']).astype(np.uint16)
+
+    def syntheticStack(self, numberOfImages, seed = 0, **settings):
+        '''
+        Draw numberOfImages synthetic images with the pinhole at random sub-pixel
+        positions within 5 pixels of the image center.
+
+        Returns (stack, truth): 3D uint16 array and (N, 2) array of true (x, y).
+        '''
+        settings = dict(self.imageSettings, **settings)
+        rng = np.random.RandomState(seed)
+        rows, columns = settings['shape']
+        truth = np.column_stack((rng.uniform(columns/2 - 5, columns/2 + 5, numberOfImages),
+                                 rng.uniform(rows/2 - 5, rows/2 + 5, numberOfImages)))
+        stack = np.array([self.syntheticImage(x, y, rng, **settings) for x, y in truth])
+        return stack, truth
+
+    def run(self, methods = None, numberOfImages = 100, seed = 0, verbose = True, **settings):
+        '''
+        Centroid numberOfImages synthetic images with every method (default: every
+        registered centroidMethods method), seeded at the pixel nearest the truth.
+
+        Returns {method: {'seconds', 'perImage', 'throughput', 'rms', 'biasX', 'biasY',
+                          'failureRate'}}; times in seconds, throughput in images per
+        second, errors in pixels (rms and bias from the successful centroids only).
+        '''
+        if methods is None:
+            methods = sorted(centroidMethods.methods)
+        stack, truth = self.syntheticStack(numberOfImages, seed, **settings)
+        seeds = np.column_stack((np.round(truth[:, 1]), np.round(truth[:, 0])))
+        cM = centroidMethods()
+
+        results = {}
+        for method in methods:
+            #warm up (imports, first call allocations) outside the timing
+            cM.centroid(stack[:1], seeds[:1], self.halfWidth, method = method)
+            startTime = time.perf_counter()
+            centroids = cM.centroid(stack, seeds, self.halfWidth, method = method)
+            seconds = time.perf_counter() - startTime
+
+            errorX = centroids['x'] - truth[:, 0]
+            errorY = centroids['y'] - truth[:, 1]
+            distance = np.hypot(errorX, errorY)
+            good = (centroids['flag'] == 0) & np.isfinite(distance) & (distance <= self.failureDistance)
+            results[method] = {'seconds': seconds,
+                               'perImage': seconds/numberOfImages,
+                               'throughput': numberOfImages/seconds if seconds > 0 else np.inf,
+                               'rms': np.sqrt(np.mean(distance[good]**2)) if good.any() else np.nan,
+                               'biasX': np.mean(errorX[good]) if good.any() else np.nan,
+                               'biasY': np.mean(errorY[good]) if good.any() else np.nan,
+                               'failureRate': 1.0 - good.mean()}
+        if verbose:
+            self.printResults(results)
+        return results
+
+    def runSuite(self, methods = None, numberOfImages = 100, seed = 0):
+        '''
+        Run every scenario in suite. Returns {scenario: run results}.
+        '''
+        results = {}
+        for scenario, settings in self.suite.items():
+            print('\n' + scenario + ' (' + str(numberOfImages) + ' images)')
+            results[scenario] = self.run(methods, numberOfImages, seed, **settings)
+        return results
+
+    def printResults(self, results):
+        '''
+        Print run results as a table.
+        '''
+        print(format('method', '<14') + format('ms/image', '>10') + format('images/s', '>10') +
+              format('RMS pix', '>10') + format('bias x', '>10') + format('bias y', '>10') + format('failed', '>9'))
+        for method, result in results.items():
+            print(format(method, '<14') + format(1000*result['perImage'], '>10.3f') + format(result['throughput'], '>10.1f') +
+                  format(result['rms'], '>10.4f') + format(result['biasX'], '>10.4f') + format(result['biasY'], '>10.4f') +
+                  format(100*result['failureRate'], '>8.1f') + '%')
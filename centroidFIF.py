@@ -33,18 +33,44 @@ findCentroid
     centroid falls outside of the box, or if the computed derivatives
     are non-decreasing.   If the centroid cannot be computed, then a 
     xcen and ycen are set to -1 and a message is displayed.
+findCentroids
+    Batched (vectorized) version of findCentroid for N positions at once. Returns
+    arrays of centroids and reject flags.
 findFIFInImage
-    Find FIF in image using intensity.
+    Find FIF in image using intensity. By default the peak is found with a
+    GaussianBlur over the full frame; method = 'pyramid' finds it in a block
+    averaged copy of the image and refines it at full resolution in a small window.
+findFIFInStack
+    Find the FIF in every frame of a lazy fitsImageStack, reading only a
+    decimated copy of the first frame and a small section around the pinhole
+    from each remaining FITS file.
+benchmarkFIFLocator
+    Time the pyramid and full frame blur FIF locators on a synthetic frame, and
+    compare their peak locations on recorded frames.
+centroidStack
+    Centroid of the FIF in every frame of a focus sweep, fitted as one
+    batch, to follow the lateral shift of the pinhole through focus.
+findAllFIFsInImage
+    Detect every illuminated pinhole/spot in an image (robust background
+    threshold and connected components) and return a table of sources.
+centroidAllFIFs
+    Detect every source in an image and centroid them all in one batch.
 
 '''
 
 # Import #######################################################################################
+import time, sys
 import numpy as np
-np.set_printoptions(threshold=np.nan)
+np.set_printoptions(threshold=sys.maxsize)
 import cv2
+from scipy import ndimage
+from numpy.lib.stride_tricks import sliding_window_view
 from fileAndArrayHandling import fileAndArrayHandling
 from CCDOpsPlanetMode import CCDOpsPlanetMode
-from alternateCentroidMethods import gmsCentroid, smsBisector, findCentroid
+from backgroundEstimator import backgroundEstimator
+from fitsImageStack import fitsImageStack
+from imagePrecision import imagePrecision
+from centroidMethods import centroidMethods
 ################################################################################################
 
 class centroidFIF(object):
@@ -52,6 +78,40 @@ class centroidFIF(object):
     #Width of subimage for centroiding
     widthOfSubimage = 100 #pixels
     
+    #findFIFInImage peak search: 'blur' (full frame GaussianBlur) or 'pyramid' (block
+    #averaged search, refined at full resolution). Workflows opt in to 'pyramid'.
+    locatorMethod = 'blur'
+    pyramidBlockSize = 8 #pixels
+    
+    #Height of the findFIFInImage GaussianBlur kernel
+    blurKernelHeight = 31 #pixels
+    
+    #Methods compared by alternateCentroid (names registered in centroidMethods)
+    alternateCentroidMethods = ('gms', 'gmsIterative', 'daophot')
+    
+    #alternateCentroid options of each method: 'subArray' centroids fifSubArray (seeded
+    #at its center) instead of the full image, the rest are centroidMethods options
+    alternateCentroidOptions = {'daophot': {'subArray': True, 'extendbox': 3}}
+    centroidMethodLabels = {'gms': 'GMS', 'gmsIterative': 'Iterative GMS', 'daophot': 'IDL DAOPHOT', 'sms': 'SMS Bisector'}
+    
+    #findAllFIFsInImage detection threshold (robust standard deviations above the
+    #background) and smallest source kept
+    detectionSigma = 5.0
+    minSourcePixels = 4 #pixels
+    
+    #findAllFIFsInImage source table (rows and columns are full image pixels, stop is exclusive)
+    sourceType = np.dtype([('row', np.int64), ('column', np.int64), ('peak', np.float64), ('flux', np.float64),
+                           ('pixels', np.int64), ('rowStart', np.int64), ('rowStop', np.int64),
+                           ('columnStart', np.int64), ('columnStop', np.int64)])
+    
+    #findCentroids reject codes
+    rejectReasons = {1: 'Position %s too near edge of image',
+                     2: 'Position %s moved too near edge of image',
+                     3: 'Unable to compute X centroid around position %s',
+                     4: 'Computed X centroid for position %s out of range',
+                     5: 'Unable to compute Y centroid around position %s',
+                     6: 'Computed Y centroid for position %s out of range'}
+    
     def __init__(self):
         '''
         Constructor
@@ -72,151 +132,162 @@ class centroidFIF(object):
                        the number of pixels to enlarge the half-width of the box.
                        A list/array of [X,Y] coordinates defines a rectangle.
                        Default is 0; prior to June 2004, the default was extendbox = 3
+        
+        Returns xcen, ycen (scalars for a single position, arrays for vectors of x, y).
+        Positions that can not be centroided are returned as -1 (see findCentroids).
         ''' 
-
-        sz_image = np.shape(image)
-        xsize = sz_image[1]
-        ysize = sz_image[0]
-
+        xcen, ycen, _ = self.findCentroids(image, x, y, extendbox = extendbox)
+        if np.ndim(x) == 0:
+            return xcen[0], ycen[0]
+        return xcen, ycen
+    
+    def findCentroids(self, image, x, y, extendbox = False, verbose = True, background = None):
+        '''
+        Batched DAOPHOT derivative search centroid for N positions at once.
+        
+        Same algorithm as findCentroid, but every box is extracted with stride tricks
+        (one (N, box, box) array) and the weighted X/Y derivative sums for all N
+        positions are computed in one set of numpy operations.
+        
+        image  - 2D numpy array
+        x,y  -  scalars or arrays (column, row) giving approximate pin hole centers
+        extendbox - see findCentroid
+        verbose - print a message for each rejected position
+        background - median background of image, e.g. from centroidMethods.centroid
+                     (default: backgroundEstimator median of image)
+        
+        Returns xcen, ycen, reject (arrays of length N). Rejected positions have
+        xcen = ycen = -1 and reject set to one of the rejectReasons codes.
+        '''
+        image = np.asarray(image)
+        ysize, xsize = image.shape
+        x = np.atleast_1d(np.asarray(x, dtype = float))
+        y = np.atleast_1d(np.asarray(y, dtype = float))
+        npts = len(x)
+        
         ###########################################################################
         ###Find fwhm
         ###########################################################################
         maxi = np.amax(image)
-        floor = np.median(image.flatten())
+        floor = backgroundEstimator().median(image) if background is None else background
         height = maxi - floor
         if height == 0.0: # if object is saturated it could be that median value is 32767 or 65535 --> height=0
-            floor = np.mean(image.flatten())
+            floor = np.mean(image)
             height = maxi - floor
-        fwhm = np.sqrt(sum((image>floor+height/2.).flatten()))        
-
+        fwhm = np.sqrt(np.count_nonzero(image > floor+height/2.))
+        
         ###########################################################################
         ###Compute size of box needed to compute centroid
         ###########################################################################
-        if not extendbox: extendbox = 0
-        nhalf =  int(0.637*fwhm)  
-        if nhalf < 2: nhalf = 2
-        nbox = 2*nhalf+1             # Width of box to be used to compute centroid
         if not hasattr(extendbox,'__len__'):
+            if not extendbox: extendbox = 0
             Xextendbox,Yextendbox = extendbox,extendbox
-        elif hasattr(extendbox,'__len__'):
+        else:
             Xextendbox,Yextendbox = extendbox
+        nhalf =  int(0.637*fwhm)  
+        if nhalf < 2: nhalf = 2
+        nbox = 2*nhalf+1             # Width of box to be used to compute centroid
         nhalfbigx = nhalf + Xextendbox; nhalfbigy = nhalf + Yextendbox
-        nbigx = nbox + Xextendbox*2; nbigy = nbox + Yextendbox*2 #Extend box 3 pixels on each side to search for max pixel value
-
-        if isinstance(x,float) or isinstance(x,int): npts = 1
-        else: npts = len(x) 
-        if npts == 1: xcen = float(x) ; ycen = float(y)
-        else: xcen = x.astype(float) ; ycen = y.astype(float)
-        ix = np.round( x )          # Central X pixel
-        iy = np.round( y )          # Central Y pixel
-    
-        if npts == 1:
-            x, y, ix, iy, xcen, ycen = [x], [y], [ix], [iy], [xcen], [ycen]
-        for i in range(npts):        # Loop over X,Y vector
-            pos = str(x[i]) + ' ' + str(y[i])
-
-            if ((ix[i] < nhalfbigx) or ((ix[i] + nhalfbigx) > xsize-1) or
-                (iy[i] < nhalfbigy) or ((iy[i] + nhalfbigy) > ysize-1)):
-                xcen[i] = -1
-                ycen[i] = -1
-                print('Position '+ pos + ' too near edge of image')
-                continue
-            
-            bigbox = image[int(iy[i]-nhalfbigy) : int(iy[i]+nhalfbigy+1),
-                int(ix[i]-nhalfbigx) : int(ix[i]+nhalfbigx+1)]
-
-            # Locate maximum pixel in 'NBIG' sized subimage
-            goodrow = np.where(bigbox == bigbox)
-            mx = np.max( bigbox[goodrow])     #Maximum pixel value in BIGBOX
-            mx_pos = np.where(bigbox == mx) #How many pixels have maximum value?
-            Nmax = len(mx_pos[0])
-            idx = mx_pos[1] #% nbig          # X coordinate of Max pixel
-            idy = mx_pos[0] #/ nbig          # Y coordinate of Max pixel
-
-            if Nmax > 1:                 # More than 1 pixel at maximum?
-                idx = np.round(np.sum(idx)/Nmax)
-                idy = np.round(np.sum(idy)/Nmax)
-            else:
-                idx = idx[0]
-                idy = idy[0]
-
-            xmax = ix[i] - (nhalf+Xextendbox) + idx  #X coordinate in original image array
-            ymax = iy[i] - (nhalf+Yextendbox) + idy  #Y coordinate in original image array
-        else:
-            xmax = ix[i]
-            ymax = iy[i]
-
-        ###########################################################################
-        ###Check *new* center location for range (added by David Hogg)
-        ###########################################################################
-        if ((xmax < nhalf) or ((xmax + nhalf) > xsize-1) or
-           (ymax < nhalf) or ((ymax + nhalf) > ysize-1)):
-            xcen[i] = -1
-            ycen[i] = -1
-            print('Position '+ pos + ' moved too near edge of image')
-
-        ###########################################################################
-        ###Extract smaller 'STRBOX' sized subimage centered on maximum pixel
-        ###########################################################################
-        strbox = image[int(ymax-nhalf) : int(ymax+nhalf+1), int(xmax-nhalf) : int(xmax+nhalf+1)]
-
-        ir = (nhalf-1)
-        if ir < 1: ir = 1
-        dd = np.arange(nbox-1).astype(int) + 0.5 - nhalf
-
+        nbigx = nbox + Xextendbox*2; nbigy = nbox + Yextendbox*2 #Extend box on each side to search for max pixel value
+        
+        xcen = np.full(npts, -1.0)
+        ycen = np.full(npts, -1.0)
+        reject = np.zeros(npts, dtype = int)
+        ix = np.round(x).astype(int)          # Central X pixel
+        iy = np.round(y).astype(int)          # Central Y pixel
+        
         ###########################################################################
-        ###Weighting factor W unity in center, 0.5 at end, and linear in between
+        ###Reject positions too near the edge of the image
         ###########################################################################
-        w = 1. - 0.5*(np.abs(dd)-0.5)/(nhalf-0.5)
-        sumc   = np.sum(w)
-
+        good = ((ix >= nhalfbigx) & (ix + nhalfbigx <= xsize-1) &
+                (iy >= nhalfbigy) & (iy + nhalfbigy <= ysize-1))
+        reject[~good] = 1
+        
         ###########################################################################
-        ###Find X centroid
+        ###Locate maximum pixel in every 'NBIG' sized subimage
         ###########################################################################
-        deriv = np.roll(strbox,-1,axis=1) - strbox.astype(float)    #;Shift in X & subtract to get derivative
-        deriv = deriv[nhalf-ir:nhalf+ir+1,0:nbox-1] #;Don't want edges of the array
-        deriv = np.sum( deriv, 0 )                    #    ;Sum X derivatives over Y direction
-        sumd   = np.sum( w*deriv )
-        sumxd  = np.sum( w*dd*deriv )
-        sumxsq = np.sum( w*dd**2 )
-        if sumxd >= 0:    # ;Reject if X derivative not decreasing
-            xcen[i]=-1
-            ycen[i]=-1
-            print('Unable to compute X centroid around position '+ pos)
-        dx = sumxsq*sumd/(sumc*sumxd)
-        if np.abs(dx) > nhalf:    # Reject if centroid outside box
-            xcen[i]=-1
-            ycen[i]=-1
-            print('Computed X centroid for position '+ pos + ' out of range')
-        xcen[i] = xmax - dx    # X centroid in original array
-
+        xmax = ix.copy()
+        ymax = iy.copy()
+        if np.any(good):
+            bigboxes = sliding_window_view(image, (nbigy, nbigx))[iy[good]-nhalfbigy, ix[good]-nhalfbigx]
+            mx = np.nanmax(bigboxes, axis = (1, 2))                        #Maximum pixel value in each BIGBOX
+            atMax = bigboxes == mx[:, None, None]                          #How many pixels have maximum value?
+            Nmax = atMax.sum(axis = (1, 2))
+            idx = np.round(np.sum(atMax*np.arange(nbigx)[None, None, :], axis = (1, 2))/Nmax)  # X coordinate of Max pixel
+            idy = np.round(np.sum(atMax*np.arange(nbigy)[None, :, None], axis = (1, 2))/Nmax)  # Y coordinate of Max pixel
+            xmax[good] = ix[good] - nhalfbigx + idx.astype(int)  #X coordinate in original array
+            ymax[good] = iy[good] - nhalfbigy + idy.astype(int)  #Y coordinate in original array
+        
         ###########################################################################
-        ###Find Y Centroid
+        ###Check *new* center location for range (added by David Hogg)
         ###########################################################################
-        deriv = np.roll(strbox,-1,axis=0) - strbox.astype(float)    # Shift in X & subtract to get derivative
-        deriv = deriv[0:nbox-1,nhalf-ir:nhalf+ir+1]
-        deriv = np.sum( deriv,1 )
-        sumd =   np.sum( w*deriv )
-        sumxd =  np.sum( w*deriv*dd )
-        sumxsq = np.sum( w*dd**2 )
-        if sumxd >= 0:  # Reject if Y derivative not decreasing
-            xcen[i] = -1
-            ycen[i] = -1
-            print('Unable to compute Y centroid around position '+ pos)
-        dy = sumxsq*sumd/(sumc*sumxd)
-        if np.abs(dy) > nhalf:  # Reject if computed Y centroid outside box
-            xcen[i]=-1
-            ycen[i]=-1
-            print('Computed Y centroid for position '+ pos + ' out of range')
-        ycen[i] = ymax-dy
-
-        if npts == 1:
-            xcen,ycen = xcen[0]+1,ycen[0]+1
-        return xcen-1, ycen-1
+        moved = good & ((xmax < nhalf) | (xmax + nhalf > xsize-1) | (ymax < nhalf) | (ymax + nhalf > ysize-1))
+        reject[moved] = 2
+        good &= ~moved
+        
+        if np.any(good):
+            ###########################################################################
+            ###Extract smaller 'STRBOX' sized subimages centered on maximum pixels
+            ###########################################################################
+            strboxes = sliding_window_view(image, (nbox, nbox))[ymax[good]-nhalf, xmax[good]-nhalf].astype(imagePrecision().arithmeticType(image.dtype))
+            
+            ir = (nhalf-1)
+            if ir < 1: ir = 1
+            dd = np.arange(nbox-1).astype(int) + 0.5 - nhalf
+            
+            ###########################################################################
+            ###Weighting factor W unity in center, 0.5 at end, and linear in between
+            ###########################################################################
+            w = 1. - 0.5*(np.abs(dd)-0.5)/(nhalf-0.5)
+            sumc   = np.sum(w)
+            sumxsq = np.sum(w*dd**2)
+            
+            ###########################################################################
+            ###Find X centroids (shift in X & subtract to get derivative, sum over Y)
+            ###########################################################################
+            deriv = np.diff(strboxes, axis = 2)[:, nhalf-ir:nhalf+ir+1, :].sum(axis = 1)
+            sumd = deriv.dot(w)
+            sumxd = deriv.dot(w*dd)
+            with np.errstate(divide = 'ignore', invalid = 'ignore'):
+                dx = sumxsq*sumd/(sumc*sumxd)
+            
+            ###########################################################################
+            ###Find Y centroids (shift in Y & subtract to get derivative, sum over X)
+            ###########################################################################
+            deriv = np.diff(strboxes, axis = 1)[:, :, nhalf-ir:nhalf+ir+1].sum(axis = 2)
+            sumd = deriv.dot(w)
+            sumyd = deriv.dot(w*dd)
+            with np.errstate(divide = 'ignore', invalid = 'ignore'):
+                dy = sumxsq*sumd/(sumc*sumyd)
+            
+            ###########################################################################
+            ###Reject if derivatives are not decreasing or the centroid is outside the box
+            ###########################################################################
+            boxReject = np.zeros(len(dx), dtype = int)
+            boxReject[np.abs(dy) > nhalf] = 6
+            boxReject[sumyd >= 0] = 5
+            boxReject[np.abs(dx) > nhalf] = 4
+            boxReject[sumxd >= 0] = 3
+            goodIndex = np.flatnonzero(good)
+            reject[goodIndex] = boxReject
+            accepted = boxReject == 0
+            xcen[goodIndex[accepted]] = xmax[goodIndex[accepted]] - dx[accepted]    # X centroid in original array
+            ycen[goodIndex[accepted]] = ymax[goodIndex[accepted]] - dy[accepted]    # Y centroid in original array
+        
+        if verbose:
+            for ii in np.flatnonzero(reject):
+                print(self.rejectReasons[reject[ii]] % (str(x[ii]) + ' ' + str(y[ii])))
+        return xcen, ycen, reject
     
-    def findFIFInImage(self, image):
+    def findFIFInImage(self, image, method = None):
         '''
         Find FIF in image using intensity.
+        
+        method - 'pyramid': find the peak in a block averaged copy of the image
+                 (pyramidBlockSize), then refine it with the full resolution blur and
+                 minMaxLoc in a small window around the coarse peak.
+                 'blur': GaussianBlur and minMaxLoc over the full frame.
+                 Default is locatorMethod ('blur').
         '''
         #(0,0) is in lower left-hand corner of image
         # ____________
@@ -226,17 +297,25 @@ class centroidFIF(object):
         # |            |
         # |____________|
         # *(xOffset, yOffset)
-
-        ###########################################################################
-        ###Grayscale image
-        ###########################################################################
-        gray = cv2.GaussianBlur(image, (1, 31), 0)
         
-        ###########################################################################
-        ###Find FIF in image (minVal, maxVal, minLoc, maxLoc)
-        ###########################################################################
-        _, _, _, mL = cv2.minMaxLoc(gray)
-        maxLoc = (mL[1],mL[0]) #minMaxLoc returns (y,x) format. Converting to (x,y) format.
+        if method is None:
+            method = self.locatorMethod
+        if method not in ('pyramid', 'blur'):
+            raise Exception("Invalid FIF locator method '" + str(method) + "', must be 'pyramid' or 'blur'.")
+        blockSize = self.pyramidBlockSize
+        if method == 'pyramid' and min(image.shape) >= 4*blockSize:
+            maxLoc = self._pyramidPeak(image, blockSize)
+        else:
+            ###########################################################################
+            ###Grayscale image
+            ###########################################################################
+            gray = cv2.GaussianBlur(image, (1, self.blurKernelHeight), 0)
+            
+            ###########################################################################
+            ###Find FIF in image (minVal, maxVal, minLoc, maxLoc)
+            ###########################################################################
+            _, _, _, mL = cv2.minMaxLoc(gray)
+            maxLoc = (mL[1],mL[0]) #minMaxLoc returns (y,x) format. Converting to (x,y) format.
         
         ###########################################################################
         ###Create subarray around FIF (slice array)
@@ -253,6 +332,233 @@ class centroidFIF(object):
         
         return fifSubArray, self.widthOfSubimage, maxLoc
     
+    def _pyramidPeak(self, image, blockSize):
+        '''
+        findFIFInImage peak (row, column) from a block averaged copy of the image,
+        refined at full resolution in a window of +/- 2 blocks around the coarse peak.
+        '''
+        rows, columns = image.shape
+        
+        ###########################################################################
+        ###Coarse peak: blockSize x blockSize block averages, blurred like the full frame
+        ###########################################################################
+        coarseRows, coarseColumns = rows//blockSize, columns//blockSize
+        coarse = cv2.resize(np.ascontiguousarray(image[:coarseRows*blockSize, :coarseColumns*blockSize]).astype(np.float32),
+                            (coarseColumns, coarseRows), interpolation = cv2.INTER_AREA)
+        coarseKernel = max(3, (self.blurKernelHeight//blockSize) | 1)
+        _, _, _, mL = cv2.minMaxLoc(cv2.GaussianBlur(coarse, (1, coarseKernel), 0))
+        centerRow = mL[1]*blockSize + blockSize//2
+        centerColumn = mL[0]*blockSize + blockSize//2
+        
+        ###########################################################################
+        ###Refine: full resolution blur of the window (plus the kernel half height
+        ###above and below, so the blur inside the search area is exact)
+        ###########################################################################
+        search = 2*blockSize
+        margin = self.blurKernelHeight//2
+        rowStart = max(0, centerRow - search)
+        rowStop = min(rows, centerRow + search)
+        columnStart = max(0, centerColumn - search)
+        columnStop = min(columns, centerColumn + search)
+        windowStart = max(0, rowStart - margin)
+        window = image[windowStart:min(rows, rowStop + margin), columnStart:columnStop]
+        gray = cv2.GaussianBlur(np.ascontiguousarray(window), (1, self.blurKernelHeight), 0)
+        gray = gray[rowStart - windowStart:rowStop - windowStart]
+        _, _, _, mL = cv2.minMaxLoc(gray)
+        return (int(mL[1] + rowStart), int(mL[0] + columnStart))
+    
+    def benchmarkFIFLocator(self, frameShape = (2048, 3072), repeats = 10, filelist = None):
+        '''
+        Time findFIFInImage with method = 'pyramid' and method = 'blur' on a synthetic
+        16-bit frame with one pinhole image. If filelist (recorded FITS frames) is
+        given, also print how far the pyramid peak is from the blur peak in each frame.
+        
+        Returns (blur seconds per frame, pyramid seconds per frame, list of pyramid -
+        blur (row, column) offsets, one per file in filelist).
+        '''
+        rng = np.random.RandomState(0)
+        rows, columns = np.ogrid[0:frameShape[0], 0:frameShape[1]]
+        pinhole = (0.37*frameShape[0], 0.61*frameShape[1])
+        frame = 1000 + 3000*np.exp(-((rows - pinhole[0])**2 + (columns - pinhole[1])**2)/(2*4.0**2))
+        frame = rng.poisson(frame).astype(np.uint16)
+        
+        times = []
+        for method in ('blur', 'pyramid'):
+            startTime = time.perf_counter()
+            for _ in range(repeats):
+                _, _, maxLoc = self.findFIFInImage(frame, method = method)
+            times.append((time.perf_counter() - startTime)/repeats)
+            print(method + ' locator: ' + format(1000*times[-1], '.2f') + ' ms per frame, maxLoc = ' + str(maxLoc))
+        
+        ###########################################################################
+        ###Parity on recorded frames
+        ###########################################################################
+        offsets = []
+        if filelist is not None:
+            for fileName, image in zip(filelist, fitsImageStack(filelist)):
+                blurLoc = self.findFIFInImage(image, method = 'blur')[2]
+                pyramidLoc = self.findFIFInImage(image, method = 'pyramid')[2]
+                offsets.append((pyramidLoc[0] - blurLoc[0], pyramidLoc[1] - blurLoc[1]))
+                print(fileName + ': blur maxLoc = ' + str(blurLoc) + ', pyramid maxLoc = ' + str(pyramidLoc))
+            if offsets:
+                print('Frames with the same maxLoc: ' + str(sum(offset == (0, 0) for offset in offsets)) + ' of ' + str(len(offsets)) +
+                      ', largest offset: ' + format(np.max(np.abs(offsets)), 'd') + ' pixels')
+        return times[0], times[1], offsets
+    
+    def findFIFInStack(self, imageStack, decimation = 8, searchMargin = 50):
+        '''
+        Find FIF in every frame of a fitsImageStack with region-of-interest reads.
+        
+        Stage 1: the pinhole is located in a decimated read (every decimation-th row
+                 and column) of the first frame, then refined in a full resolution
+                 section around that location.
+        Stage 2: every remaining frame only has a section of
+                 widthOfSubimage + 2*searchMargin pixels read from disk around the
+                 previous frame's pinhole location.
+        
+        Returns a list with one findFIFInImage style tuple per frame:
+            (fifSubArray, widthOfSubimage, maxLoc), maxLoc in full frame (row, column)
+        '''
+        halfWidth = int(round(self.widthOfSubimage/2))
+        results = []
+        maxLoc = None
+        for index in range(len(imageStack)):
+            rows, columns = imageStack.frameShape(index)
+            
+            ###########################################################################
+            ###Stage 1: coarse location from a decimated read
+            ###########################################################################
+            if maxLoc is None:
+                coarse = imageStack.section(index, slice(None, None, decimation), slice(None, None, decimation))
+                coarse = cv2.blur(coarse.astype(np.float32), (3, 3))
+                coarseRow, coarseColumn = np.unravel_index(np.argmax(coarse), coarse.shape)
+                maxLoc = (coarseRow*decimation, coarseColumn*decimation)
+                margin = searchMargin + decimation
+            else:
+                margin = searchMargin
+            
+            ###########################################################################
+            ###Stage 2: read only the section around the pinhole
+            ###########################################################################
+            rowStart = max(0, maxLoc[0] - halfWidth - margin)
+            rowStop = min(rows, maxLoc[0] + halfWidth + margin)
+            columnStart = max(0, maxLoc[1] - halfWidth - margin)
+            columnStop = min(columns, maxLoc[1] + halfWidth + margin)
+            sectionImage = imageStack.section(index, slice(rowStart, rowStop), slice(columnStart, columnStop))
+            
+            #same peak search as findFIFInImage, restricted to the section
+            gray = cv2.GaussianBlur(sectionImage, (1, self.blurKernelHeight), 0)
+            _, _, _, mL = cv2.minMaxLoc(gray)
+            maxLoc = (int(mL[1] + rowStart), int(mL[0] + columnStart))
+            
+            #subarray around FIF, in section coordinates
+            subRow = maxLoc[0] - rowStart
+            subColumn = maxLoc[1] - columnStart
+            fifSubArray = sectionImage[max(0, subRow-halfWidth):subRow+halfWidth, max(0, subColumn-halfWidth):subColumn+halfWidth]
+            results.append((fifSubArray, self.widthOfSubimage, maxLoc))
+        return results
+    
+    def centroidStack(self, imageStack, maxLocs = None, method = 'gms'):
+        '''
+        Centroid the FIF in every frame of a focus sweep in one batch (centroidMethods;
+        with 'gms' the marginal sums of all frames are fitted together).
+        
+        imageStack - 3D numpy array or fitsImageStack (only sections are read)
+        maxLocs - optional list of findFIFInImage (row, column) pinhole locations, one
+                  per frame (e.g. from fitsDirectoryWatcher.metricList(filelist, 'maxLoc')).
+                  Found with findFIFInStack/findFIFInImage if not given.
+        method - centroidMethods method name
+        
+        Returns xcen, ycen, xerr, yerr (arrays with one value per frame, x = column, y = row)
+        '''
+        halfWidth = int(round(self.widthOfSubimage/2))
+        if maxLocs is None:
+            if hasattr(imageStack, 'section'):
+                maxLocs = [maxLoc for _, _, maxLoc in self.findFIFInStack(imageStack)]
+            else:
+                maxLocs = [self.findFIFInImage(frame)[2] for frame in imageStack]
+        centroids = centroidMethods().centroid(imageStack, maxLocs, halfWidth, method = method)
+        return centroids['x'], centroids['y'], centroids['xErr'], centroids['yErr']
+    
+    def findAllFIFsInImage(self, image, detectionSigma = None, minSourcePixels = None):
+        '''
+        Find every illuminated pinhole (or spot) in an image.
+        
+        The background and its noise are the sigma-clipped median and standard
+        deviation from backgroundEstimator. Pixels of a lightly smoothed copy of the image
+        more than detectionSigma noise above the background are grouped into connected
+        sources; sources smaller than minSourcePixels are dropped.
+        
+        Returns a sourceType structured array sorted by flux (brightest first):
+            row, column - location of the peak pixel (same (row, column) as findFIFInImage maxLoc)
+            peak - peak pixel value
+            flux - sum of (pixel - background) over the source
+            pixels - number of pixels in the source
+            rowStart, rowStop, columnStart, columnStop - bounding box
+        '''
+        if detectionSigma is None:
+            detectionSigma = self.detectionSigma
+        if minSourcePixels is None:
+            minSourcePixels = self.minSourcePixels
+        image = np.asarray(image)
+        
+        ###########################################################################
+        ###Robust background and noise (sigma-clipped, shared with the centroid methods)
+        ###########################################################################
+        background, _, noise = backgroundEstimator().statistics(image)
+        
+        ###########################################################################
+        ###Threshold and label connected sources
+        ###########################################################################
+        smoothed = cv2.GaussianBlur(image.astype(np.float32), (5, 5), 0)
+        labels, numberOfSources = ndimage.label(smoothed > background + detectionSigma*noise)
+        if numberOfSources == 0:
+            return np.zeros(0, dtype = self.sourceType)
+        pixels = np.bincount(labels.ravel(), minlength = numberOfSources + 1)
+        boxes = ndimage.find_objects(labels)
+        
+        ###########################################################################
+        ###Source table (each source measured inside its own bounding box)
+        ###########################################################################
+        keep = [label for label in range(1, numberOfSources + 1) if pixels[label] >= minSourcePixels]
+        sources = np.zeros(len(keep), dtype = self.sourceType)
+        for ii, label in enumerate(keep):
+            rowSlice, columnSlice = boxes[label - 1]
+            inSource = labels[rowSlice, columnSlice] == label
+            values = np.where(inSource, image[rowSlice, columnSlice], -np.inf)
+            peakRow, peakColumn = np.unravel_index(np.argmax(values), values.shape)
+            sources[ii] = (peakRow + rowSlice.start, peakColumn + columnSlice.start, values[peakRow, peakColumn],
+                           np.sum(values[inSource] - background), pixels[label],
+                           rowSlice.start, rowSlice.stop, columnSlice.start, columnSlice.stop)
+        
+        return sources[np.argsort(-sources['flux'], kind = 'stable')]
+    
+    def centroidAllFIFs(self, image, halfWidth = None, detectionSigma = None, minSourcePixels = None, method = 'gms'):
+        '''
+        Detect every source in an image (findAllFIFsInImage) and centroid them all in
+        one batch (centroidMethods), so one exposure gives every pinhole position.
+        
+        halfWidth - half width of the centroiding boxes. Default is widthOfSubimage/2,
+                    reduced to keep each box clear of the nearest other source.
+        method - centroidMethods method name
+        
+        Returns (sources, centroids): the source table and a centroidMethods.resultType
+        array with one centroid per source (x = column, y = row).
+        '''
+        sources = self.findAllFIFsInImage(image, detectionSigma, minSourcePixels)
+        if len(sources) == 0:
+            return sources, np.zeros(0, dtype = centroidMethods.resultType)
+        if halfWidth is None:
+            halfWidth = int(round(self.widthOfSubimage/2))
+            if len(sources) > 1:
+                #closest pair of sources, in pixels along either axis
+                separation = np.maximum(np.abs(sources['row'][:, None] - sources['row'][None, :]),
+                                        np.abs(sources['column'][:, None] - sources['column'][None, :]))
+                np.fill_diagonal(separation, np.iinfo(separation.dtype).max)
+                halfWidth = int(max(3, min(halfWidth, separation.min()//2)))
+        seeds = np.column_stack((sources['row'], sources['column']))
+        return sources, centroidMethods().centroid(np.asarray(image), seeds, halfWidth, method = method)
+    
     def alternateCentroid(self, consoleLog, logFile):
         '''
         Centroid pinhole image using alternate methods.
@@ -260,8 +566,7 @@ class centroidFIF(object):
         
         #Get image
         faah = fileAndArrayHandling()
-        imageArray4D, filelist = faah.openAllFITSImagesInDirectory()
-        aa = round(len(filelist)/2) #select a focused image from array
+        focusedImage, filelist, aa = faah.openFocusedFITSImageInDirectory() #select a focused image from directory (only that image is decoded)
         
         #Log image that will be used for centroiding
         faah = fileAndArrayHandling()
@@ -269,41 +574,47 @@ class centroidFIF(object):
                          "Centroiding image: " +  str(filelist[aa]).replace('/', '\\'))
         
         #Get location of pinhole image in (rows, columns)
-        fifSubArray, subArrayBoxSize, maxLoc = self.findFIFInImage(imageArray4D[aa])
+        fifSubArray, subArrayBoxSize, maxLoc = self.findFIFInImage(focusedImage)
         
         #Account for planet mode
         pM = CCDOpsPlanetMode()
-        xOffset, yOffset, _ = pM.readFitsHeader(imageArray4D, filelist, consoleLog, logFile)
-        
-        #Use alternate methods to centroid pinhole image
-        #    gmsCentroid: Gaussian Marginal Sum (GMS) Centroid Method.
-        xCenGMS, yCenGMS, xErrGMS, yErrGMS = gmsCentroid(imageArray4D[aa], maxLoc[1], maxLoc[0], 
-                                                         int(round(subArrayBoxSize/2)), int(round(subArrayBoxSize/2)), axis='both', verbose=False)
-        #    smsBisector: Sobel Marginal Sum (SMS) Bisector Method.
-        #xCenSMS, yCenSMS, _ = smsBisector(imageArray4D[aa], maxLoc[1], maxLoc[0], int(round(subArrayBoxSize/2)), 
-        #                                  int(round(subArrayBoxSize/2)), axis='both', clipStars=False, wfac=1, verbose=False)
-        #    alternateCentroidMethods.findCentroid: iterative GMS method centroid fitting.
-        xCenFC, yCenFC, xErrFC, yErrFC = findCentroid(imageArray4D[aa], maxLoc[0], maxLoc[1], 
-                                                      int(round(subArrayBoxSize/2)), maxiter=1000, tol=0.01, verbose=False)
-        #    centroidFIF.findCentroid
-        xCencF, yCencF = self.findCentroid(fifSubArray, int(round(subArrayBoxSize/2)), int(round(subArrayBoxSize/2)), extendbox = 3)
-        xCencF = xCencF + maxLoc[0]-subArrayBoxSize/2
-        yCencF = yCencF + maxLoc[1]-subArrayBoxSize/2
-
+        xOffset, yOffset, _ = pM.readFitsHeader(focusedImage, filelist, consoleLog, logFile)
+        
+        #Use alternate methods to centroid pinhole image (see centroidMethods)
+        halfWidth = int(round(subArrayBoxSize/2))
+        centroids = []
+        for methodName in self.alternateCentroidMethods:
+            options = dict(self.alternateCentroidOptions.get(methodName, {}))
+            if options.pop('subArray', False):
+                #Centroid the subarray, then move the result back to full frame pixels
+                centroid = centroidMethods().centroid(fifSubArray, [(halfWidth, halfWidth)], halfWidth, method = methodName, **options)[0]
+                centroid['x'] += maxLoc[1] - halfWidth
+                centroid['y'] += maxLoc[0] - halfWidth
+            else:
+                centroid = centroidMethods().centroid(focusedImage, [maxLoc], halfWidth, method = methodName, **options)[0]
+            centroids.append((methodName, centroid))
+        
         #Print Results
+        fullFrame = "Pinhole image found at (rows, columns): (" + str(maxLoc[1] + xOffset) + ', ' + str(maxLoc[0] + yOffset)+ ')\n'
+        planetMode = "Pinhole image found at (rows, columns): (" + str(maxLoc[1]) + ', ' + str(maxLoc[0])+ ')\n'
+        for methodName, centroid in centroids:
+            if centroid['flag'] != 0:
+                fullFrame += self.centroidMethodLabels[methodName] + " Centroid failed (flag " + str(centroid['flag']) + ")\n"
+                planetMode += self.centroidMethodLabels[methodName] + " Centroid failed (flag " + str(centroid['flag']) + ")\n"
+                continue
+            fullFrame += (self.centroidMethodLabels[methodName] + " Centroid (rows, columns): (" + 
+                          format(centroid['x'] + xOffset, '.2f') + self._formatError(centroid['xErr']) + ', ' +
+                          format(centroid['y'] + yOffset, '.2f') + self._formatError(centroid['yErr']) + ')\n')
+            planetMode += (self.centroidMethodLabels[methodName] + " Centroid (rows, columns): (" + 
+                           format(centroid['x'], '.2f') + self._formatError(centroid['xErr']) + ', ' +
+                           format(centroid['y'], '.2f') + self._formatError(centroid['yErr']) + ')\n')
         faah.pageLogging(consoleLog, logFile,
-                        "Pinhole image found at (rows, columns): (" + str(maxLoc[1] + xOffset) + ', ' + str(maxLoc[0] + yOffset)+ ')\n' +
-                        "GMS Centroid (rows, columns): (" +  format(xCenGMS + xOffset, '.2f') + ' +/- ' + format(xErrGMS, '.2f') + 
-                        ', ' + format(yCenGMS + yOffset, '.2f') + ' +/- ' + format(yErrGMS, '.2f') + ')\n' +
-                        #"SMS Bisector Centroid (rows, columns): (" +  format(xCenSMS + xOffset, '.2f') + ', ' + format(yCenSMS + yOffset, '.2f') + ')\n' +
-                        "Iterative GMS Centroid (rows, columns): (" +  format(xCenFC + xOffset, '.2f') + ' +/- ' + format(xErrFC, '.2f') + ', ' +
-                         format(yCenFC + yOffset, '.2f') + '+/-' + format(yErrFC, '.2f') + ')\n' +
-                        "IDL DAOPHOT Centroid (rows, columns): (" + format(yCencF + xOffset, '.2f') + ', ' + format(xCencF + yOffset, '.2f')+ ')\n\n'
-                         "In planet mode (xOffset = " + str(xOffset) + ", yOffset = " + str(yOffset) + ")\n"                   
-                        "Pinhole image found at (rows, columns): (" + str(maxLoc[1]) + ', ' + str(maxLoc[0])+ ')\n' +
-                        "GMS Centroid (rows, columns): (" +  format(xCenGMS, '.2f') + ' +/- ' + format(xErrGMS, '.2f') + 
-                        ', ' + format(yCenGMS, '.2f') + ' +/- ' + format(yErrGMS, '.2f') + ')\n' +
-                        #"SMS Bisector Centroid (rows, columns): (" +  format(xCenSMS, '.2f') + ', ' + format(yCenSMS, '.2f') + ')\n' +
-                        "Iterative GMS Centroid (rows, columns): (" +  format(xCenFC, '.2f') + ' +/- ' + format(xErrFC, '.2f') + ', ' +
-                         format(yCenFC, '.2f') + '+/-' + format(yErrFC, '.2f') + ')\n' +
-                        "IDL DAOPHOT Centroid (rows, columns): (" + format(yCencF, '.2f') + ', ' + format(xCencF, '.2f')+ ')\n\n', doubleSpaceWithTime = False)
\ No newline at end of file
+                        fullFrame + '\n' +
+                        "In planet mode (xOffset = " + str(xOffset) + ", yOffset = " + str(yOffset) + ")\n" +
+                        planetMode + '\n', doubleSpaceWithTime = False)
+    
+    def _formatError(self, error):
+        '''
+        ' +/- error' for the results log, or '' if the method gives no error.
+        '''
+        return '' if np.isnan(error) else ' +/- ' + format(error, '.2f')
\ No newline at end of file
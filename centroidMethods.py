@@ -0,0 +1,267 @@
+'''
+@title centroidMethods
+@author: agent
+Updated on Oct 18, 2026
+Created on Oct 18, 2026
+
+centroidMethods
+This module holds a registry of pinhole centroid methods with one batch
+interface, so workflows choose a method by name (from workflowMethods) instead
+of calling each centroid routine with its own signature and argument order.
+
+Every method is called as
+    method(stack, seeds, halfWidth, bkg)
+        stack - 2D image (all seeds in the same image) or a stack of frames
+                (3D numpy array, fitsImageStack, ...) with one seed per frame
+        seeds - (N, 2) array of (row, column) seeds, e.g. findFIFInImage maxLoc values
+        halfWidth - half width of the centroiding box in pixels
+        bkg - median background of each frame (one value for a 2D image), or None
+              for the method's own estimate
+and optional method specific keyword options (e.g. extendbox for 'daophot'),
+and returns a resultType structured array with one entry per seed:
+    x, y - centroid (x = column, y = row), NaN if it could not be computed
+    xErr, yErr - 1 sigma errors (NaN if the method does not give errors)
+    flag - 0 for a good centroid; otherwise a method specific failure code
+           (1 for failed fits, the centroidFIF.rejectReasons codes for 'daophot')
+
+Registered methods:
+gms
+    Gaussian Marginal Sum centroid, all seeds fitted in one batch (gmsCentroidBatch).
+    Boxes are truncated at the image edge, as in gmsCentroid.
+gmsIterative
+    Iterative GMS centroid, re-centering the box until it converges (findCentroid).
+daophot
+    IDL DAOPHOT derivative search centroid (centroidFIF.findCentroids), option extendbox.
+sms
+    Sobel Marginal Sum bisector, for flat-topped images (smsBisector).
+
+Modules:
+centroid
+    Centroid a list of seeds with the method configured for a workflow (or a named method).
+checkCentroids
+    Log and raise an exception if any centroid failed (non-zero flag).
+register
+    Add a centroid method to the registry.
+'''
+
+# Import #######################################################################################
+import numpy as np
+from backgroundEstimator import backgroundEstimator
+from fileAndArrayHandling import fileAndArrayHandling
+from alternateCentroidMethods import gmsCentroidBatch, smsBisector, findCentroid
+################################################################################################
+
+class centroidMethods(object):
+
+    #Result of every centroid method
+    resultType = np.dtype([('x', np.float64), ('y', np.float64), ('xErr', np.float64),
+                           ('yErr', np.float64), ('flag', np.int64)])
+
+    #Method used by each workflow (workflows not listed use defaultMethod); a
+    #centroidMethods(workflowMethods = {...}) instance overrides entries
+    defaultMethod = 'gms'
+    workflowMethods = {'guidedMode': 'gms',
+                       'manualMode': 'gms',
+                       'tipTilt': 'gms',
+                       'cameraOrigin': 'gms',
+                       'cs5Offsets': 'gms'}
+
+    #findCentroid settings for 'gmsIterative'
+    iterativeMaxiter = 1000
+    iterativeTol = 0.01 #pixels
+
+    #Methods that use the frame background on every call: centroid computes it once per
+    #frame of an in-memory stack (backgroundEstimator, cached) and passes it as bkg
+    backgroundMethods = ('daophot',)
+
+    #Registered methods: {name: function(stack, seeds, halfWidth, bkg, **options)}, filled in below the class
+    methods = {}
+
+    def __init__(self, workflowMethods = None):
+        '''
+        Constructor
+
+        workflowMethods - optional {workflow: method name} entries that override the
+                          class workflowMethods for this instance
+        '''
+        if workflowMethods is not None:
+            unknown = sorted(set(workflowMethods.values()) - set(self.methods))
+            if unknown:
+                raise Exception("Unknown centroid method(s) " + str(unknown) + " in workflowMethods, must be one of " + str(sorted(self.methods)))
+            self.workflowMethods = dict(self.workflowMethods, **workflowMethods)
+
+    def centroid(self, stack, seeds, halfWidth, method = None, workflow = None, bkg = None, **options):
+        '''
+        Centroid every seed.
+
+        stack, seeds, halfWidth - see the module description
+        method - registered method name (default: workflowMethods[workflow], or defaultMethod)
+        workflow - name of the calling workflow, used to look up its configured method
+        bkg - median background of each frame (or one value for every frame). Default
+              for backgroundMethods is frameBackgrounds(stack); the other methods use
+              their own estimate.
+        options - method specific keyword options, passed to the method (e.g.
+                  extendbox = 3 for 'daophot')
+
+        Returns a resultType structured array (one entry per seed).
+        '''
+        if method is None:
+            method = self.workflowMethods.get(workflow, self.defaultMethod)
+        if method not in self.methods:
+            raise Exception("Unknown centroid method '" + str(method) + "', must be one of " + str(sorted(self.methods)))
+        seeds = np.asarray(seeds, dtype = np.float64).reshape(-1, 2)
+        self.checkSeeds(stack, seeds)
+        if bkg is None and method in self.backgroundMethods:
+            bkg = self.frameBackgrounds(stack)
+        return self.methods[method](stack, seeds, int(halfWidth), bkg, **options)
+
+    def checkCentroids(self, centroids, seeds, label, consoleLog = None, logFile = None):
+        '''
+        Raise an exception if any centroid failed (non-zero flag), so a NaN centroid
+        never reaches the workflow results. The failure is first logged as a warning
+        to consoleLog and logFile (fileAndArrayHandling.pageLogging) if they are given.
+
+        centroids - resultType array from centroid
+        seeds - the (row, column) seeds given to centroid
+        label - name of the pinhole(s) for the message, e.g. 'FIF A'
+        '''
+        failed = np.flatnonzero(centroids['flag'] != 0)
+        if len(failed) == 0:
+            return
+        seeds = np.asarray(seeds, dtype = np.float64).reshape(-1, 2)
+        message = ''
+        for index in failed:
+            row, column = seeds[index if len(seeds) > 1 else 0]
+            message += ("Unable to centroid " + str(label) + " at pixel location (" + format(row, '.0f') + "," + format(column, '.0f') +
+                        "), centroid method flag " + str(centroids['flag'][index]) + ".\n")
+        message = message.rstrip()
+        if consoleLog is not None:
+            fileAndArrayHandling().pageLogging(consoleLog, logFile, message, warning = True)
+        raise Exception(message)
+
+    def register(self, name, function):
+        '''
+        Add (or replace) a centroid method. function is called as
+        function(stack, seeds, halfWidth, bkg, **options) and must return a resultType array.
+        '''
+        self.methods[name] = function
+
+    @staticmethod
+    def checkSeeds(stack, seeds):
+        '''
+        Raise a ValueError unless a stack of frames has one seed per frame, or a
+        single seed for every frame (any number of seeds is fine for a 2D image).
+        '''
+        if isinstance(stack, np.ndarray) and stack.ndim == 2:
+            return
+        if len(seeds) != 1 and len(seeds) != len(stack):
+            raise ValueError("Got " + str(len(seeds)) + " centroid seeds for a stack of " + str(len(stack)) +
+                             " frames, need one seed per frame or a single seed for every frame.")
+
+    @staticmethod
+    def frameSeeds(stack, seeds):
+        '''
+        Yield (frame, seed indexes) pairs: every seed in a 2D image, or one seed per
+        frame of a stack (a single seed is used for every frame, see checkSeeds).
+        '''
+        centroidMethods.checkSeeds(stack, seeds)
+        if isinstance(stack, np.ndarray) and stack.ndim == 2:
+            yield stack, np.arange(len(seeds))
+            return
+        for index in range(len(stack)):
+            yield np.asarray(stack[index]), np.array([index if len(seeds) > 1 else 0])
+
+    @staticmethod
+    def frameBackgrounds(stack):
+        '''
+        Median background (backgroundEstimator) of a 2D image or of every frame of a
+        3D numpy array, computed once per frame and cached for the frame's views.
+        Returns None for lazy stacks (fitsImageStack, ...), whose frames are only
+        read by the methods that need them.
+        '''
+        if not isinstance(stack, np.ndarray):
+            return None
+        if stack.ndim == 2:
+            return np.array([backgroundEstimator().median(stack)])
+        return np.array([backgroundEstimator().median(frame) for frame in stack])
+
+    @staticmethod
+    def frameBackground(bkg, frameIndex):
+        '''
+        Background of frame frameIndex from a centroid bkg argument (None, one value
+        for every frame, or one value per frame).
+        '''
+        if bkg is None:
+            return None
+        bkg = np.atleast_1d(bkg)
+        return bkg[frameIndex if len(bkg) > 1 else 0]
+
+    @staticmethod
+    def emptyResult(length):
+        result = np.zeros(length, dtype = centroidMethods.resultType)
+        result['x'] = result['y'] = result['xErr'] = result['yErr'] = np.nan
+        return result
+
+    ###########################################################################
+    ###Registered methods
+    ###########################################################################
+    @staticmethod
+    def gms(stack, seeds, halfWidth, bkg = None):
+        xCen, yCen, xErr, yErr = gmsCentroidBatch(stack, seeds[:, 1], seeds[:, 0], halfWidth, halfWidth,
+                                                  truncate = True, bkg = bkg)
+        result = centroidMethods.emptyResult(len(xCen))
+        result['x'], result['y'], result['xErr'], result['yErr'] = xCen, yCen, xErr, yErr
+        result['flag'] = np.where(np.isfinite(xCen) & np.isfinite(yCen), 0, 1)
+        return result
+
+    @staticmethod
+    def gmsIterative(stack, seeds, halfWidth, bkg = None):
+        results = []
+        for frameIndex, (frame, indexes) in enumerate(centroidMethods.frameSeeds(stack, seeds)):
+            for index in indexes:
+                result = centroidMethods.emptyResult(1)
+                try:
+                    result[0] = findCentroid(frame, seeds[index, 1], seeds[index, 0], halfWidth,
+                                             maxiter = centroidMethods.iterativeMaxiter,
+                                             tol = centroidMethods.iterativeTol,
+                                             bkg = centroidMethods.frameBackground(bkg, frameIndex)) + (0,)
+                except Exception:
+                    result['flag'] = 1
+                results.append(result)
+        return np.concatenate(results) if results else centroidMethods.emptyResult(0)
+
+    @staticmethod
+    def daophot(stack, seeds, halfWidth, bkg = None, extendbox = False):
+        #imported here because centroidFIF uses this registry
+        from centroidFIF import centroidFIF
+        cF = centroidFIF()
+        results = []
+        for frameIndex, (frame, indexes) in enumerate(centroidMethods.frameSeeds(stack, seeds)):
+            xcen, ycen, reject = cF.findCentroids(frame, seeds[indexes, 1], seeds[indexes, 0], extendbox = extendbox, verbose = False,
+                                                  background = centroidMethods.frameBackground(bkg, frameIndex))
+            result = centroidMethods.emptyResult(len(indexes))
+            good = reject == 0
+            result['x'][good], result['y'][good] = xcen[good], ycen[good]
+            result['flag'] = reject
+            results.append(result)
+        return np.concatenate(results) if results else centroidMethods.emptyResult(0)
+
+    @staticmethod
+    def sms(stack, seeds, halfWidth, bkg = None):
+        results = []
+        for frameIndex, (frame, indexes) in enumerate(centroidMethods.frameSeeds(stack, seeds)):
+            for index in indexes:
+                result = centroidMethods.emptyResult(1)
+                try:
+                    xCen, yCen, _ = smsBisector(frame, seeds[index, 1], seeds[index, 0], halfWidth, halfWidth,
+                                                bkg = centroidMethods.frameBackground(bkg, frameIndex))
+                    result['x'], result['y'] = xCen, yCen
+                except Exception:
+                    result['flag'] = 1
+                results.append(result)
+        return np.concatenate(results) if results else centroidMethods.emptyResult(0)
+
+centroidMethods.methods.update({'gms': centroidMethods.gms,
+                                'gmsIterative': centroidMethods.gmsIterative,
+                                'daophot': centroidMethods.daophot,
+                                'sms': centroidMethods.sms})
@@ -15,7 +15,7 @@ from fileAndArrayHandling import fileAndArrayHandling
 from CCDOpsPlanetMode import CCDOpsPlanetMode
 from centroidFIF import centroidFIF
 from focusCurve import focusCurve
-from alternateCentroidMethods import gmsCentroid
+from centroidMethods import centroidMethods
 from cs5Offsets import cs5Offsets
 from tipTiltZCCD import tipTiltZCCD
 import numpy as np
@@ -101,7 +101,7 @@ class checkCameraOriginLocation(object):
         buttonA = tk.Button(topA, text="Ready", command=topA.destroy)
         buttonA.pack()
         topA.wait_window()
-        imageArray4DA, filelistA = faah.openAllFITSImagesInDirectory()
+        focusedImageA, filelistA, aa = faah.openFocusedFITSImageInDirectory() #only the focused image is decoded
         
         #Point B      
         topB = tk.Toplevel()
@@ -114,7 +114,7 @@ class checkCameraOriginLocation(object):
         buttonB = tk.Button(topB, text="Ready", command=topB.destroy)
         buttonB.pack()
         topB.wait_window()
-        imageArray4DB, filelistB = faah.openAllFITSImagesInDirectory()
+        focusedImageB, filelistB, bb = faah.openFocusedFITSImageInDirectory() #only the focused image is decoded
         
         #Point C      
         topC = tk.Toplevel()
@@ -127,35 +127,35 @@ class checkCameraOriginLocation(object):
         buttonC = tk.Button(topC, text="Ready", command=topC.destroy)
         buttonC.pack()
         topC.wait_window()
-        imageArray4DC, filelistC = faah.openAllFITSImagesInDirectory()        
+        focusedImageC, filelistC, cc = faah.openFocusedFITSImageInDirectory() #only the focused image is decoded        
                
-        aa = round(len(filelistA)/2) #select a focused image from array a
-        bb = round(len(filelistB)/2) #select b focused image from array b
-        cc = round(len(filelistC)/2) #select c focused image from array c
                 
         ###########################################################################
         ###Centroid Images
         ########################################################################### 
         #Get location of pinhole image in (rows, columns)
         cF = centroidFIF()
-        _ , subArrayBoxSizeA, maxLocA = cF.findFIFInImage(imageArray4DA[aa])
-        _ , subArrayBoxSizeB, maxLocB = cF.findFIFInImage(imageArray4DB[bb])
-        _ , subArrayBoxSizeC, maxLocC = cF.findFIFInImage(imageArray4DC[cc])
+        _ , subArrayBoxSizeA, maxLocA = cF.findFIFInImage(focusedImageA)
+        _ , subArrayBoxSizeB, maxLocB = cF.findFIFInImage(focusedImageB)
+        _ , subArrayBoxSizeC, maxLocC = cF.findFIFInImage(focusedImageC)
         
         #Account for planet mode
         pM = CCDOpsPlanetMode()
-        xOffsetA, yOffsetA, _ = pM.readFitsHeader(imageArray4DA, filelistA, consoleLog, logFile)
-        xOffsetB, yOffsetB, _ = pM.readFitsHeader(imageArray4DB, filelistB, consoleLog, logFile)
-        xOffsetC, yOffsetC, pixelSize = pM.readFitsHeader(imageArray4DC, filelistC, consoleLog, logFile)
+        xOffsetA, yOffsetA, _ = pM.readFitsHeader(focusedImageA, filelistA, consoleLog, logFile)
+        xOffsetB, yOffsetB, _ = pM.readFitsHeader(focusedImageB, filelistB, consoleLog, logFile)
+        xOffsetC, yOffsetC, pixelSize = pM.readFitsHeader(focusedImageC, filelistC, consoleLog, logFile)
         
-        #Use alternate methods to centroid pinhole image
-        #    gmsCentroid: Gaussian Marginal Sum (GMS) Centroid Method.
-        xCenGMSA, yCenGMSA, _, _ = gmsCentroid(imageArray4DA[aa], maxLocA[1], maxLocA[0], 
-                                                         int(round(subArrayBoxSizeA/2)), int(round(subArrayBoxSizeA/2)), axis='both', verbose=False)
-        xCenGMSB, yCenGMSB, _, _ = gmsCentroid(imageArray4DB[bb], maxLocB[1], maxLocB[0], 
-                                                         int(round(subArrayBoxSizeB/2)), int(round(subArrayBoxSizeB/2)), axis='both', verbose=False)
-        xCenGMSC, yCenGMSC, _, _ = gmsCentroid(imageArray4DC[cc], maxLocC[1], maxLocC[0], 
-                                                         int(round(subArrayBoxSizeC/2)), int(round(subArrayBoxSizeC/2)), axis='both', verbose=False)
+        #Centroid pinhole image (method from centroidMethods.workflowMethods)
+        cM = centroidMethods()
+        centroidA = cM.centroid(focusedImageA, [maxLocA], int(round(subArrayBoxSizeA/2)), workflow = 'cameraOrigin')
+        centroidB = cM.centroid(focusedImageB, [maxLocB], int(round(subArrayBoxSizeB/2)), workflow = 'cameraOrigin')
+        centroidC = cM.centroid(focusedImageC, [maxLocC], int(round(subArrayBoxSizeC/2)), workflow = 'cameraOrigin')
+        cM.checkCentroids(centroidA, [maxLocA], 'pinhole A', consoleLog, logFile)
+        cM.checkCentroids(centroidB, [maxLocB], 'pinhole B', consoleLog, logFile)
+        cM.checkCentroids(centroidC, [maxLocC], 'pinhole C', consoleLog, logFile)
+        xCenGMSA, yCenGMSA = centroidA['x'][0], centroidA['y'][0]
+        xCenGMSB, yCenGMSB = centroidB['x'][0], centroidB['y'][0]
+        xCenGMSC, yCenGMSC = centroidC['x'][0], centroidC['y'][0]
         
         
         
@@ -163,7 +163,7 @@ class checkCameraOriginLocation(object):
         ###Get Rz
         ###########################################################################
         ttzCCD = tipTiltZCCD()
-        angleRz = ttzCCD.rz(imageArray4DB[bb], filelistB, imageArray4DC[cc], filelistC, self.CCDSelection, consoleLog, logFile)
+        angleRz = ttzCCD.rz(focusedImageB, filelistB, focusedImageC, filelistC, self.CCDSelection, consoleLog, logFile)
         faah.pageLogging(consoleLog, logFile, "\nRz Local (degrees): " + format(angleRz, '.3f'))   
 
         ###########################################################################
@@ -180,14 +180,14 @@ class checkCameraOriginLocation(object):
         DeltaY_SBIGXL_C = ((yCenGMSC + yOffsetC) - self.pixelDistanceToCheckPointY) * pixelSize
         
         #Find distance in um to CCD pixelDistanceToCenter
-        DeltaX_SBIGXL_A_Sensor_Center = ((xCenGMSA + xOffsetA) - int(imageArray4DA[aa].shape[0]/2)) * pixelSize
-        DeltaY_SBIGXL_A_Sensor_Center = ((yCenGMSA + yOffsetA) - int(imageArray4DA[aa].shape[1]/2)) * pixelSize
+        DeltaX_SBIGXL_A_Sensor_Center = ((xCenGMSA + xOffsetA) - int(focusedImageA.shape[0]/2)) * pixelSize
+        DeltaY_SBIGXL_A_Sensor_Center = ((yCenGMSA + yOffsetA) - int(focusedImageA.shape[1]/2)) * pixelSize
         
-        DeltaX_SBIGXL_B_Sensor_Center = ((xCenGMSB + xOffsetB) - int(imageArray4DB[bb].shape[0]/2)) * pixelSize
-        DeltaY_SBIGXL_B_Sensor_Center = ((yCenGMSB + yOffsetB) - int(imageArray4DB[bb].shape[1]/2)) * pixelSize
+        DeltaX_SBIGXL_B_Sensor_Center = ((xCenGMSB + xOffsetB) - int(focusedImageB.shape[0]/2)) * pixelSize
+        DeltaY_SBIGXL_B_Sensor_Center = ((yCenGMSB + yOffsetB) - int(focusedImageB.shape[1]/2)) * pixelSize
         
-        DeltaX_SBIGXL_C_Sensor_Center = ((xCenGMSC + xOffsetC) - int(imageArray4DC[cc].shape[0]/2)) * pixelSize
-        DeltaY_SBIGXL_C_Sensor_Center = ((yCenGMSC + yOffsetC) - int(imageArray4DC[cc].shape[1]/2)) * pixelSize   
+        DeltaX_SBIGXL_C_Sensor_Center = ((xCenGMSC + xOffsetC) - int(focusedImageC.shape[0]/2)) * pixelSize
+        DeltaY_SBIGXL_C_Sensor_Center = ((yCenGMSC + yOffsetC) - int(focusedImageC.shape[1]/2)) * pixelSize   
         
         ###########################################################################
         ###Rotation Coordinate Transform from SBIG Coordinates to CS5 Coordinates
@@ -664,19 +664,18 @@ class checkCameraOriginLocation(object):
         #Get images for target pixel
         self.logFile = logFile #because faah.createDir get the logfile name from metModeSelf.logFile.name
         faah.createDir(self.CCDSelection, self, "(" + str(self.pixelDistanceToCheckPointX) + ", " + str(self.pixelDistanceToCheckPointY) + ")")
-        imageArray4DTarget, filelistTarget = faah.openAllFITSImagesInDirectory()
+        focusedImageTarget, filelistTarget, tar = faah.openFocusedFITSImageInDirectory() #only the focused image is decoded
         
         #Centroid
-        tar = round(len(filelistTarget)/2) #select c focused image from array c
-        _ , subArrayBoxSizeTarget, maxLocTarget = cF.findFIFInImage(imageArray4DTarget[tar])
+        _ , subArrayBoxSizeTarget, maxLocTarget = cF.findFIFInImage(focusedImageTarget)
         
         #Planet Mode
-        xOffsetTarget, yOffsetTarget, _ = pM.readFitsHeader(imageArray4DTarget, filelistTarget, consoleLog, logFile)
+        xOffsetTarget, yOffsetTarget, _ = pM.readFitsHeader(focusedImageTarget, filelistTarget, consoleLog, logFile)
         
-        #Use alternate methods to centroid pinhole image
-        #    gmsCentroid: Gaussian Marginal Sum (GMS) Centroid Method.
-        xCenGMSTarget, yCenGMSTarget, _, _ = gmsCentroid(imageArray4DTarget[tar], maxLocTarget[1], maxLocTarget[0], 
-                                                         int(round(subArrayBoxSizeTarget/2)), int(round(subArrayBoxSizeTarget/2)), axis='both', verbose=False)
+        #Centroid pinhole image (method from centroidMethods.workflowMethods)
+        centroidTarget = cM.centroid(focusedImageTarget, [maxLocTarget], int(round(subArrayBoxSizeTarget/2)), workflow = 'cameraOrigin')
+        cM.checkCentroids(centroidTarget, [maxLocTarget], 'target pinhole', consoleLog, logFile)
+        xCenGMSTarget, yCenGMSTarget = centroidTarget['x'][0], centroidTarget['y'][0]
         
         #Find distance in um to CCD Origin  
         DeltaX_SBIGXL_Target = (xCenGMSTarget + xOffsetTarget) * pixelSize
@@ -16,7 +16,7 @@ from tkinter.ttk import Separator
 from fileAndArrayHandling import fileAndArrayHandling
 from centroidFIF import centroidFIF
 from CCDOpsPlanetMode import CCDOpsPlanetMode
-from alternateCentroidMethods import gmsCentroid
+from centroidMethods import centroidMethods
 ################################################################################################
 
 class cs5Offsets(object):
@@ -196,10 +196,11 @@ class cs5Offsets(object):
         ###########################################################################
         ###Centroid Pinhole
         ###########################################################################
-        #Use alternate methods to centroid pinhole image
-        #    gmsCentroid: Gaussian Marginal Sum (GMS) Centroid Method.
-        xCenGMS, yCenGMS, xErrGMS, yErrGMS = gmsCentroid(imageArray4D[0], maxLoc[1], maxLoc[0], 
-                                                         int(round(cF.widthOfSubimage/2)), int(round(cF.widthOfSubimage/2)), axis='both', verbose=False)
+        #Centroid pinhole image (method from centroidMethods.workflowMethods)
+        cM = centroidMethods()
+        centroid = cM.centroid(imageArray4D[0], [maxLoc], int(round(cF.widthOfSubimage/2)), workflow = 'cs5Offsets')
+        cM.checkCentroids(centroid, [maxLoc], 'illuminated dowel pinhole', consoleLog, logFile)
+        xCenGMS, yCenGMS, xErrGMS, yErrGMS = centroid['x'][0], centroid['y'][0], centroid['xErr'][0], centroid['yErr'][0]
         
         ###########################################################################
         ###Change button text and color
@@ -11,6 +11,15 @@ images to arrays, and converts images to arrays.
 Modules:
 openAllFITSImagesInDirectory
     This function convertsFITs type images to a 4D array.
+    With lazy = True a memory-mapped fitsImageStack is returned instead, and
+    frames are only decoded when they are indexed.
+    With workers > 1 the FITS files are decoded concurrently by a thread pool.
+    With cache = True decoded frames are kept in an imageStackCache for re-analysis.
+    Planet mode subframes of different sizes are returned as a raggedImageStack.
+openFocusedFITSImageInDirectory
+    Decode only the focused (middle) image of a directory, for centroiding.
+benchmarkDirectoryLoad
+    Compare serial and parallel load times on a synthetic directory of FITS images.
 openDir
     This function creates an open directory dialogue box and returns the name of the user selected directory.
 '''
@@ -20,10 +29,16 @@ from numpy import array
 from glob import glob
 from astropy.io import fits
 from tkinter import filedialog
-import os, errno, re, math
+from concurrent.futures import ThreadPoolExecutor
+import os, errno, re, math, tempfile
+import numpy as np
 import tkinter as tk
 import time
 from focusCurve import focusCurve
+from fitsImageStack import fitsImageStack
+from imageStackCache import imageStackCache
+from raggedImageStack import raggedImageStack
+from fitsHeaderIndex import fitsHeaderIndex
 ################################################################################################
 
 class fileAndArrayHandling(object):
@@ -33,25 +48,133 @@ class fileAndArrayHandling(object):
         Constructor
         '''
         
-    def openAllFITSImagesInDirectory(self):
+    #Default number of threads used to decode FITS files (1 = serial). Frames come back
+    #in file list order and identical to a serial decode (benchmarkDirectoryLoad checks this)
+    decodeWorkers = min(4, os.cpu_count() or 1)
+    
+    #Keep decoded frames in a per-directory imageStackCache (for re-analysing session directories)
+    cacheDecodedImages = False
+    
+    def openAllFITSImagesInDirectory(self, lazy = False, dirLocation = None, workers = None, cache = None):
         '''
         Open multiple images and save them to a numpy array
+        
+        lazy - if True, return a fitsImageStack that memory-maps each FITS file and
+               only decodes a frame when it is indexed (imageArray4D[i]). It keeps the
+               imageArray4D[i] / imageArray4D.shape[0] interface of the numpy array.
+        dirLocation - directory to open. If None, ask the user with a dialogue box.
+        workers - number of threads used to decode the FITS files. Frames are always
+                  returned in (sorted) file list order. Default is decodeWorkers.
+        cache - if True, return a cachedImageStack: frames are opened memory-mapped from
+                the directory's .imageStackCache and only decoded (then cached) the
+                first time they are used. Default is cacheDecodedImages.
         '''
         ###########################################################################
         ###Open image file
         ###########################################################################
-        try:
-            dirLocation = self._openDir()
-        except IOError:
-            print('The directory could not be opened, or no directory was selected.')
-        filelist = glob(dirLocation + '/*.*')
-        fitsImages = [fits.getdata(image) for image in filelist]
+        if dirLocation is None:
+            try:
+                dirLocation = self._openDir()
+            except IOError:
+                print('The directory could not be opened, or no directory was selected.')
+        filelist = sorted(glob(dirLocation + '/*.*'))
+        
+        ###########################################################################
+        ###Cached stack: decoded frames are reused between analyses
+        ###########################################################################
+        if cache is None:
+            cache = self.cacheDecodedImages
+        if cache == True:
+            return imageStackCache().open(filelist), filelist
+        
+        ###########################################################################
+        ###Lazy stack: frames are decoded on demand
+        ###########################################################################
+        if lazy == True:
+            return fitsImageStack(filelist), filelist
+        fitsImages = self._decodeFITSFiles(filelist, workers)
+        
+        ###########################################################################
+        ###Frames of different sizes (planet mode subframes) go in a ragged stack
+        ###(array() would silently build a slow object array)
+        ###########################################################################
+        if len(set(image.shape for image in fitsImages)) > 1:
+            headers = fitsHeaderIndex().directory(filelist)
+            return raggedImageStack(fitsImages, [headers[os.path.abspath(image)] for image in filelist]), filelist
         
         ###########################################################################
         ###Convert images to 4D numpy array
         ###########################################################################
         return array(fitsImages), filelist
     
+    def openFocusedFITSImageInDirectory(self, dirLocation = None):
+        '''
+        Open only the focused image in a directory.
+        
+        The centroid workflows only use imageArray4D[round(len(filelist)/2)], so the
+        target frame is resolved from the file list and only that file is decoded.
+        Its header is read through the fitsHeaderIndex by readFitsHeader.
+        
+        Returns (focused image (2D numpy array), filelist, index of the focused image)
+        '''
+        imageStack, filelist = self.openAllFITSImagesInDirectory(lazy = True, dirLocation = dirLocation)
+        focusedIndex = round(len(filelist)/2) #select a focused image from array
+        return imageStack[focusedIndex], filelist, focusedIndex
+    
+    def _decodeFITSFiles(self, filelist, workers = None):
+        '''
+        Decode a list of FITS files, serially or with a thread pool.
+        
+        Decoding (file I/O and the big-endian to native conversion) happens
+        outside the GIL, so threads overlap well. pool.map returns the frames
+        in the same order as filelist.
+        '''
+        if workers is None:
+            workers = self.decodeWorkers
+        if workers <= 1 or len(filelist) <= 1:
+            return [fits.getdata(image) for image in filelist]
+        with ThreadPoolExecutor(max_workers = workers) as pool:
+            return list(pool.map(fits.getdata, filelist))
+    
+    def benchmarkDirectoryLoad(self, numberOfFrames = 30, workers = 4, frameShape = (2048, 3072), repeats = 3):
+        '''
+        Write a synthetic directory of 16-bit FITS images (STXL-6303 sized by default),
+        then time serial and parallel loads of it with openAllFITSImagesInDirectory.
+        
+        One untimed load warms the page cache first, then serial and parallel loads
+        alternate (which one goes first alternates too) and the best of repeats is kept,
+        so neither path is timed against a colder cache than the other.
+        
+        Returns (serial seconds, parallel seconds).
+        '''
+        with tempfile.TemporaryDirectory() as tempDir:
+            ###########################################################################
+            ###Create synthetic directory
+            ###########################################################################
+            rng = np.random.RandomState(0)
+            for ii in range(numberOfFrames):
+                image = rng.randint(900, 1100, size = frameShape).astype(np.uint16)
+                fits.PrimaryHDU(image).writeto(os.path.join(tempDir, str(ii*10) + '.fit'))
+            
+            ###########################################################################
+            ###Warm up, then time serial and parallel loads in alternating order
+            ###########################################################################
+            serialArray, _ = self.openAllFITSImagesInDirectory(dirLocation = tempDir, workers = 1)
+            times = {1: np.inf, workers: np.inf}
+            for repeat in range(repeats):
+                order = (1, workers) if repeat % 2 == 0 else (workers, 1)
+                for numberOfWorkers in order:
+                    startTime = time.perf_counter()
+                    loadedArray, _ = self.openAllFITSImagesInDirectory(dirLocation = tempDir, workers = numberOfWorkers)
+                    times[numberOfWorkers] = min(times[numberOfWorkers], time.perf_counter() - startTime)
+                    if not np.array_equal(serialArray, loadedArray):
+                        raise Exception('Parallel FITS decode did not match the serial decode.')
+            serialTime, parallelTime = times[1], times[workers]
+        
+        print('Loaded ' + str(numberOfFrames) + ' frames: serial ' + format(serialTime, '.3f') + ' s, ' + 
+              str(workers) + ' workers ' + format(parallelTime, '.3f') + ' s (best of ' + str(repeats) + ')')
+        return serialTime, parallelTime
+    
     def _openDir(self):
         '''
         Create open directory dialogue box
@@ -161,10 +284,11 @@ class fileAndArrayHandling(object):
         ########################################################################### 
         self.pageLogging(consoleLog, logFile, '\n' + str(title), doubleSpaceWithTime = False)
         if printNominalDicts == True:
-            fC = focusCurve()
-            for key,value in dict.items():
+            #nominal Z of every entry in one call
+            nominalZ = focusCurve().asphericFocalCurve([value[0] for value in dict.values()], [value[1] for value in dict.values()])
+            for (key,value), valueZ in zip(dict.items(), nominalZ):
                 self.pageLogging(consoleLog, logFile, str(key) + ": " + str(self.to_precision(value[0], 6)) + ' ' + str(self.to_precision(value[1], 6)) + ', ' +
-                                  str(self.to_precision(fC.asphericFocalCurve(dict[str(key)][0], dict[str(key)][1]), 6)), doubleSpaceWithTime = False)
+                                  str(self.to_precision(valueZ, 6)), doubleSpaceWithTime = False)
                 
     def to_precision(self, x, p):
         '''
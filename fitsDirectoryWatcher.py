@@ -0,0 +1,189 @@
+'''
+@title fitsDirectoryWatcher
+@author: agent
+Updated on Oct 18, 2026
+Created on Oct 18, 2026
+
+fitsDirectoryWatcher
+This module watches a directory (usually one made by fileAndArrayHandling.createDir)
+while CCDOps is writing a sweep into it. Each new FITS file is processed as soon as
+it is completely written: the header is indexed, the focus metrics (standard
+deviation and the focusMetrics metrics) are computed and the pinhole peak is located. When the sweep is over
+only the focus curve fit is left to do.
+
+A file counts as completely written when its size has not changed between two
+polls and it is at least as long as its header says (header + NAXIS1*NAXIS2 pixels).
+
+Modules:
+start
+    Start polling the directory in a background thread.
+stop
+    Stop polling, process any files that are still waiting, and return the results.
+metricList
+    Return one precomputed metric per file of a file list (or None if any is missing).
+errorMessages
+    Return a message for every file that could not be processed.
+'''
+
+# Import #######################################################################################
+import os, threading
+from glob import glob
+from fitsHeaderIndex import fitsHeaderIndex
+from fitsImageStack import fitsImageStack
+from nativeFITSReader import nativeFITSReader
+from focusCurve import focusCurve
+from focusMetrics import focusMetrics
+from centroidFIF import centroidFIF
+################################################################################################
+
+class fitsDirectoryWatcher(object):
+
+    #Seconds between directory polls
+    pollInterval = 0.5
+
+    def __init__(self, dirLocation, frameCallback = None, onError = None):
+        '''
+        Constructor
+
+        dirLocation - directory to watch
+        frameCallback - optional function called as frameCallback(fileName, result)
+                        after each frame is processed
+        onError - optional function called as onError(fileName, error) when a file can
+                  not be processed. It runs in the polling thread, so a Tk caller must
+                  marshal it to the GUI thread. Errors are also kept in errors (see
+                  errorMessages) for the caller to log after stop().
+        '''
+        self.dirLocation = os.path.abspath(dirLocation)
+        self.frameCallback = frameCallback
+        self.onError = onError
+        self.results = {}
+        self.errors = {}
+        self._lastSizes = {}
+        self._lock = threading.Lock()
+        self._stopEvent = threading.Event()
+        self._thread = None
+
+    def start(self):
+        '''
+        Start polling the directory in a background thread.
+        '''
+        self._stopEvent.clear()
+        self._thread = threading.Thread(target = self._watch)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        '''
+        Stop polling, then process every remaining file in the directory
+        (the sweep is over, so files no longer need to be checked for stable size).
+
+        Returns the results dictionary:
+            {absolute file name: {'mtime', 'size', 'header', 'mean', 'std', 'maxLoc'}}
+        '''
+        self._stopEvent.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._scan(final = True)
+        return self.results
+
+    def metricList(self, filelist, metric = 'std'):
+        '''
+        Return [result[metric] for each file in filelist], or None if any file was
+        not processed (or has changed since it was processed).
+        '''
+        metrics = []
+        with self._lock:
+            for fileName in filelist:
+                result = self.results.get(os.path.abspath(fileName))
+                if result is None or not self._isCurrent(os.path.abspath(fileName), result):
+                    return None
+                metrics.append(result[metric])
+        return metrics
+
+    def errorMessages(self):
+        '''
+        Return a message for every file that could not be processed (at its last attempt).
+        '''
+        with self._lock:
+            return ['fitsDirectoryWatcher could not process ' + str(fileName) + ': ' + str(error)
+                    for fileName, error in sorted(self.errors.items())]
+
+    def _watch(self):
+        '''
+        Polling loop run in the background thread.
+        '''
+        while not self._stopEvent.is_set():
+            self._scan()
+            self._stopEvent.wait(self.pollInterval)
+
+    def _scan(self, final = False):
+        '''
+        Process every completely written FITS file that has not been processed yet.
+        '''
+        if not os.path.isdir(self.dirLocation):
+            return
+        for fileName in sorted(glob(self.dirLocation + '/*.*')):
+            with self._lock:
+                result = self.results.get(fileName)
+                if result is not None and self._isCurrent(fileName, result):
+                    continue
+            if final or self._isComplete(fileName):
+                try:
+                    self._processFrame(fileName)
+                except Exception as err:
+                    #not a FITS file, or still being written; try again on the next poll
+                    with self._lock:
+                        self.errors[fileName] = err
+                    if self.onError is not None:
+                        self.onError(fileName, err)
+                else:
+                    with self._lock:
+                        self.errors.pop(fileName, None)
+
+    def _isComplete(self, fileName):
+        '''
+        True once the file size is stable between polls and covers the whole data unit.
+        '''
+        try:
+            size = os.path.getsize(fileName)
+        except OSError:
+            return False
+        lastSize = self._lastSizes.get(fileName)
+        self._lastSizes[fileName] = size
+        if lastSize != size:
+            return False
+        try:
+            header, offset = nativeFITSReader().readHeader(fileName)
+        except (IOError, OSError, UnicodeError):
+            return False
+        bytesPerPixel = abs(int(header.get('BITPIX', 16)))//8
+        return size >= offset + int(header.get('NAXIS1', 0))*int(header.get('NAXIS2', 0))*bytesPerPixel
+
+    def _isCurrent(self, fileName, result):
+        '''
+        True if the file has not changed since its result was computed.
+        '''
+        try:
+            stat = os.stat(fileName)
+        except OSError:
+            return False
+        return stat.st_mtime == result['mtime'] and stat.st_size == result['size']
+
+    def _processFrame(self, fileName):
+        '''
+        Frame level work: header parse, focus metrics and peak location.
+        '''
+        stat = os.stat(fileName)
+        header = fitsHeaderIndex().header(fileName)
+        frame = fitsImageStack([fileName])[0]
+        _, mean, std = focusCurve().frameStatistics(frame)
+        _, _, maxLoc = centroidFIF().findFIFInImage(frame)
+        result = {'mtime': stat.st_mtime, 'size': stat.st_size, 'header': header,
+                  'mean': mean, 'std': std, 'maxLoc': maxLoc}
+        result.update(focusMetrics().frameMetrics(frame, maxLoc))
+        with self._lock:
+            self.results[fileName] = result
+        if self.frameCallback is not None:
+            self.frameCallback(fileName, result)
@@ -0,0 +1,122 @@
+'''
+@title fitsHeaderIndex
+@author: agent
+Updated on Oct 18, 2026
+Created on Oct 18, 2026
+
+fitsHeaderIndex
+This module holds a header-only index of the FITS files in a directory.
+The keywords used by the metrology software (binning, planet mode sub frame
+origin, pixel size, image size and exposure time) are parsed once per file,
+stored in a sidecar file in the image directory, and served from memory for
+every later lookup. A cached entry is re-read only if the file's modification
+time or size has changed. Headers are read with fits.getheader, which closes
+the file, so no file handles are left open.
+
+Modules:
+header
+    Return the indexed header keywords of a single FITS file.
+directory
+    Return the indexed header keywords of every FITS file in a list (or directory).
+'''
+
+# Import #######################################################################################
+import os, json, threading
+from glob import glob
+from astropy.io import fits
+################################################################################################
+
+class fitsHeaderIndex(object):
+
+    #Header keywords kept in the index
+    headerKeywords = ('XBINNING', 'YBINNING', 'XORGSUBF', 'YORGSUBF', 'XPIXSZ', 'NAXIS1', 'NAXIS2', 'EXPTIME')
+
+    #Sidecar file written in each image directory (leading '.' keeps it out of glob('*.*'))
+    sidecarName = '.fitsHeaderIndex.json'
+
+    #In-memory index shared by every instance: {directory: {file name: entry}}
+    _directoryIndexes = {}
+    _lock = threading.RLock()
+
+    def __init__(self):
+        '''
+        Constructor
+        '''
+
+    def header(self, fileName):
+        '''
+        Return a dictionary of the indexed header keywords for fileName.
+        Keywords that are not in the header are returned as None.
+        '''
+        return self.directory([fileName])[os.path.abspath(fileName)]
+
+    def directory(self, filelist):
+        '''
+        Return {absolute file path: header keyword dictionary} for every file in filelist.
+        filelist may also be a directory name, in which case glob(dir + '/*.*') is used.
+        '''
+        if isinstance(filelist, str) and os.path.isdir(filelist):
+            filelist = sorted(glob(filelist + '/*.*'))
+
+        headers = {}
+        dirtyDirectories = set()
+        with self._lock:
+            for fileName in filelist:
+                fileName = os.path.abspath(fileName)
+                dirName, baseName = os.path.split(fileName)
+                index = self._loadDirectory(dirName)
+
+                ###########################################################################
+                ###Re-read the header only if the file has changed
+                ###########################################################################
+                stat = os.stat(fileName)
+                entry = index.get(baseName)
+                if entry is None or entry['mtime'] != stat.st_mtime or entry['size'] != stat.st_size:
+                    entry = {'mtime': stat.st_mtime, 'size': stat.st_size, 'header': self._readHeader(fileName)}
+                    index[baseName] = entry
+                    dirtyDirectories.add(dirName)
+                headers[fileName] = entry['header']
+
+            for dirName in dirtyDirectories:
+                self._writeSidecar(dirName)
+        return headers
+
+    def _readHeader(self, fileName):
+        '''
+        Parse the indexed keywords from the primary header of a FITS file.
+        '''
+        hdr = fits.getheader(fileName)
+        header = {}
+        for keyword in self.headerKeywords:
+            value = hdr.get(keyword)
+            if not isinstance(value, (int, float, str, bool)):
+                value = None
+            header[keyword] = value
+        return header
+
+    def _loadDirectory(self, dirName):
+        '''
+        Return the in-memory index for a directory, loading the sidecar file the first time.
+        '''
+        if dirName not in self._directoryIndexes:
+            index = {}
+            try:
+                with open(os.path.join(dirName, self.sidecarName), 'r') as sidecar:
+                    index = json.load(sidecar).get('files', {})
+            except (IOError, OSError, ValueError):
+                index = {}
+            self._directoryIndexes[dirName] = index
+        return self._directoryIndexes[dirName]
+
+    def _writeSidecar(self, dirName):
+        '''
+        Save the index for a directory. A directory that can not be written to
+        (read only media, etc.) keeps its index in memory only.
+        '''
+        sidecarPath = os.path.join(dirName, self.sidecarName)
+        try:
+            with open(sidecarPath + '.tmp', 'w') as sidecar:
+                json.dump({'files': self._directoryIndexes[dirName]}, sidecar)
+            os.replace(sidecarPath + '.tmp', sidecarPath)
+        except (IOError, OSError):
+            pass
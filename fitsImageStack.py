@@ -0,0 +1,147 @@
+'''
+@title fitsImageStack
+@author: agent
+Updated on Oct 18, 2026
+Created on Oct 18, 2026
+
+fitsImageStack
+This module holds a lazy, memory-mapped stack of FITS images. It behaves like
+the 4D numpy array returned by openAllFITSImagesInDirectory (imageArray4D[i],
+imageArray4D.shape[0], len(imageArray4D)), but a frame is only read from disk
+and decoded when it is indexed. Peak memory therefore tracks the frames in use
+rather than the whole directory.
+
+Modules:
+__getitem__
+    Decode and return a single frame (2D numpy array) from its FITS file.
+shape
+    (number of frames, rows, columns), taken from the first FITS header.
+frameShape
+    (rows, columns) of a given frame, read from its header only.
+section
+    Read only a row/column section (optionally decimated) of a frame from disk.
+'''
+
+# Import #######################################################################################
+import numpy as np
+from astropy.io import fits
+from fitsHeaderIndex import fitsHeaderIndex
+from nativeFITSReader import nativeFITSReader
+################################################################################################
+
+class fitsImageStack(object):
+
+    #Read simple SBIG/CCDOps files with nativeFITSReader instead of astropy
+    #(anything nativeFITSReader can not map directly still goes through astropy)
+    useNativeReader = False
+
+    def __init__(self, filelist):
+        '''
+        Constructor
+
+        filelist - list of FITS file paths, one per frame (same order as imageArray4D)
+        '''
+        self.filelist = list(filelist)
+        self._frameShapes = {}
+
+    def __len__(self):
+        return len(self.filelist)
+
+    def __getitem__(self, index):
+        '''
+        Decode and return a single frame.
+
+        Integer indexes return a 2D numpy array. Slices return a new fitsImageStack
+        so that nothing is decoded until a frame is actually used.
+        '''
+        if isinstance(index, slice):
+            subStack = fitsImageStack(self.filelist[index])
+            subStack.useNativeReader = self.useNativeReader
+            return subStack
+        return self._readFrame(self._normalizeIndex(index))
+
+    def __iter__(self):
+        for ii in range(len(self.filelist)):
+            yield self._readFrame(ii)
+
+    def __array__(self, dtype = None, copy = None):
+        '''
+        Decode every frame into a 3D numpy array (only used if a caller
+        explicitly asks for the whole stack with numpy.array(stack)).
+        '''
+        stack = np.array([frame for frame in self])
+        if dtype is not None:
+            stack = stack.astype(dtype)
+        return stack
+
+    @property
+    def shape(self):
+        '''
+        (number of frames, rows, columns). Rows and columns come from the
+        header of the first frame.
+        '''
+        if len(self.filelist) == 0:
+            return (0,)
+        return (len(self.filelist),) + self.frameShape(0)
+
+    def frameShape(self, index):
+        '''
+        Return (rows, columns) for a frame from its header (no data is read).
+        Headers come from the fitsHeaderIndex.
+        '''
+        index = self._normalizeIndex(index)
+        if index not in self._frameShapes:
+            header = fitsHeaderIndex().header(self.filelist[index])
+            self._frameShapes[index] = (int(header['NAXIS2']), int(header['NAXIS1']))
+        return self._frameShapes[index]
+
+    def section(self, index, rows = slice(None), columns = slice(None)):
+        '''
+        Read only a section of a frame: image[rows, columns].
+        
+        rows, columns - slice objects (steps are allowed, e.g. slice(None, None, 8)
+                        for a cheap decimated read)
+        
+        Only the memory-mapped pages that hold the requested rows are read from
+        disk, so a small box around the pinhole costs a small fraction of a full
+        frame decode.
+        '''
+        index = self._normalizeIndex(index)
+        if self.useNativeReader == True:
+            image = nativeFITSReader().open(self.filelist[index])
+            if image is not None:
+                return image[rows, columns]
+        with fits.open(self.filelist[index], memmap = True, do_not_scale_image_data = True) as hdul:
+            return self._scaleData(hdul[0].data[rows, columns], hdul[0].header)
+    
+    def _normalizeIndex(self, index):
+        '''
+        Allow negative indexes (imageArray4D[ii-1] is used with ii = 0).
+        '''
+        index = int(index)
+        if index < 0:
+            index += len(self.filelist)
+        if index < 0 or index >= len(self.filelist):
+            raise IndexError('Frame index ' + str(index) + ' is out of range for a stack of ' + str(len(self.filelist)) + ' frames.')
+        return index
+
+    def _readFrame(self, index):
+        '''
+        Memory-map a FITS file and decode its primary data unit.
+
+        The file is closed before returning, so no file handles are left open.
+        '''
+        frame = self.section(index)
+        self._frameShapes[index] = frame.shape
+        return frame
+    
+    def _scaleData(self, raw, header):
+        '''
+        Apply BZERO/BSCALE to raw (big-endian) FITS data and return a native-endian copy.
+        
+        astropy refuses to memory-map scaled images, so the files are opened with
+        do_not_scale_image_data = True and the scaling is applied here instead. The
+        usual SBIG/CCDOps 16-bit case (BZERO = 32768, BSCALE = 1) becomes a uint16 frame,
+        the same as fits.getdata returns.
+        '''
+        return nativeFITSReader().scaleData(raw, header)
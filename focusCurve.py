@@ -11,25 +11,45 @@ Modules:
 stdFocusCurve
     Accepts a 4D numpy array and plots standard deviations of the images.
     Note: assumes filenames are distances (int)
+metricFocusCurve
+    Accepts a 4D numpy array and plots a focus curve of any focusMetrics metric (by name).
+fitFocusCurve
+    Fit and plot a focus curve from one focus metric value per image.
+frameStatistics
+    Single pass (Welford-style) count, mean and standard deviation of an image.
+streamFrameStatistics
+    Yield frameStatistics for an iterator of frames (arrays, lazy stacks or file paths).
 fileNameToInt
     Create x values by remove extension from filenames and converting them to ints
 zipAndSort
     Zip xx and yy values into array of tulups
     Sort list by distance (x) so xx (distances) are in the proper order in the plot
+bootstrapBestFocus
+    Bootstrap distribution of best focus (vectorized, optionally over a process pool)
+linearIntercept
+    Linear fit the left and right sides of a focus curve and find their intercept (best focus) and its error
 xyPolyFit
     Calculate polynomial fit (order given)
     Calculate new x's and y's for plotting
     Find slope = 0 for fit, this will be used to split the data to a left and right liner fit
     Find the first derivative of the poly1d
     Solve deriv =ax + b for deriv = 0 (point of best focus)
+asphericFocalCurve
+    Nominal Z of the aspheric focal surface at (x, y) (numbers or numpy arrays, optional lookup table)
+benchmarkAsphericFocalCurve
+    Time asphericFocalCurve per point, on arrays, and with the lookup table
 '''
 
 # Import #######################################################################################
 import numpy as np
 import matplotlib.pyplot as py
 import os, time, math
+from concurrent.futures import ProcessPoolExecutor
 from os.path import basename
 from operator import itemgetter
+from fitsImageStack import fitsImageStack
+from imagePrecision import imagePrecision
+from focusMetrics import focusMetrics
 ################################################################################################
         
 class focusCurve(object):
@@ -52,6 +72,19 @@ class focusCurve(object):
         #Ratio = 11.908 when using A,B,C actuators directly
     #micrometerDistance = 220 #mm for micrometers
     micrometerDistance = 168 #mm for probe
+    
+    #Aspheric focal surface (ZEMAX 10th order even asphere): 1/c (mm) and r^4, r^6, r^8, r^10 terms
+    asphereInverseCurvature = -4977.99
+    asphereCoefficients = (-0.00000000029648, 0.0000000000000034523, -1.8042E-20, 3.2571E-26)
+    
+    #asphericFocalCurve lookup table: radius range (mm) and number of nodes (uniform in r^2)
+    asphereLookupRadius = 420.0
+    asphereLookupNodes = 4097
+    _asphereTable = None
+    
+    #bootstrapBestFocus resamples and confidence interval
+    bootstrapResamples = 5000
+    bootstrapConfidence = 0.95
 
     #Dict of (x,y) for FIF centers (mm)
     fifLocationsCS5 = {"RefFIF" : (199.28,-345.15), 
@@ -134,71 +167,149 @@ class focusCurve(object):
         Constructor
         '''
 
-    def stdFocusCurve(self, fiflabel, imageArray4D, filelist, pointLabel = ""):
+    def stdFocusCurve(self, fiflabel, imageArray4D, filelist, pointLabel = "", frameStds = None):
         '''
         Accepts a 4D numpy array and plots standard deviations of the images.
         note: assumes filenames are distances (int)
-        '''
         
+        imageArray4D can be anything that iterates over frames: a numpy array, a lazy
+        fitsImageStack, or a list of FITS file paths. Frames are processed one at a
+        time, so a focus sweep of any length runs in constant memory.
+        
+        frameStds - standard deviations already computed while the sweep was being
+                    taken (see fitsDirectoryWatcher.metricList). If given, the images
+                    are not read again.
+        '''
         ###########################################################################
-        ###Turn interactive plotting off
+        ###Get stds (one pass per frame, no flatten copies)
         ###########################################################################
-        py.ioff()
-
+        if frameStds is not None:
+            stdList = np.array(frameStds)
+        else:
+            stdList = np.array([frameStd for _, _, frameStd in self.streamFrameStatistics(imageArray4D)])
+        
+        return self.fitFocusCurve(fiflabel, stdList, filelist, pointLabel = pointLabel)
+    
+    def metricFocusCurve(self, fiflabel, imageArray4D, filelist, metric = 'hfd', pointLabel = "", frameMetrics = None,
+                         consoleLog = None, logFile = None):
+        '''
+        Accepts a 4D numpy array and plots a focus curve of one focusMetrics metric.
+        note: assumes filenames are distances (int)
+        
+        metric - focusMetrics metric name ('roiStd', 'hfd', 'fwhm', 'brenner',
+                 'laplacianVariance' or 'peakFluxRatio')
+        frameMetrics - metric values already computed while the sweep was being taken
+                       (see fitsDirectoryWatcher.metricList). If given, the images
+                       are not read again.
+        consoleLog, logFile - where to log frames left out of the fit (see fitFocusCurve)
+        '''
+        if metric not in focusMetrics.metricLabels:
+            raise Exception("Unknown focus metric '" + str(metric) + "', must be one of " + str(list(focusMetrics.metricLabels)))
+        
         ###########################################################################
-        ###Initialize std array
+        ###Get metrics (every metric from one ROI per frame)
         ###########################################################################
-        stdList = np.zeros(imageArray4D.shape[0])
-
+        if frameMetrics is not None:
+            metricList = np.array(frameMetrics)
+        else:
+            metricList = focusMetrics().sweepMetrics(imageArray4D)[metric]
+        
+        return self.fitFocusCurve(fiflabel, metricList, filelist, pointLabel = pointLabel, metricLabel = metric,
+                                  consoleLog = consoleLog, logFile = logFile)
+    
+    def fitFocusCurve(self, fiflabel, metricList, filelist, pointLabel = "", metricLabel = 'Standard Deviation', bootstrapResamples = 0,
+                      consoleLog = None, logFile = None):
+        '''
+        Fit and plot a focus curve from one focus metric value per image (same order as filelist).
+        note: assumes filenames are distances (int)
+        
+        metricLabel - plot label, or a focusMetrics metric name (then metricList can
+                      also be a focusMetrics.sweepMetrics array)
+        bootstrapResamples - if > 0, add the bootstrapBestFocus confidence interval to the plot
+        consoleLog, logFile - where to log a warning for frames left out of the fit
+                              (printed if not given)
+        
+        Frames whose metric is not finite (e.g. NaN focusMetrics values of faint
+        frames) are left out of the fit. Raises an exception if fewer than two
+        points are left on either side of the best focus.
+        '''
+        if metricLabel in focusMetrics.metricLabels:
+            if getattr(metricList, 'dtype', None) is not None and metricList.dtype.names:
+                metricList = metricList[metricLabel]
+            metricLabel = focusMetrics.metricLabels[metricLabel]
+        
         ###########################################################################
-        ###Get stds
+        ###Turn interactive plotting off
         ###########################################################################
-        for image in range(imageArray4D.shape[0]):
-            flattenedArray = imageArray4D[image].flatten()
-            stdList[image] = np.std(flattenedArray)
+        py.ioff()
         
         ###########################################################################
         ###Create x values by remove extension from filenames and converting them to ints
         ###########################################################################
         xx = self.fileNameToInt(filelist)
         
+        ###########################################################################
+        ###Leave out frames without a metric value
+        ###########################################################################
+        finite = np.isfinite(np.asarray(metricList, dtype = np.float64))
+        if not finite.all():
+            message = (str(metricLabel) + " could not be measured at " + ', '.join(str(xx[ii]) for ii in np.flatnonzero(~finite)) +
+                       " um. These images are left out of the " + str(fiflabel) + " focus curve.")
+            if consoleLog is not None:
+                #imported here because fileAndArrayHandling imports focusCurve
+                from fileAndArrayHandling import fileAndArrayHandling
+                fileAndArrayHandling().pageLogging(consoleLog, logFile, message, warning = True)
+            else:
+                print(message)
+            xx = [xx[ii] for ii in np.flatnonzero(finite)]
+            metricList = [metricList[ii] for ii in np.flatnonzero(finite)]
+        if len(xx) < 4:
+            raise Exception("Only " + str(len(xx)) + " images with a measured " + str(metricLabel) +
+                            ", at least 4 are needed to fit the " + str(fiflabel) + " focus curve.")
+        
         ###########################################################################
         ###Best fit (poly order=2)
         ###########################################################################     
-        #zip xx and yy = std values into array of tulups
+        #zip xx and yy = metric values into array of tulups
         #sort list by distance (x) so xx (distances) are in the proper order in the plot
-        sortedX, sortedY  = self.zipAndSort(xx, stdList)
+        sortedX, sortedY  = self.zipAndSort(xx, metricList)
         
         ###########################################################################
         ###Calculate new x's and y's, poly fuct, and best focus (xSplitPoint)
         ###########################################################################     
         xFit, yFit, f2, xSplitPoint = self.xyPolyFit(sortedX, sortedY, 2)
+        numberLeft = sum(1 for kk in sortedX if kk <= xSplitPoint)
+        if min(numberLeft, len(sortedX) - numberLeft) < 2:
+            raise Exception("The " + str(fiflabel) + " focus curve has " + str(numberLeft) + " images left and " +
+                            str(len(sortedX) - numberLeft) + " right of its turning point (" + format(xSplitPoint, '.1f') +
+                            " um), at least 2 are needed on each side.")
         
         ###########################################################################
         ###Find Best Focus
         ########################################################################### 
         #get separate X and Y lists from sorted data
         sortedXL = [kk for kk in sortedX if kk <= xSplitPoint]
-        sortedYL = sortedY[:len(sortedXL)]
         sortedXR = sortedX[len(sortedXL):]
-        sortedYR = sortedY[len(sortedXL):]
         
-        #linear fit each side
-        mL, bL = np.polyfit(sortedXL, sortedYL, 1) #left
-        mR, bR = np.polyfit(sortedXR, sortedYR, 1) #right
-        
-        #find intercept of the linear fits
-        # want position where XL = XR and YL = YR using y =mx +b:
-        # mL*sortedXL + bL = mR*sortedXR + bR
-        xInter = (bR-bL)/(mL-mR)
-        yInter = mL*xInter +bL
+        #linear fit each side and find the intercept of the linear fits
+        xInter, yInter, _, (mL, bL), (mR, bR) = self.linearIntercept(sortedX, sortedY, xSplitPoint)
         
         #add intercept point to x and y value sets
         sortedXL.append(xInter)
         sortedXR.append(xInter)
         
         ###########################################################################
-        ###Plot stds
+        ###Best focus distribution (optional)
+        ########################################################################### 
+        bootstrapText = ''
+        if bootstrapResamples > 0:
+            bootstrap = self.bootstrapBestFocus(sortedX, sortedY, bootstrapResamples)
+            bootstrapText = ('\nBootstrap Best Focus = ' + format(bootstrap['bestFocus'], '.2f') + ' um, ' +
+                             format(100*self.bootstrapConfidence, '.0f') + '% interval ' + format(bootstrap['interval'][0], '.2f') +
+                             ' to ' + format(bootstrap['interval'][1], '.2f') + ' um\n')
+        
+        ###########################################################################
+        ###Plot focus metric
         ########################################################################### 
         fig2 = py.figure()
         ax2 = fig2.add_subplot(111)
@@ -206,12 +317,12 @@ class focusCurve(object):
                  sortedXL, [mL*ll+bL for ll in sortedXL], 
                  sortedXR, [mR*mm+bR for mm in sortedXR])
         py.xlabel('Local Relative Focus Position (microns)')
-        py.ylabel('Standard Deviation')
-        py.title('Standard Deviation versus Distance')
+        py.ylabel(metricLabel)
+        py.title(str(metricLabel) + ' versus Distance')
         py.text(0, 0, 'Left Linear Fit: y = ' + str(mL) + ' x + ' + str(bL) + 
              '\n\nRight Linear Fit: y = ' + str(mR) + ' x + ' + str(bR) + 
              '\n\nPolynomial Fit:\n        y = ' + str(f2) +
-             '\n\nPolynomial Fit Max Distance= ' + str(xSplitPoint)[0:3] + ' um\n', fontsize = 7, transform=ax2.transAxes)
+             '\n\nPolynomial Fit Max Distance= ' + str(xSplitPoint)[0:3] + ' um\n' + bootstrapText, fontsize = 7, transform=ax2.transAxes)
         py.grid(True)
         ax2.annotate('Best Focus = ' + str(xInter)[0:5] + ' um', xy=(xInter, yInter), 
                      xytext=(xInter+1, yInter+1), fontsize = 7,)
@@ -223,6 +334,177 @@ class focusCurve(object):
         #return best focus
         return xInter
     
+    def bootstrapBestFocus(self, xx, yy, numberOfResamples = None, seed = None, processes = None):
+        '''
+        Bootstrap distribution of best focus: the focus curve points are resampled
+        with replacement and each resample is refitted like fitFocusCurve
+        (quadratic split point, then the left/right linear intercept).
+        
+        A resample is a row of counts (how often each point was drawn), so every
+        fit is a count-weighted least squares fit, and all resamples are solved at
+        once from sums over the points (one matrix product per fit). processes > 1
+        splits the resamples over a process pool (on Windows, call this from
+        under if __name__ == '__main__').
+        
+        xx, yy - distances (um) and focus metric values
+        numberOfResamples - default is bootstrapResamples
+        
+        Returns {'bestFocus': median, 'mean', 'std', 'interval': (low, high) holding
+        bootstrapConfidence of the distribution, 'samples': best focus of every
+        usable resample, 'usable': fraction of resamples with two distinct points on
+        each side of the split}.
+        '''
+        if numberOfResamples is None:
+            numberOfResamples = self.bootstrapResamples
+        seeds = np.random.SeedSequence(seed).spawn(max(1, processes or 1))
+        sizes = np.diff(np.linspace(0, numberOfResamples, len(seeds) + 1).astype(int))
+        xx = np.asarray(xx, dtype = np.float64)
+        yy = np.asarray(yy, dtype = np.float64)
+        if len(seeds) > 1:
+            with ProcessPoolExecutor(len(seeds)) as executor:
+                samples = np.concatenate(list(executor.map(self._bootstrapSamples, [xx]*len(seeds), [yy]*len(seeds), sizes, seeds)))
+        else:
+            samples = self._bootstrapSamples(xx, yy, sizes[0], seeds[0])
+        
+        usable = samples[np.isfinite(samples)]
+        tail = 50*(1 - self.bootstrapConfidence)
+        return {'bestFocus': np.median(usable) if len(usable) else np.nan,
+                'mean': usable.mean() if len(usable) else np.nan,
+                'std': usable.std() if len(usable) else np.nan,
+                'interval': tuple(np.percentile(usable, [tail, 100 - tail])) if len(usable) else (np.nan, np.nan),
+                'samples': usable,
+                'usable': len(usable)/max(1, len(samples))}
+    
+    def _bootstrapSamples(self, xx, yy, numberOfResamples, seed):
+        '''
+        Best focus of numberOfResamples bootstrap resamples (NaN where a side has
+        fewer than two distinct points).
+        '''
+        rng = np.random.default_rng(seed)
+        counts = rng.multinomial(len(xx), np.full(len(xx), 1.0/len(xx)), size = numberOfResamples).astype(np.float64)
+        
+        #distances relative to their mean and scale (well conditioned sums)
+        center, scale = xx.mean(), max(np.ptp(xx), 1e-12)
+        x = (xx - center)/scale
+        
+        ###########################################################################
+        ###Quadratic fit of every resample, split at its turning point
+        ###########################################################################
+        design = np.column_stack((x**2, x, np.ones_like(x)))
+        normal = counts.dot((design[:, :, None]*design[:, None, :]).reshape(len(x), 9)).reshape(-1, 3, 3)
+        rhs = counts.dot(design*yy[:, None])
+        good = np.abs(np.linalg.det(normal)) > 1e-12*np.max(np.abs(normal), axis = (1, 2))**3
+        normal[~good] = np.eye(3)
+        quadratic = np.linalg.solve(normal, rhs[:, :, None])[:, :, 0]
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            split = -quadratic[:, 1]/(2*quadratic[:, 0])
+        left = x[None, :] <= split[:, None]
+        
+        ###########################################################################
+        ###Count weighted left/right linear fits from their sums
+        ###########################################################################
+        columns = np.column_stack((np.ones_like(x), x, x**2, yy, x*yy))
+        lines = []
+        for side in (left, ~left):
+            weights = counts*side
+            good &= np.count_nonzero(weights, axis = 1) >= 2
+            s0, sx, sxx, sy, sxy = weights.dot(columns).T
+            with np.errstate(divide = 'ignore', invalid = 'ignore'):
+                slope = (s0*sxy - sx*sy)/(s0*sxx - sx*sx)
+                lines.append((slope, (sy - slope*sx)/s0))
+        (mL, bL), (mR, bR) = lines
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            xInter = center + scale*(bR - bL)/(mL - mR)
+        return np.where(good, xInter, np.nan)
+    
+    def linearIntercept(self, sortedX, sortedY, xSplitPoint):
+        '''
+        Linear fit the points left (x <= xSplitPoint) and right of the split point
+        and find the intercept of the two lines (best focus).
+        sortedX, sortedY - focus curve points sorted by distance (zipAndSort)
+        
+        Returns xInter, yInter, xInterErr, (mL, bL), (mR, bR)
+        xInterErr is the 1 sigma error of xInter from the scatter of each side about
+        its line (inf if either side has fewer than 3 points).
+        '''
+        sortedX = np.asarray(sortedX, dtype = np.float64)
+        sortedY = np.asarray(sortedY, dtype = np.float64)
+        nL = int(np.searchsorted(sortedX, xSplitPoint, side = 'right'))
+        
+        ###########################################################################
+        ###Linear fit each side
+        ###########################################################################
+        mL, bL = np.polyfit(sortedX[:nL], sortedY[:nL], 1) #left
+        mR, bR = np.polyfit(sortedX[nL:], sortedY[nL:], 1) #right
+        
+        ###########################################################################
+        ###Find intercept of the linear fits
+        ###########################################################################
+        # want position where XL = XR and YL = YR using y =mx +b:
+        # mL*sortedXL + bL = mR*sortedXR + bR
+        xInter = (bR-bL)/(mL-mR)
+        yInter = mL*xInter +bL
+        
+        ###########################################################################
+        ###Intercept error: variance of each line at xInter over the slope difference
+        ###########################################################################
+        variance = 0.0
+        for xx, yy, mm, bb in ((sortedX[:nL], sortedY[:nL], mL, bL), (sortedX[nL:], sortedY[nL:], mR, bR)):
+            if len(xx) < 3:
+                variance = np.inf
+                break
+            design = np.column_stack((xx, np.ones_like(xx)))
+            scatter = np.sum((yy - (mm*xx + bb))**2)/(len(xx) - 2)
+            cov = scatter*np.linalg.inv(np.dot(design.T, design))
+            variance += cov[0, 0]*xInter**2 + 2*cov[0, 1]*xInter + cov[1, 1]
+        xInterErr = math.sqrt(variance)/abs(mL - mR)
+        
+        return xInter, yInter, xInterErr, (mL, bL), (mR, bR)
+    
+    def frameStatistics(self, frame, rowsPerBlock = 256):
+        '''
+        Return (count, mean, standard deviation) of an image in a single pass.
+        
+        The image is read in blocks of rows. Each block's mean and sum of squared
+        deviations are merged into the running totals with the parallel form of
+        Welford's algorithm (block moments from imagePrecision.blockMoments, so at
+        most one block is converted, to the imagePrecision mode's type, and sums are
+        accumulated in float64) and the image is never flattened or copied as a whole. The
+        standard deviation matches np.std (ddof = 0).
+        '''
+        frame = np.asarray(frame)
+        frame = frame.reshape(frame.shape[0], -1) if frame.ndim > 1 else frame.reshape(1, -1)
+        precision = imagePrecision()
+        count = 0
+        mean = 0.0
+        m2 = 0.0
+        for row in range(0, frame.shape[0], rowsPerBlock):
+            blockCount, blockMean, blockM2 = precision.blockMoments(frame[row:row+rowsPerBlock])
+            if blockCount == 0:
+                continue
+            
+            #merge block into running totals
+            delta = blockMean - mean
+            total = count + blockCount
+            mean += delta*blockCount/total
+            m2 += blockM2 + delta*delta*count*blockCount/total
+            count = total
+        if count == 0:
+            return 0, float('nan'), float('nan')
+        return count, mean, math.sqrt(m2/count)
+    
+    def streamFrameStatistics(self, frames):
+        '''
+        Yield (count, mean, standard deviation) for each frame of an iterator.
+        
+        Frames can be numpy arrays, items of a lazy fitsImageStack, or FITS file
+        paths (each path is memory-mapped and decoded only while it is processed).
+        '''
+        for frame in frames:
+            if isinstance(frame, str):
+                frame = fitsImageStack([frame])[0]
+            yield self.frameStatistics(frame)
+    
     def fileNameToInt(self, filelist):
         '''
         Create x values by remove extension from filenames and converting them to ints
@@ -287,7 +569,7 @@ class focusCurve(object):
         return xFit, yFit, funct, bestFocus
 
     
-    def asphericFocalCurve(self, x, y):
+    def asphericFocalCurve(self, x, y, lookup = False):
         '''
         Use ZEMAX Image surface definition, of 10th order even 
         polynomial, to find best focus nominal Z (mm) for a FIF
@@ -305,20 +587,88 @@ class focusCurve(object):
         a10 = (3.2571E-26)r^10
         
         nominalZ = a2 + a4 + a6 + a8 + a10
+        
+        x, y can be numbers or numpy arrays (any shape that broadcasts); the result
+        is a number or an array. The polynomial is evaluated with Horner's scheme in r^2.
+        lookup - interpolate in a precomputed table over r = 0 to asphereLookupRadius
+                 (faster for very large point sets, error < 0.001 um; points outside
+                 the table are evaluated exactly)
         '''
-        r = math.sqrt(math.pow(x, 2) + math.pow(y, 2))
-        inv_c = -4977.99
+        x = np.asarray(x, dtype = np.float64)
+        y = np.asarray(y, dtype = np.float64)
+        rSquared = x*x + y*y
+        if lookup:
+            nominalZ = self._asphereLookup(rSquared.reshape(-1)).reshape(rSquared.shape)
+        else:
+            nominalZ = self._asphereSag(rSquared)
+        return float(nominalZ) if nominalZ.ndim == 0 else nominalZ
+    
+    def _asphereSag(self, rSquared):
+        '''
+        Nominal Z (um) of the aspheric focal surface at r^2 (mm^2).
+        '''
+        inv_c = self.asphereInverseCurvature
+        a4, a6, a8, a10 = self.asphereCoefficients
         
         ###########################################################################
-        ###Aspheric terms
+        ###Aspheric terms (conic term, then a4..a10 with Horner's scheme in r^2)
         ###########################################################################
-        a2 = (math.pow(r, 2)/inv_c)/(1+math.sqrt(1-(math.pow(r, 2)/math.pow(inv_c, 2))))
-        a4 = -0.00000000029648*math.pow(r, 4)
-        a6 = 0.0000000000000034523*math.pow(r, 6)
-        a8 = -1.8042E-20*math.pow(r, 8)
-        a10 = 3.2571E-26*math.pow(r, 10)
+        nominalZ = (rSquared/inv_c)/(1 + np.sqrt(1 - rSquared/inv_c**2))
+        nominalZ += rSquared*rSquared*(a4 + rSquared*(a6 + rSquared*(a8 + rSquared*a10)))
         
         ###########################################################################
         ###Nominal Z in (um)
         ###########################################################################
-        return (a2 + a4 + a6 + a8 + a10) *1000 #converted from mm to microns
\ No newline at end of file
+        return nominalZ*1000 #converted from mm to microns
+    
+    def _asphereLookup(self, rSquared):
+        '''
+        Nominal Z (um) at r^2 (mm^2), linearly interpolated in a table uniform in r^2.
+        Points outside the table, or with a non-finite r^2, use _asphereSag.
+        '''
+        if focusCurve._asphereTable is None:
+            nodes = np.linspace(0, self.asphereLookupRadius**2, self.asphereLookupNodes)
+            values = self._asphereSag(nodes)
+            focusCurve._asphereTable = (1/nodes[1], values[:-1], np.diff(values))
+        inverseStep, values, slopes = focusCurve._asphereTable
+        
+        position = rSquared*inverseStep
+        outside = ~(position < len(values)) #beyond the table, or not finite (NaN, inf)
+        position[outside] = 0
+        index = position.astype(np.intp)
+        position -= index
+        nominalZ = slopes[index]
+        nominalZ *= position
+        nominalZ += values[index]
+        if outside.any():
+            nominalZ[outside] = self._asphereSag(rSquared[outside])
+        return nominalZ
+    
+    def benchmarkAsphericFocalCurve(self, numberOfPoints = 1000000, numberOfScalarPoints = 10000):
+        '''
+        Time asphericFocalCurve on numberOfPoints random (x, y) over the 420 mm field:
+        one scalar call per point (timed on numberOfScalarPoints, scaled up), array
+        evaluation, and lookup table. Returns {method: seconds}.
+        '''
+        rng = np.random.RandomState(0)
+        radius = self.asphereLookupRadius*np.sqrt(rng.uniform(0, 1, numberOfPoints))
+        angle = rng.uniform(0, 2*np.pi, numberOfPoints)
+        x, y = radius*np.cos(angle), radius*np.sin(angle)
+        self.asphericFocalCurve(x[:10], y[:10], lookup = True)
+        
+        times = {}
+        startTime = time.perf_counter()
+        scalar = [self.asphericFocalCurve(xx, yy) for xx, yy in zip(x[:numberOfScalarPoints], y[:numberOfScalarPoints])]
+        times['scalar'] = (time.perf_counter() - startTime)*numberOfPoints/numberOfScalarPoints
+        startTime = time.perf_counter()
+        exact = self.asphericFocalCurve(x, y)
+        times['array'] = time.perf_counter() - startTime
+        startTime = time.perf_counter()
+        table = self.asphericFocalCurve(x, y, lookup = True)
+        times['lookup'] = time.perf_counter() - startTime
+        
+        print(str(numberOfPoints) + ' points: scalar ' + format(times['scalar'], '.3f') + ' s (estimated), array ' +
+              format(times['array'], '.3f') + ' s, lookup ' + format(times['lookup'], '.3f') + ' s')
+        print('max difference: scalar/array ' + format(np.max(np.abs(np.array(scalar) - exact[:numberOfScalarPoints])), '.2e') +
+              ' um, lookup/array ' + format(np.max(np.abs(table - exact)), '.2e') + ' um')
+        return times
@@ -0,0 +1,171 @@
+'''
+@title focusMetrics
+@author: agent
+Updated on Oct 18, 2026
+Created on Oct 18, 2026
+
+focusMetrics
+This module computes several focus (sharpness) metrics of a pinhole image from
+one region of interest (ROI) around the pinhole, so they all come from the same
+pass over the frame. The global standard deviation used by stdFocusCurve is
+dominated by background noise for faint pinholes; the metrics below only use
+the pixels around the pinhole.
+
+The ROI is a box centered on the pinhole peak (centroidFIF.findFIFInImage).
+The background and noise are the sigma-clipped median and standard deviation of
+the frame (backgroundEstimator), and only pixels more than signalSigma noise
+above the background count as signal. The ROI starts at a half width of
+roiHalfWidth and is doubled (up to maxRoiHalfWidth) while the signal touches
+its border (the mean of the border pixels is significantly above the
+background), so a large defocused annulus is never cut off. A frame whose signal
+still touches the border of the largest ROI is flagged (roiClipped), and its
+hfd, fwhm and peakFluxRatio are NaN. sweepMetrics measures every frame of a
+sweep with the same ROI size, the one the most defocused frame needs, so ROI
+averaged metrics (roiStd, brenner, laplacianVariance) compare between frames.
+
+Metrics (the value at best focus is a maximum (max) or a minimum (min)):
+roiStd
+    Standard deviation of the ROI (max).
+hfd
+    Half flux diameter, diameter of the circle around the centroid that holds
+    half of the signal (min, pixels).
+fwhm
+    Full width at half maximum, diameter of a circle with the area of the pixels
+    above half of the peak signal (min, pixels).
+brenner
+    Brenner gradient, mean of the squared differences of pixels two apart along
+    rows and columns (max).
+laplacianVariance
+    Variance of the Laplacian of the ROI (max).
+peakFluxRatio
+    Peak signal divided by the total signal (max).
+
+Modules:
+frameMetrics
+    Compute every focus metric of one frame.
+sweepMetrics
+    Compute every focus metric of each frame of a sweep.
+'''
+
+# Import #######################################################################################
+import numpy as np
+import cv2
+from backgroundEstimator import backgroundEstimator
+################################################################################################
+
+class focusMetrics(object):
+
+    #Focus metric names and plot labels
+    metricLabels = {'roiStd': 'ROI Standard Deviation',
+                    'hfd': 'Half Flux Diameter (pixels)',
+                    'fwhm': 'FWHM (pixels)',
+                    'brenner': 'Brenner Gradient',
+                    'laplacianVariance': 'Laplacian Variance',
+                    'peakFluxRatio': 'Peak/Flux Ratio'}
+
+    #One row per frame from sweepMetrics
+    metricType = np.dtype([('row', np.int64), ('column', np.int64), ('roiHalfWidth', np.int64), ('roiClipped', np.bool_)] +
+                          [(name, np.float64) for name in metricLabels])
+
+    #Starting and largest half width of the ROI around the pinhole peak (pixels)
+    roiHalfWidth = 50
+    maxRoiHalfWidth = 400
+
+    #Pixels more than signalSigma noise above the background are signal
+    signalSigma = 3.0
+
+    def __init__(self):
+        '''
+        Constructor
+        '''
+
+    def frameMetrics(self, frame, center = None, roiHalfWidth = None):
+        '''
+        Compute every focus metric of frame.
+
+        frame - 2D numpy array
+        center - (row, column) of the pinhole, e.g. a findFIFInImage maxLoc. Default
+                 is to locate the pinhole with centroidFIF.findFIFInImage.
+        roiHalfWidth - ROI half width to use (pixels). Default is to grow the ROI from
+                       the class roiHalfWidth until it holds the signal.
+
+        Returns {metric name: value} for every name in metricLabels, plus the 'row'
+        and 'column' of the ROI center, the 'roiHalfWidth' used and 'roiClipped'
+        (True if the signal touches the ROI border). Metrics that need signal are NaN
+        if no pixel is above the signal threshold, and hfd, fwhm and peakFluxRatio
+        are NaN if the ROI is clipped.
+        '''
+        frame = np.asarray(frame)
+        if center is None:
+            #imported here because centroidFIF imports fileAndArrayHandling, which imports focusCurve
+            from centroidFIF import centroidFIF
+            _, _, center = centroidFIF().findFIFInImage(frame)
+        row, column = int(round(center[0])), int(round(center[1]))
+        background, _, noise = backgroundEstimator().statistics(frame)
+
+        ###########################################################################
+        ###ROI around the pinhole (clipped to the frame), grown until it holds the signal
+        ###########################################################################
+        halfWidth = self.roiHalfWidth if roiHalfWidth is None else int(roiHalfWidth)
+        while True:
+            rowStart, columnStart = max(0, row - halfWidth), max(0, column - halfWidth)
+            roi = frame[rowStart:row + halfWidth + 1, columnStart:column + halfWidth + 1].astype(np.float64)
+            border = np.concatenate((roi[0], roi[-1], roi[1:-1, 0], roi[1:-1, -1]))
+            clipped = bool(border.mean() - background > self.signalSigma*noise/np.sqrt(len(border)))
+            if (not clipped or roiHalfWidth is not None or halfWidth >= self.maxRoiHalfWidth or
+                roi.shape == frame.shape):
+                break
+            halfWidth = min(2*halfWidth, self.maxRoiHalfWidth)
+        metrics = {'row': row, 'column': column, 'roiHalfWidth': halfWidth, 'roiClipped': clipped}
+        metrics['roiStd'] = roi.std()
+
+        ###########################################################################
+        ###Gradient metrics (background free, so from the raw ROI)
+        ###########################################################################
+        metrics['brenner'] = 0.5*(np.mean((roi[:, 2:] - roi[:, :-2])**2) + np.mean((roi[2:, :] - roi[:-2, :])**2))
+        metrics['laplacianVariance'] = cv2.Laplacian(roi, cv2.CV_64F).var()
+
+        ###########################################################################
+        ###Signal above the threshold (radial metrics need all of it inside the ROI)
+        ###########################################################################
+        signal = roi - background
+        signal[signal <= self.signalSigma*noise] = 0.0
+        flux = signal.sum()
+        if flux <= 0 or clipped:
+            metrics.update(hfd = np.nan, fwhm = np.nan, peakFluxRatio = np.nan)
+            return metrics
+        peak = signal.max()
+
+        ###########################################################################
+        ###Radial metrics about the signal centroid
+        ###########################################################################
+        rows, columns = np.indices(signal.shape)
+        rowCen = np.dot(signal.sum(axis = 1), rows[:, 0])/flux
+        columnCen = np.dot(signal.sum(axis = 0), columns[0])/flux
+        radius = np.hypot(rows - rowCen, columns - columnCen).ravel()
+        order = np.argsort(radius)
+        enclosed = np.cumsum(signal.ravel()[order])
+        metrics['hfd'] = 2*radius[order][np.searchsorted(enclosed, 0.5*flux)]
+        metrics['fwhm'] = 2*np.sqrt(np.count_nonzero(signal >= 0.5*peak)/np.pi)
+        metrics['peakFluxRatio'] = peak/flux
+        return metrics
+
+    def sweepMetrics(self, frames, centers = None):
+        '''
+        Compute every focus metric of each frame of a sweep (numpy array, lazy
+        fitsImageStack, ... one frame at a time). centers is an optional list of
+        (row, column) pinhole positions, one per frame.
+
+        Every frame is measured with the same ROI half width: the largest one that
+        frameMetrics needed for any frame. Frames that needed a smaller ROI are
+        measured again.
+
+        Returns a metricType structured array, e.g. sweepMetrics(frames)['hfd'].
+        '''
+        results = [self.frameMetrics(frame, None if centers is None else centers[index]) for index, frame in enumerate(frames)]
+        if results:
+            halfWidth = max(metrics['roiHalfWidth'] for metrics in results)
+            for index, metrics in enumerate(results):
+                if metrics['roiHalfWidth'] != halfWidth:
+                    results[index] = self.frameMetrics(frames[index], (metrics['row'], metrics['column']), halfWidth)
+        return np.array([tuple(metrics[name] for name in self.metricType.names) for metrics in results], dtype = self.metricType)
@@ -0,0 +1,220 @@
+'''
+@title focusSweepPlanner
+@author: agent
+Updated on Oct 18, 2026
+Created on Oct 18, 2026
+
+focusSweepPlanner
+This module proposes the next distance (Z) to image during a focus sweep, from
+the focus metric values measured so far, instead of a fixed step chosen by hand.
+
+The sweep starts at both ends of the allowed distances. Until the turning point
+of the focus curve is bracketed (onlineFocusFitter), each new distance is a
+golden-section step into the larger interval next to the best point so far.
+After that, each new distance is the one expected to reduce the best focus
+error (focusCurve.linearIntercept) the most: the distance whose point would most
+constrain the left or right line at the intercept. These are usually on the
+wings of the V, not on its flat bottom. The sweep stops when onlineFocusFitter
+converges (best focus error below interceptTolerance).
+
+replay runs the planner on recorded sweeps (every distance already imaged) to
+show how many exposures it needs, and how far its best focus is from the best
+focus of the full sweep.
+
+Modules:
+addFrame
+    Add the metric value of a frame named by its distance.
+addPoint
+    Add a (distance, metric value) point.
+nextDistance
+    Propose the next distance to image (None when the sweep can stop).
+replay
+    Run the planner on a recorded sweep.
+replayFiles
+    Run the planner on a recorded sweep directory of FITS files named by distance.
+replaySweeps
+    Run the planner on several recorded sweeps and print a summary.
+'''
+
+# Import #######################################################################################
+import numpy as np
+from focusCurve import focusCurve
+from focusMetrics import focusMetrics
+from fitsImageStack import fitsImageStack
+from imageStackCache import imageStackCache
+from onlineFocusFitter import onlineFocusFitter
+################################################################################################
+
+class focusSweepPlanner(object):
+
+    #Golden-section fraction of the interval for each bracketing step
+    goldenFraction = (3 - np.sqrt(5))/2
+
+    def __init__(self, candidates, interceptTolerance = None):
+        '''
+        Constructor
+
+        candidates - distances (um) the planner may propose, e.g. np.arange(-300, 301, 25)
+        interceptTolerance - best focus error needed to stop (um), default is
+                             onlineFocusFitter.interceptTolerance
+        '''
+        self.candidates = np.unique(np.asarray(candidates, dtype = np.float64))
+        self.interceptTolerance = interceptTolerance
+        self.fitter = onlineFocusFitter(interceptTolerance = interceptTolerance)
+
+    def addFrame(self, fileName, metricValue):
+        '''
+        Add the focus metric value of a frame whose file name is its distance.
+        Returns True when the sweep can stop.
+        '''
+        return self.fitter.addFrame(fileName, metricValue)
+
+    def addPoint(self, distance, metricValue):
+        '''
+        Add the focus metric value at a distance (um). Returns True when the sweep can stop.
+        '''
+        return self.fitter.addPoint(distance, metricValue)
+
+    def nextDistance(self):
+        '''
+        Propose the next distance to image: the ends of the candidates first, then
+        golden-section steps until the turning point is bracketed, then the distance
+        that most reduces the expected best focus error.
+
+        Returns a distance, or None when the fit has converged or every candidate
+        has been imaged.
+        '''
+        if self.fitter.converged:
+            return None
+        unused = self.candidates[~np.isin(self.candidates, list(self.fitter.points))]
+        if len(unused) == 0:
+            return None
+        for end in (self.candidates[0], self.candidates[-1]):
+            if end in unused:
+                return end
+        if not self.fitter.bracketed:
+            return self._goldenSection(unused)
+        return self._mostInformative(unused)
+
+    def _goldenSection(self, unused):
+        '''
+        Golden-section step into the larger interval next to the best point (the
+        metric extreme, a minimum or maximum from the sign of a quadratic fit).
+        '''
+        xx, yy = focusCurve().zipAndSort(list(self.fitter.points), list(self.fitter.points.values()))
+        xx, yy = np.array(xx, dtype = np.float64), np.array(yy)
+        if len(xx) < 3:
+            left, right = xx[0], xx[-1]
+            target = left + self.goldenFraction*(right - left)
+        else:
+            sense = 1 if np.polyfit(xx, yy, 2)[0] > 0 else -1
+            best = int(np.argmin(sense*yy))
+            left, right = xx[max(best - 1, 0)], xx[min(best + 1, len(xx) - 1)]
+            if right - xx[best] >= xx[best] - left:
+                target = xx[best] + self.goldenFraction*(right - xx[best])
+            else:
+                target = xx[best] - self.goldenFraction*(xx[best] - left)
+        inside = unused[(unused > left) & (unused < right)]
+        choices = inside if len(inside) else unused
+        return choices[np.argmin(np.abs(choices - target))]
+
+    def _mostInformative(self, unused):
+        '''
+        Candidate that minimizes the predicted best focus error after it is imaged:
+        each side's line keeps its current scatter, and the candidate is added to
+        the side of the split point it falls on.
+        '''
+        xx, yy = focusCurve().zipAndSort(list(self.fitter.points), list(self.fitter.points.values()))
+        xx, yy = np.array(xx, dtype = np.float64), np.array(yy)
+        split, xInter = self.fitter.splitPoint, self.fitter.bestFocus
+        numberLeft = int(np.searchsorted(xx, split, side = 'right'))
+        sides = []
+        for xSide, ySide in ((xx[:numberLeft], yy[:numberLeft]), (xx[numberLeft:], yy[numberLeft:])):
+            slope, intercept = np.polyfit(xSide, ySide, 1)
+            scatter = np.sum((ySide - (slope*xSide + intercept))**2)/(len(xSide) - 2)
+            sides.append((xSide, slope, max(scatter, np.finfo(float).tiny)))
+        point = np.array([xInter, 1.0])
+
+        def sideVariance(xSide, scatter):
+            design = np.column_stack((xSide, np.ones_like(xSide)))
+            return scatter*point.dot(np.linalg.solve(design.T.dot(design), point))
+
+        current = [sideVariance(xSide, scatter) for xSide, _, scatter in sides]
+        predicted = []
+        for candidate in unused:
+            side = 0 if candidate <= split else 1
+            xSide, _, scatter = sides[side]
+            predicted.append(sideVariance(np.append(xSide, candidate), scatter) + current[1 - side])
+        return unused[int(np.argmin(predicted))]
+
+    def replay(self, distances, metricValues, verbose = False):
+        '''
+        Run a new planner (same interceptTolerance) on a recorded sweep: it may only
+        propose the recorded distances, and each proposal is answered with the
+        recorded metric value.
+
+        Returns {'exposures': frames the planner used, 'fullExposures': frames in the
+        sweep, 'bestFocus', 'bestFocusError': planner result (um), 'fullBestFocus':
+        best focus from every frame (um), 'difference': bestFocus - fullBestFocus}.
+        '''
+        recorded = dict(zip(np.asarray(distances, dtype = np.float64), metricValues))
+        planner = focusSweepPlanner(list(recorded), self.interceptTolerance)
+        distance = planner.nextDistance()
+        while distance is not None:
+            planner.addPoint(distance, recorded[distance])
+            if verbose:
+                print('Z = ' + format(distance, '.1f') + ' um, best focus = ' + format(planner.fitter.bestFocus, '.2f') +
+                      ' +/- ' + format(planner.fitter.bestFocusError, '.2f') + ' um')
+            distance = planner.nextDistance()
+
+        ###########################################################################
+        ###Best focus from the full sweep (the same fit as fitFocusCurve)
+        ###########################################################################
+        fC = focusCurve()
+        sortedX, sortedY = fC.zipAndSort(list(recorded), list(recorded.values()))
+        _, _, _, xSplitPoint = fC.xyPolyFit(sortedX, sortedY, 2)
+        fullBestFocus = fC.linearIntercept(sortedX, sortedY, xSplitPoint)[0]
+        return {'exposures': len(planner.fitter.points),
+                'fullExposures': len(recorded),
+                'bestFocus': planner.fitter.bestFocus,
+                'bestFocusError': planner.fitter.bestFocusError,
+                'fullBestFocus': fullBestFocus,
+                'difference': planner.fitter.bestFocus - fullBestFocus}
+
+    def replayFiles(self, filelist, metric = 'std', verbose = False, cache = False):
+        '''
+        Run the planner on a recorded sweep of FITS files named by distance
+        (example: 350.fit for the image taken at 350um).
+        metric - 'std' (stdFocusCurve) or a focusMetrics metric name
+        cache - read the frames through an imageStackCache, so replaying the same
+                recorded sweep again (other metrics or tolerances) does not decode
+                the FITS files again. This writes an imageStackCache into the
+                recorded sweep's directory, so it is off by default.
+        '''
+        fC = focusCurve()
+        frames = imageStackCache().open(filelist) if cache else fitsImageStack(filelist)
+        if metric == 'std':
+            metricValues = [std for _, _, std in fC.streamFrameStatistics(frames)]
+        else:
+            metricValues = focusMetrics().sweepMetrics(frames)[metric]
+        return self.replay(fC.fileNameToInt(filelist), metricValues, verbose)
+
+    def replaySweeps(self, sweeps):
+        '''
+        Replay several recorded sweeps, each (distances, metricValues), and print
+        the exposures used and the best focus differences.
+
+        Returns the list of replay results.
+        '''
+        results = [self.replay(distances, metricValues) for distances, metricValues in sweeps]
+        print(format('sweep', '<7') + format('frames', '>8') + format('planned', '>9') +
+              format('best focus', '>12') + format('+/-', '>8') + format('full sweep', '>12') + format('difference', '>12'))
+        for index, result in enumerate(results):
+            print(format(index, '<7d') + format(result['fullExposures'], '>8d') + format(result['exposures'], '>9d') +
+                  format(result['bestFocus'], '>12.2f') + format(result['bestFocusError'], '>8.2f') +
+                  format(result['fullBestFocus'], '>12.2f') + format(result['difference'], '>12.2f'))
+        if results:
+            saved = 1 - np.sum([result['exposures'] for result in results])/np.sum([result['fullExposures'] for result in results])
+            rms = np.sqrt(np.nanmean([result['difference']**2 for result in results]))
+            print('Exposures saved: ' + format(100*saved, '.1f') + '%, RMS best focus difference: ' + format(rms, '.2f') + ' um')
+        return results
@@ -0,0 +1,192 @@
+'''
+@title imagePrecision
+@author: agent
+Updated on Oct 18, 2026
+Created on Oct 18, 2026
+
+imagePrecision
+This module holds the precision mode used by the image analysis code (focus
+frame statistics and centroiding). The camera data are 16-bit integers, which
+float32 holds exactly, so converting them to float64 only doubles the memory
+traffic of every working copy. Modes:
+    'float64' (default) - the original behaviour, every working copy is float64
+    'float32' - working copies are float32, pixel sums are accumulated in float64
+                (see blockMoments)
+    'native' - 8/16-bit integer data stay integers: frame statistics are summed
+               exactly in 64-bit integers and centroid pixel differences use int32
+Set imagePrecision.mode to change the mode for every module (the workflows keep
+float64 unless a mode is chosen). parityCheck compares
+the results of each mode with the float64 ones, and benchmark times them.
+
+Modules:
+floatType
+    Floating point type for working copies of image data.
+arithmeticType
+    Type for exact pixel arithmetic (differences) on image data.
+blockMoments
+    Count, mean and sum of squared deviations of a block of image rows.
+parityCheck
+    Compare the focus and centroid results of each mode with the float64 mode.
+benchmark
+    Time the focus and centroid code in each mode on full size frames.
+'''
+
+# Import #######################################################################################
+import time
+import numpy as np
+################################################################################################
+
+class imagePrecision(object):
+
+    #'native', 'float32' or 'float64'
+    mode = 'float64'
+    modes = ('native', 'float32', 'float64')
+
+    #parityCheck tolerances (relative for statistics, pixels for centroids)
+    statisticsTolerance = 1.0e-6
+    centroidTolerance = 1.0e-3
+
+    def __init__(self):
+        '''
+        Constructor
+        '''
+
+    def floatType(self, dtype):
+        '''
+        Floating point type for working copies of data of type dtype: float64 in
+        'float64' mode, otherwise float32 (or float64 if the data need it).
+        '''
+        if self.mode == 'float64':
+            return np.dtype(np.float64)
+        return np.result_type(dtype, np.float32)
+
+    def arithmeticType(self, dtype):
+        '''
+        Type for pixel differences of data of type dtype: in 'native' mode 8/16-bit
+        integer data use int32 (exact, half the size of float64), otherwise floatType.
+        '''
+        dtype = np.dtype(dtype)
+        if self.mode == 'native' and dtype.kind in 'ui' and dtype.itemsize <= 2:
+            return np.dtype(np.int32)
+        return self.floatType(dtype)
+
+    def blockMoments(self, block):
+        '''
+        Return (count, mean, sum of squared deviations from the mean) of a 2D block
+        of image rows. In 'native' mode 8/16-bit integer blocks (signed or unsigned)
+        are summed exactly in 64-bit integers without a floating point copy. Otherwise the block is
+        converted to floatType and the row sums are accumulated in float64 (exact for
+        16-bit data, rows above 2**24 ADU do not lose precision). The squared
+        deviations of each row are summed in floatType with numpy's pairwise
+        summation (relative error about 1e-7 in float32, within statisticsTolerance)
+        and the row totals are added in float64.
+        '''
+        count = block.size
+        if self.mode == 'native' and block.dtype.kind in 'ui' and block.dtype.itemsize <= 2:
+            #squares of 16-bit values fit in 32 bits (2**30 at most for signed data)
+            sumType, squareType = (np.uint64, np.uint32) if block.dtype.kind == 'u' else (np.int64, np.int32)
+            total = int(block.sum(dtype = sumType))
+            totalSquares = int(np.square(block, dtype = squareType).sum(dtype = sumType))
+            return count, total/count, (totalSquares*count - total*total)/count
+        block = block.astype(self.floatType(block.dtype))
+        mean = block.sum(axis = 1, dtype = np.float64).sum()/count
+        block -= block.dtype.type(mean)
+        return count, mean, np.einsum('ij,ij->i', block, block).sum(dtype = np.float64)
+
+    def parityCheck(self, numberOfImages = 10, seed = 0):
+        '''
+        Run the focus statistics and centroid methods on synthetic 16-bit pinhole
+        images in every mode, and compare the results with the 'float64' mode.
+
+        Returns a list of (mode, check, difference) for every result outside the
+        tolerances (empty if all modes match).
+        '''
+        #imported here because these modules use imagePrecision
+        from centroidBenchmark import centroidBenchmark
+        from focusCurve import focusCurve
+        from centroidFIF import centroidFIF
+        from alternateCentroidMethods import gmsCentroid
+        stack, truth = centroidBenchmark().syntheticStack(numberOfImages, seed)
+        seeds = np.round(truth)
+
+        def results():
+            statistics = np.array([focusCurve().frameStatistics(frame)[1:] for frame in stack])
+            daophot = np.array([centroidFIF().findCentroid(frame, x, y) for frame, (x, y) in zip(stack, seeds)])
+            gms = np.array([gmsCentroid(frame, x, y, 50, 50)[:2] for frame, (x, y) in zip(stack, seeds)])
+            return statistics, daophot, gms
+
+        originalMode = imagePrecision.mode
+        try:
+            imagePrecision.mode = 'float64'
+            reference = results()
+            mismatches = []
+            for mode in self.modes:
+                if mode == 'float64':
+                    continue
+                imagePrecision.mode = mode
+                statistics, daophot, gms = results()
+                differences = (('statistics', np.max(np.abs(statistics/reference[0] - 1)), self.statisticsTolerance),
+                               ('daophot', np.max(np.abs(daophot - reference[1])), self.centroidTolerance),
+                               ('gms', np.max(np.abs(gms - reference[2])), self.centroidTolerance))
+                mismatches.extend((mode, check, difference) for check, difference, tolerance in differences
+                                  if not difference <= tolerance)
+        finally:
+            imagePrecision.mode = originalMode
+        return mismatches
+
+    def benchmark(self, numberOfFrames = 10, frameShape = (2048, 3072), repeats = 3):
+        '''
+        Time focusCurve.frameStatistics and centroidFIF.findCentroid on full size
+        16-bit frames in every mode (best of repeats), after checking parity. The
+        background estimate is the same in every mode, so it is computed (and
+        cached) before the timing.
+
+        Returns {mode: {'statistics', 'centroid': seconds per frame, 'bytesPerPixel':
+        size of the working copy of a pixel, 'bandwidth': frame bytes per second
+        read by frameStatistics}}.
+        '''
+        #imported here because these modules use imagePrecision
+        from focusCurve import focusCurve
+        from centroidFIF import centroidFIF
+        from backgroundEstimator import backgroundEstimator
+        mismatches = self.parityCheck()
+        if mismatches:
+            raise Exception('imagePrecision modes do not match float64: ' + str(mismatches))
+
+        rng = np.random.RandomState(0)
+        rows, columns = np.ogrid[0:frameShape[0], 0:frameShape[1]]
+        frame = 1000 + 3000*np.exp(-((rows - frameShape[0]/2)**2 + (columns - frameShape[1]/2)**2)/(2*10.0**2))
+        frames = [rng.poisson(frame).astype(np.uint16) for _ in range(numberOfFrames)]
+        for image in frames:
+            backgroundEstimator().median(image)
+
+        def bestTime(function):
+            function(frames[0])
+            best = np.inf
+            for _ in range(repeats):
+                startTime = time.perf_counter()
+                for image in frames:
+                    function(image)
+                best = min(best, (time.perf_counter() - startTime)/numberOfFrames)
+            return best
+
+        results = {}
+        originalMode = imagePrecision.mode
+        try:
+            for mode in self.modes:
+                imagePrecision.mode = mode
+                statistics = bestTime(focusCurve().frameStatistics)
+                centroid = bestTime(lambda image: centroidFIF().findCentroid(image, frameShape[1]//2, frameShape[0]//2))
+                results[mode] = {'statistics': statistics,
+                                 'centroid': centroid,
+                                 'bytesPerPixel': self.arithmeticType(np.uint16).itemsize,
+                                 'bandwidth': frames[0].nbytes/statistics}
+        finally:
+            imagePrecision.mode = originalMode
+
+        print(format('mode', '<10') + format('stats ms', '>10') + format('centroid ms', '>13') +
+              format('bytes/pixel', '>13') + format('stats GB/s', '>12'))
+        for mode, result in results.items():
+            print(format(mode, '<10') + format(1000*result['statistics'], '>10.2f') + format(1000*result['centroid'], '>13.3f') +
+                  format(result['bytesPerPixel'], '>13d') + format(result['bandwidth']/1e9, '>12.2f'))
+        return results
@@ -0,0 +1,185 @@
+'''
+@title imageStackCache
+@author: agent
+Updated on Oct 18, 2026
+Created on Oct 18, 2026
+
+imageStackCache
+This module holds a per-directory cache of decoded FITS frames, used when the
+same session directories are re-analysed (re-running stdFocusCurve or the
+centroid methods while tuning parameters). Each decoded frame is saved as a
+.npy file named by the SHA-1 of its FITS file's contents, inside a hidden
+.imageStackCache directory next to the images, with a manifest.json that maps
+file names to hashes. Cached frames are opened memory-mapped, so a re-analysis
+does not decode any FITS files.
+
+A manifest entry is trusted while the FITS file's mtime and size are unchanged;
+otherwise the file is hashed again, and a frame is only re-decoded if its
+contents really changed.
+
+Modules:
+open
+    Return a cachedImageStack for a list of FITS files.
+cachedFrame
+    Return the cached (memory-mapped) frame for a FITS file, decoding it first if needed.
+'''
+
+# Import #######################################################################################
+import os, json, hashlib, tempfile, threading
+import numpy as np
+from fitsImageStack import fitsImageStack
+################################################################################################
+
+class imageStackCache(object):
+
+    #Cache directory made inside each image directory (leading '.' keeps it out of glob('*.*'))
+    cacheDirName = '.imageStackCache'
+    manifestName = 'manifest.json'
+
+    #In-memory manifests shared by every instance: {cache directory: {file name: entry}}
+    _manifests = {}
+    _lock = threading.RLock()
+
+    def __init__(self):
+        '''
+        Constructor
+        '''
+
+    def open(self, filelist):
+        '''
+        Return a cachedImageStack for filelist. Frames are taken from the cache
+        (and added to it on first use) when they are indexed.
+        '''
+        return cachedImageStack(filelist, self)
+
+    def cachedFrame(self, fileName, decodeFrame):
+        '''
+        Return the cached frame for fileName as a read only memory-mapped array.
+
+        decodeFrame - function that decodes the FITS file, used on a cache miss
+        '''
+        fileName = os.path.abspath(fileName)
+        dirName, baseName = os.path.split(fileName)
+        cacheDir = os.path.join(dirName, self.cacheDirName)
+        stat = os.stat(fileName)
+
+        #the lock only covers the manifest: hashing, decoding and saving frames of
+        #different files run concurrently
+        with self._lock:
+            manifest = self._loadManifest(cacheDir)
+            entry = manifest.get(baseName)
+        manifestChanged = entry is None or entry['mtime'] != stat.st_mtime or entry['size'] != stat.st_size
+        if manifestChanged:
+            entry = {'mtime': stat.st_mtime, 'size': stat.st_size, 'sha1': self._hashFile(fileName)}
+        framePath = os.path.join(cacheDir, entry['sha1'] + '.npy')
+
+        ###########################################################################
+        ###Decode and save on a cache miss
+        ###########################################################################
+        if not os.path.isfile(framePath):
+            frame = decodeFrame()
+            if not self._saveFrame(cacheDir, framePath, frame):
+                #read only directory: analyse without caching
+                return frame
+        if manifestChanged:
+            with self._lock:
+                manifest[baseName] = entry
+                self._writeManifest(cacheDir)
+        return np.load(framePath, mmap_mode = 'r')
+
+    def _saveFrame(self, cacheDir, framePath, frame):
+        '''
+        Save a frame as a .npy file atomically: it is written to a uniquely named
+        temporary file and renamed, so a reader (or another thread saving the same
+        frame) never sees a partly written file. Returns False if it can not be saved.
+        '''
+        try:
+            if not os.path.isdir(cacheDir):
+                os.makedirs(cacheDir, exist_ok = True)
+            handle, tempPath = tempfile.mkstemp(suffix = '.tmp', dir = cacheDir)
+            try:
+                with os.fdopen(handle, 'wb') as frameFile:
+                    np.save(frameFile, np.ascontiguousarray(frame))
+                os.replace(tempPath, framePath)
+            except BaseException:
+                os.remove(tempPath)
+                raise
+        except (IOError, OSError):
+            return False
+        return True
+
+    def _hashFile(self, fileName, chunkSize = 1 << 20):
+        '''
+        SHA-1 of a file's contents.
+        '''
+        sha1 = hashlib.sha1()
+        with open(fileName, 'rb') as fitsFile:
+            for chunk in iter(lambda: fitsFile.read(chunkSize), b''):
+                sha1.update(chunk)
+        return sha1.hexdigest()
+
+    def _loadManifest(self, cacheDir):
+        '''
+        Return the in-memory manifest for a cache directory, reading manifest.json the first time.
+        '''
+        if cacheDir not in self._manifests:
+            try:
+                with open(os.path.join(cacheDir, self.manifestName), 'r') as manifestFile:
+                    self._manifests[cacheDir] = json.load(manifestFile)
+            except (IOError, OSError, ValueError):
+                self._manifests[cacheDir] = {}
+        return self._manifests[cacheDir]
+
+    def _writeManifest(self, cacheDir):
+        '''
+        Save the manifest for a cache directory atomically (skipped if the directory
+        can not be written to). Called with the lock held.
+        '''
+        manifestPath = os.path.join(cacheDir, self.manifestName)
+        try:
+            if not os.path.isdir(cacheDir):
+                os.makedirs(cacheDir, exist_ok = True)
+            handle, tempPath = tempfile.mkstemp(suffix = '.tmp', dir = cacheDir)
+            try:
+                with os.fdopen(handle, 'w') as manifestFile:
+                    json.dump(self._manifests[cacheDir], manifestFile)
+                os.replace(tempPath, manifestPath)
+            except BaseException:
+                os.remove(tempPath)
+                raise
+        except (IOError, OSError):
+            pass
+
+class cachedImageStack(fitsImageStack):
+    '''
+    fitsImageStack whose frames come from an imageStackCache.
+    '''
+
+    def __init__(self, filelist, cache):
+        '''
+        Constructor
+        '''
+        super(cachedImageStack, self).__init__(filelist)
+        self._cache = cache
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            subStack = cachedImageStack(self.filelist[index], self._cache)
+            subStack.useNativeReader = self.useNativeReader
+            return subStack
+        return super(cachedImageStack, self).__getitem__(index)
+
+    def section(self, index, rows = slice(None), columns = slice(None)):
+        '''
+        Section of a cached frame (only the requested pages of the .npy file are read).
+        '''
+        return np.array(self._readFrame(self._normalizeIndex(index))[rows, columns])
+
+    def _readFrame(self, index):
+        '''
+        Memory-mapped frame from the cache, decoded from its FITS file on a cache miss.
+        '''
+        decodeFrame = lambda: super(cachedImageStack, self).section(index)
+        frame = self._cache.cachedFrame(self.filelist[index], decodeFrame)
+        self._frameShapes[index] = frame.shape
+        return frame
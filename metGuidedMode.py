@@ -21,7 +21,8 @@ from fileAndArrayHandling import fileAndArrayHandling
 from centroidFIF import centroidFIF
 import numpy as np
 from CCDOpsPlanetMode import CCDOpsPlanetMode
-from alternateCentroidMethods import gmsCentroid
+from centroidMethods import centroidMethods
+from fitsDirectoryWatcher import fitsDirectoryWatcher
 ################################################################################################
 
 class metGuidedMode(tk.Tk):
@@ -115,6 +116,10 @@ class fifPage(tk.Frame):
         #"D1", "D2", "D3", "D4",
         #"CFIF
     
+    #Log the pinhole's lateral shift through focus after each focus curve. This
+    #centroids every frame of the sweep (reading the frames again), so it is off by default.
+    logLateralShift = False
+    
     def __init__(self, container, metGuidedModeSelf):
         tk.Frame.__init__(self, container)
 
@@ -378,6 +383,9 @@ class fifPage(tk.Frame):
         faah = fileAndArrayHandling()
         dirName = faah.createDir(fiflabel, metGuidedModeSelf, 'Focus_Curve')
         
+        #process frames while CCDOps writes them
+        watcher = fitsDirectoryWatcher(dirName).start()
+        
         ###########################################################################
         ###Message user to fill dir (mention label names)
         ###########################################################################
@@ -390,16 +398,30 @@ class fifPage(tk.Frame):
         ###########################################################################
         ###Get images
         ###########################################################################
-        imageArray4D, filelist = faah.openAllFITSImagesInDirectory()
+        imageArray4D, filelist = faah.openAllFITSImagesInDirectory(lazy = True)
+        watcher.stop()
+        for message in watcher.errorMessages():
+            faah.pageLogging(metGuidedModeSelf.consoleLog, metGuidedModeSelf.logFile, message, warning = True)
         
         ###########################################################################
         ###Create focus curve
         ########################################################################### 
         fC = focusCurve()       
-        xInter = fC.stdFocusCurve(fiflabel, imageArray4D, filelist)
+        xInter = fC.stdFocusCurve(fiflabel, imageArray4D, filelist, frameStds = watcher.metricList(filelist))
         faah.pageLogging(metGuidedModeSelf.consoleLog, metGuidedModeSelf.logFile, 
                                       "Measured Best focus for " + str(fiflabel) + " is: " + str(xInter) + "um")
         
+        ###########################################################################
+        ###Pinhole centroid through focus (lateral shift from tilt, optional)
+        ###########################################################################
+        if self.logLateralShift == True:
+            cF = centroidFIF()
+            xcens, ycens, _, _ = cF.centroidStack(imageArray4D, maxLocs = watcher.metricList(filelist, metric = 'maxLoc'))
+            faah.pageLogging(metGuidedModeSelf.consoleLog, metGuidedModeSelf.logFile, 
+                                          "Lateral shift of " + str(fiflabel) + " through focus (columns, rows): (" + 
+                                          format(np.nanmax(xcens)-np.nanmin(xcens), '.2f') + ', ' + 
+                                          format(np.nanmax(ycens)-np.nanmin(ycens), '.2f') + ") pixels")
+        
         ###########################################################################
         ###Nominal best focus
         ###########################################################################
@@ -436,32 +458,33 @@ class fifPage(tk.Frame):
         ###########################################################################
         ###Get images
         ###########################################################################
-        imageArray4D, filelist = faah.openAllFITSImagesInDirectory()
-        aa = round(len(filelist)/2) #select a focused image from array a
+        focusedImage, filelist, aa = faah.openFocusedFITSImageInDirectory() #select a focused image from directory (only that image is decoded)
         
         ###########################################################################
         ###Find fif in image and create subarray
         ###########################################################################
-        faah.pageLogging(self.consoleLog, self.logFile, 
+        faah.pageLogging(metGuidedModeSelf.consoleLog, metGuidedModeSelf.logFile, 
                                       "Centroiding " + str(fiflabel) + " using FITs file:\n" + str(filelist[aa]).replace('/', '\\'))
         
         cF = centroidFIF()
-        _, subArrayBoxSize, maxLoc  = cF.findFIFInImage(imageArray4D[aa])
-        faah.pageLogging(self.consoleLog, self.logFile, 
+        _, subArrayBoxSize, maxLoc  = cF.findFIFInImage(focusedImage)
+        faah.pageLogging(metGuidedModeSelf.consoleLog, metGuidedModeSelf.logFile, 
                                       str(fiflabel) + " FIF found at pixel location: (" + str(maxLoc[0]) + "," + str(maxLoc[1]) + "). Will now centroid using that location.")
         
         ###########################################################################
         ###Centroid
         ###########################################################################
-        xcen, ycen, _, _ = gmsCentroid(imageArray4D[aa], maxLoc[1], maxLoc[0], 
-                                                         int(round(subArrayBoxSize/2)), int(round(subArrayBoxSize/2)), axis='both', verbose=False)
+        cM = centroidMethods()
+        centroid = cM.centroid(focusedImage, [maxLoc], int(round(subArrayBoxSize/2)), workflow = 'guidedMode')
+        cM.checkCentroids(centroid, [maxLoc], fiflabel, metGuidedModeSelf.consoleLog, metGuidedModeSelf.logFile)
+        xcen, ycen = centroid['x'][0], centroid['y'][0]
         
         ###########################################################################
         ###Add X and Y data to fifCentroidedLocationDict
         ###########################################################################
         #Account for planet mode
         pM = CCDOpsPlanetMode()
-        xOffset, yOffset, _ = pM.readFitsHeader(imageArray4D, filelist, metGuidedModeSelf.consoleLog, metGuidedModeSelf.logFile)
+        xOffset, yOffset, _ = pM.readFitsHeader(focusedImage, filelist, metGuidedModeSelf.consoleLog, metGuidedModeSelf.logFile)
         
         #Distance from center of FIF to origin of sensor (x=0, y=0)
         xDistToSensorOrigin = ycen + xOffset 
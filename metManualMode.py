@@ -20,7 +20,8 @@ import numpy as np
 from tipTiltZCCD import tipTiltZCCD
 from CCDOpsPlanetMode import CCDOpsPlanetMode
 from centroidFIF import centroidFIF
-from alternateCentroidMethods import gmsCentroid
+from centroidMethods import centroidMethods
+from fitsDirectoryWatcher import fitsDirectoryWatcher
 ################################################################################################
 
 class metManualMode(tk.Tk):
@@ -63,6 +64,9 @@ class metManualMode(tk.Tk):
         faah = fileAndArrayHandling()
         dirName = faah.createDir(self.fifSelection, self, 'Manual_Mode_FIF_Focus_Curve')
         
+        #process frames while CCDOps writes them
+        watcher = fitsDirectoryWatcher(dirName).start()
+        
         ###########################################################################
         ###Message user to fill dir (mention label names)
         ###########################################################################
@@ -75,13 +79,16 @@ class metManualMode(tk.Tk):
         ###########################################################################
         ###Get images
         ###########################################################################
-        imageArray4D, filelist = faah.openAllFITSImagesInDirectory()
+        imageArray4D, filelist = faah.openAllFITSImagesInDirectory(lazy = True)
+        watcher.stop()
+        for message in watcher.errorMessages():
+            faah.pageLogging(self.consoleLog, self.logFile, message, warning = True)
         
         ###########################################################################
         ###Create focus curve
         ########################################################################### 
         fC = focusCurve()       
-        xInter = fC.stdFocusCurve(self.fifSelection, imageArray4D, filelist)
+        xInter = fC.stdFocusCurve(self.fifSelection, imageArray4D, filelist, frameStds = watcher.metricList(filelist))
         
         ###########################################################################
         ###Nominal best focus
@@ -127,6 +134,9 @@ class metManualMode(tk.Tk):
         faah = fileAndArrayHandling()
         dirName = faah.createDir(str(self.CCDSelection + '_' + self.trianglePointSelection), self, 'Manual_Mode_CCD_Focus_Curve')
         
+        #process frames while CCDOps writes them
+        watcher = fitsDirectoryWatcher(dirName).start()
+        
         ###########################################################################
         ###Message user to fill dir (mention label names)
         ###########################################################################
@@ -140,13 +150,16 @@ class metManualMode(tk.Tk):
         ###########################################################################
         ###Get images
         ###########################################################################
-        imageArray4D, filelist = faah.openAllFITSImagesInDirectory()
+        imageArray4D, filelist = faah.openAllFITSImagesInDirectory(lazy = True)
+        watcher.stop()
+        for message in watcher.errorMessages():
+            faah.pageLogging(self.consoleLog, self.logFile, message, warning = True)
         
         ###########################################################################
         ###Create focus curve
         ########################################################################### 
         fC = focusCurve()       
-        xInter = fC.stdFocusCurve(self.CCDSelection, imageArray4D, filelist)
+        xInter = fC.stdFocusCurve(self.CCDSelection, imageArray4D, filelist, frameStds = watcher.metricList(filelist))
         faah.pageLogging(self.consoleLog, self.logFile, 
                                       "CCD Manual Mode Measured Best focus for " + str(self.CCDSelection + ' ' + self.trianglePointSelection) + " is: " + format(xInter, '.3f') + "um")
         
@@ -175,8 +188,7 @@ class metManualMode(tk.Tk):
         ###########################################################################
         ###Get images
         ###########################################################################
-        imageArray4D, filelist = faah.openAllFITSImagesInDirectory()
-        aa = round(len(filelist)/2) #select a focused image from array a
+        focusedImage, filelist, aa = faah.openFocusedFITSImageInDirectory() #select a focused image from directory (only that image is decoded)
         
         ###########################################################################
         ###Find fif in image and create subarray
@@ -185,22 +197,24 @@ class metManualMode(tk.Tk):
                                       "Centroiding " + str(fiflabel) + " using FITs file:\n" + str(filelist[aa]).replace('/', '\\'))
         
         cF = centroidFIF()
-        _, subArrayBoxSize, maxLoc  = cF.findFIFInImage(imageArray4D[aa])
+        _, subArrayBoxSize, maxLoc  = cF.findFIFInImage(focusedImage)
         faah.pageLogging(self.consoleLog, self.logFile, 
                                       str(fiflabel) + " FIF found at pixel location: (" + str(maxLoc[0]) + "," + str(maxLoc[1]) + "). Will now centroid using that location.")
         
         ###########################################################################
         ###Centroid
         ###########################################################################
-        xcen, ycen, _, _ = gmsCentroid(imageArray4D[aa], maxLoc[1], maxLoc[0], 
-                                                         int(round(subArrayBoxSize/2)), int(round(subArrayBoxSize/2)), axis='both', verbose=False)
+        cM = centroidMethods()
+        centroid = cM.centroid(focusedImage, [maxLoc], int(round(subArrayBoxSize/2)), workflow = 'manualMode')
+        cM.checkCentroids(centroid, [maxLoc], fiflabel, self.consoleLog, self.logFile)
+        xcen, ycen = centroid['x'][0], centroid['y'][0]
         
         ###########################################################################
         ###Add X and Y data to fifCentroidedLocationDict
         ###########################################################################
         #Account for planet mode
         pM = CCDOpsPlanetMode()
-        xOffset, yOffset, _ = pM.readFitsHeader(imageArray4D, filelist, self.consoleLog, self.logFile)
+        xOffset, yOffset, _ = pM.readFitsHeader(focusedImage, filelist, self.consoleLog, self.logFile)
         
         #Distance from center of FIF to origin of sensor (x=0, y=0)
         xDistToSensorOrigin = xcen + xOffset
@@ -245,6 +259,11 @@ class metManualMode(tk.Tk):
         dirNameB = faah.createDir(str(self.CCDSelection + '_B'), self, 'Manual_Mode_CCD_Focus_Curve')
         dirNameC = faah.createDir(str(self.CCDSelection + '_C'), self, 'Manual_Mode_CCD_Focus_Curve')
         
+        #process frames while CCDOps writes them
+        watcherA = fitsDirectoryWatcher(dirNameA).start()
+        watcherB = fitsDirectoryWatcher(dirNameB).start()
+        watcherC = fitsDirectoryWatcher(dirNameC).start()
+        
         ###########################################################################
         ###Message user to fill dir (mention label names)
         ###########################################################################
@@ -277,7 +296,7 @@ class metManualMode(tk.Tk):
         buttonA = tk.Button(topA, text="Ready", command=topA.destroy)
         buttonA.pack()
         topA.wait_window()
-        imageArray4DA, filelistA = faah.openAllFITSImagesInDirectory()
+        imageArray4DA, filelistA = faah.openAllFITSImagesInDirectory(lazy = True)
         
         #Point B      
         topB = tk.Toplevel()
@@ -290,7 +309,7 @@ class metManualMode(tk.Tk):
         buttonB = tk.Button(topB, text="Ready", command=topB.destroy)
         buttonB.pack()
         topB.wait_window()
-        imageArray4DB, filelistB = faah.openAllFITSImagesInDirectory()
+        imageArray4DB, filelistB = faah.openAllFITSImagesInDirectory(lazy = True)
         
         #Point C      
         topC = tk.Toplevel()
@@ -303,7 +322,11 @@ class metManualMode(tk.Tk):
         buttonC = tk.Button(topC, text="Ready", command=topC.destroy)
         buttonC.pack()
         topC.wait_window()
-        imageArray4DC, filelistC = faah.openAllFITSImagesInDirectory()
+        imageArray4DC, filelistC = faah.openAllFITSImagesInDirectory(lazy = True)
+        for watcher in (watcherA, watcherB, watcherC):
+            watcher.stop()
+            for message in watcher.errorMessages():
+                faah.pageLogging(self.consoleLog, self.logFile, message, warning = True)
         
         ###########################################################################
         ###Create focus curves
@@ -311,16 +334,16 @@ class metManualMode(tk.Tk):
         faah.pageLogging(self.consoleLog, self.logFile, 
                                       "Z VALUES FOR " + str(self.CCDSelection) + " POINTS A, B, and C:")
         #A    
-        xInterA = fC.stdFocusCurve(self.CCDSelection, imageArray4DA, filelistA, pointLabel = "A")
+        xInterA = fC.stdFocusCurve(self.CCDSelection, imageArray4DA, filelistA, pointLabel = "A", frameStds = watcherA.metricList(filelistA))
         faah.pageLogging(self.consoleLog, self.logFile, 
                                       str(self.CCDSelection) + " A (Best Focus):" + format(xInterA, '.3f') + "um\n" + str(self.CCDSelection) + " A (Nominal Z):" + format(nominalZA, '.3f') + "um")
 
         #B
-        xInterB = fC.stdFocusCurve(self.CCDSelection, imageArray4DB, filelistB, pointLabel = "B")
+        xInterB = fC.stdFocusCurve(self.CCDSelection, imageArray4DB, filelistB, pointLabel = "B", frameStds = watcherB.metricList(filelistB))
         faah.pageLogging(self.consoleLog, self.logFile, 
                                       str(self.CCDSelection) + " B (Best Focus):" + format(xInterB, '.3f') + "um\n" + str(self.CCDSelection) + " B (Nominal Z):" + format(nominalZB, '.3f') + "um") 
         #C
-        xInterC = fC.stdFocusCurve(self.CCDSelection, imageArray4DC, filelistC, pointLabel = "C")
+        xInterC = fC.stdFocusCurve(self.CCDSelection, imageArray4DC, filelistC, pointLabel = "C", frameStds = watcherC.metricList(filelistC))
         faah.pageLogging(self.consoleLog, self.logFile, 
                                       str(self.CCDSelection) + " C (Best Focus):" + format(xInterC, '.3f') + "um\n" + str(self.CCDSelection) + " C (Nominal Z):" + format(nominalZC, '.3f') + "um")
         
@@ -0,0 +1,241 @@
+'''
+@title nativeFITSReader
+@author: agent
+Updated on Oct 18, 2026
+Created on Oct 18, 2026
+
+nativeFITSReader
+This module holds an optional fast reader for the simple FITS files written by
+SBIG/CCDOps (single HDU, uncompressed, 2D images). The 2880-byte header blocks
+are parsed directly, and the data unit is exposed as a memory-mapped big-endian
+numpy view. BZERO/BSCALE are only applied to the pixels that are actually
+accessed. Anything unusual (extensions as the image, random groups, BLANK
+values, more than 2 axes, truncated files) falls back to astropy.
+
+Modules:
+readHeader
+    Parse the primary header of a FITS file into a dictionary.
+open
+    Return a nativeFITSImage (memory-mapped, lazily scaled), or None if the
+    file needs astropy.
+getdata
+    Drop-in replacement for astropy.io.fits.getdata for a single file.
+scaleData
+    Apply BZERO/BSCALE to raw big-endian FITS data.
+parityCheck
+    Compare getdata against astropy.io.fits.getdata for a list of files.
+benchmark
+    Time getdata against astropy.io.fits.getdata on a synthetic directory.
+'''
+
+# Import #######################################################################################
+import os, time, tempfile
+import numpy as np
+from astropy.io import fits
+################################################################################################
+
+class nativeFITSReader(object):
+
+    #FITS block and card sizes (bytes)
+    blockSize = 2880
+    cardSize = 80
+
+    #FITS BITPIX -> big-endian numpy type
+    bitpixTypes = {8: '>u1', 16: '>i2', 32: '>i4', 64: '>i8', -32: '>f4', -64: '>f8'}
+
+    def __init__(self):
+        '''
+        Constructor
+        '''
+
+    def readHeader(self, fileName):
+        '''
+        Parse the primary header of a FITS file.
+
+        Returns (header dictionary, byte offset of the data unit)
+        '''
+        header = {}
+        offset = 0
+        with open(fileName, 'rb') as fitsFile:
+            while True:
+                block = fitsFile.read(self.blockSize)
+                if len(block) < self.blockSize:
+                    raise IOError('Truncated FITS header in ' + str(fileName))
+                offset += self.blockSize
+                for ii in range(0, self.blockSize, self.cardSize):
+                    card = block[ii:ii+self.cardSize].decode('ascii', 'replace')
+                    keyword = card[:8].strip()
+                    if keyword == 'END':
+                        return header, offset
+                    if card[8:10] == '= ' and keyword not in header:
+                        header[keyword] = self._parseValue(card[10:])
+
+    def open(self, fileName):
+        '''
+        Memory-map the data unit of a simple FITS file.
+
+        Returns a nativeFITSImage, or None if the file is not a simple
+        single-HDU image (callers should then use astropy).
+        '''
+        try:
+            header, offset = self.readHeader(fileName)
+        except (IOError, OSError, UnicodeError):
+            return None
+        if not self._isSimpleImage(header):
+            return None
+        shape = (header['NAXIS2'], header['NAXIS1'])
+        dataType = np.dtype(self.bitpixTypes[header['BITPIX']])
+        if os.path.getsize(fileName) < offset + shape[0]*shape[1]*dataType.itemsize:
+            return None
+        raw = np.memmap(fileName, dtype = dataType, mode = 'r', offset = offset, shape = shape)
+        return nativeFITSImage(raw, header, self)
+
+    def getdata(self, fileName):
+        '''
+        Return the primary image of a FITS file as a native-endian numpy array,
+        the same as astropy.io.fits.getdata. Falls back to astropy for anything
+        this reader does not handle.
+        '''
+        image = self.open(fileName)
+        if image is None:
+            return fits.getdata(fileName)
+        return image[:, :]
+
+    def scaleData(self, raw, header):
+        '''
+        Apply BZERO/BSCALE to raw (big-endian) FITS data and return a native-endian copy.
+
+        The usual SBIG/CCDOps 16-bit case (BZERO = 32768, BSCALE = 1) becomes uint16
+        (the same as astropy returns), by flipping the sign bit rather than adding.
+        '''
+        bzero = header.get('BZERO', 0)
+        bscale = header.get('BSCALE', 1)
+        if raw.dtype.kind == 'i' and bscale == 1 and bzero == 2**(8*raw.dtype.itemsize - 1):
+            #flipping the sign bit of the signed integer is the same as adding BZERO
+            unsignedType = np.dtype(raw.dtype.newbyteorder('=').str.replace('i', 'u'))
+            signBit = np.array(bzero, dtype = unsignedType)
+            #one pass: byte swap, sign flip and copy happen together in the ufunc
+            return np.bitwise_xor(raw.view(raw.dtype.str.replace('i', 'u')), signBit, dtype = unsignedType)
+        if bscale != 1 or bzero != 0:
+            floatType = np.float64 if raw.dtype.itemsize > 2 else np.float32
+            return raw.astype(floatType)*floatType(bscale) + floatType(bzero)
+        return raw.astype(raw.dtype.newbyteorder('='))
+
+    def parityCheck(self, filelist):
+        '''
+        Check that getdata returns exactly what astropy.io.fits.getdata returns
+        (values and dtype) for every file in filelist.
+
+        Returns a list of the files that do not match (empty if all match).
+        '''
+        mismatches = []
+        for fileName in filelist:
+            nativeData = self.getdata(fileName)
+            astropyData = fits.getdata(fileName)
+            #astropy leaves float images big-endian, so compare types ignoring byte order
+            if (nativeData.dtype.newbyteorder('=') != astropyData.dtype.newbyteorder('=') or
+                not np.array_equal(nativeData, astropyData)):
+                mismatches.append(fileName)
+        return mismatches
+
+    def benchmark(self, numberOfFrames = 30, frameShape = (2048, 3072)):
+        '''
+        Write a synthetic directory of SBIG style 16-bit FITS images, check parity
+        with astropy, then time astropy.io.fits.getdata against getdata.
+
+        Returns (astropy seconds, native seconds).
+        '''
+        with tempfile.TemporaryDirectory() as tempDir:
+            rng = np.random.RandomState(0)
+            filelist = []
+            for ii in range(numberOfFrames):
+                fileName = os.path.join(tempDir, str(ii*10) + '.fit')
+                fits.PrimaryHDU(rng.randint(0, 65535, size = frameShape).astype(np.uint16)).writeto(fileName)
+                filelist.append(fileName)
+
+            if self.parityCheck(filelist):
+                raise Exception('nativeFITSReader does not match astropy.io.fits.getdata.')
+
+            startTime = time.perf_counter()
+            for fileName in filelist:
+                fits.getdata(fileName)
+            astropyTime = time.perf_counter() - startTime
+
+            startTime = time.perf_counter()
+            for fileName in filelist:
+                self.getdata(fileName)
+            nativeTime = time.perf_counter() - startTime
+
+        print('Read ' + str(numberOfFrames) + ' frames: astropy ' + format(astropyTime, '.3f') + ' s, native ' + format(nativeTime, '.3f') + ' s')
+        return astropyTime, nativeTime
+
+    def _isSimpleImage(self, header):
+        '''
+        True if the primary HDU is an uncompressed 2D image this reader can map directly.
+        '''
+        return (header.get('SIMPLE') is True and header.get('NAXIS') == 2 and
+                header.get('BITPIX') in self.bitpixTypes and
+                not header.get('GROUPS', False) and 'BLANK' not in header and
+                header.get('PCOUNT', 0) == 0 and header.get('GCOUNT', 1) == 1 and
+                isinstance(header.get('NAXIS1'), int) and isinstance(header.get('NAXIS2'), int))
+
+    def _parseValue(self, valueString):
+        '''
+        Convert the value field of a header card to a python value.
+        '''
+        valueString = valueString.strip()
+        if valueString.startswith("'"):
+            #string value, '' is an escaped quote
+            value = []
+            ii = 1
+            while ii < len(valueString):
+                if valueString[ii] == "'":
+                    if valueString[ii+1:ii+2] == "'":
+                        value.append("'")
+                        ii += 2
+                        continue
+                    break
+                value.append(valueString[ii])
+                ii += 1
+            return ''.join(value).rstrip()
+        valueString = valueString.split('/')[0].strip()
+        if valueString == 'T':
+            return True
+        if valueString == 'F':
+            return False
+        try:
+            return int(valueString)
+        except ValueError:
+            pass
+        try:
+            return float(valueString.replace('D', 'E'))
+        except ValueError:
+            return valueString
+
+class nativeFITSImage(object):
+    '''
+    Memory-mapped FITS image. raw is the big-endian data unit exactly as stored
+    on disk; indexing returns a scaled, native-endian copy of only the
+    requested pixels.
+    '''
+
+    def __init__(self, raw, header, reader):
+        '''
+        Constructor
+        '''
+        self.raw = raw
+        self.header = header
+        self._reader = reader
+
+    @property
+    def shape(self):
+        return self.raw.shape
+
+    def __getitem__(self, key):
+        return self._reader.scaleData(self.raw[key], self.header)
+
+    def __array__(self, dtype = None, copy = None):
+        data = self[:, :]
+        if dtype is not None:
+            data = data.astype(dtype)
+        return data
@@ -0,0 +1,125 @@
+'''
+@title onlineFocusFitter
+@author: agent
+Updated on Oct 18, 2026
+Created on Oct 18, 2026
+
+onlineFocusFitter
+This module fits the focus curve while the sweep is being taken. Each new frame
+(named by its distance, see focusCurve.fileNameToInt) adds one focus metric
+value, and the V-curve (focusCurve.xyPolyFit split and focusCurve.linearIntercept
+left/right lines) is refitted with the best focus and its 1 sigma error. The
+sweep can stop once the best focus is bracketed (at least minimumPointsPerSide
+points on each side of the curve's turning point) and its error is below
+interceptTolerance, rather than after every planned exposure.
+
+The fitter can be given to fitsDirectoryWatcher as its frameCallback, so the
+curve is updated as CCDOps writes each file.
+
+Modules:
+addFrame
+    Add the metric value of a frame named by its distance, and refit.
+addPoint
+    Add a (distance, metric value) point, and refit.
+frameCallback
+    fitsDirectoryWatcher frameCallback: add the frame's precomputed metric.
+fit
+    Refit the focus curve to every point so far.
+'''
+
+# Import #######################################################################################
+import threading
+import numpy as np
+from focusCurve import focusCurve
+################################################################################################
+
+class onlineFocusFitter(object):
+
+    #The sweep can stop when the best focus error is below this (um)
+    interceptTolerance = 10.0
+
+    #Points needed on each side of the turning point for the minimum to be bracketed
+    minimumPointsPerSide = 3
+
+    def __init__(self, metric = 'std', interceptTolerance = None, onConverged = None):
+        '''
+        Constructor
+
+        metric - fitsDirectoryWatcher result name used by frameCallback ('std' or a
+                 focusMetrics metric name)
+        interceptTolerance - best focus error needed to stop (um), default is the class value
+        onConverged - optional function called as onConverged(fitter) the first time
+                      the fit converges
+        '''
+        self.metric = metric
+        if interceptTolerance is not None:
+            self.interceptTolerance = interceptTolerance
+        self.onConverged = onConverged
+        self.points = {}
+        self.bestFocus = np.nan
+        self.bestFocusError = np.inf
+        self.splitPoint = np.nan
+        self.bracketed = False
+        self.converged = False
+        self._lock = threading.Lock()
+
+    def addFrame(self, fileName, metricValue):
+        '''
+        Add the focus metric value of a frame whose file name is its distance
+        (example: 350.fit for the image taken at 350um), and refit.
+
+        Returns True when the sweep can stop (see fit).
+        '''
+        return self.addPoint(focusCurve().fileNameToInt([fileName])[0], metricValue)
+
+    def addPoint(self, distance, metricValue):
+        '''
+        Add (or replace) the focus metric value at a distance (um), and refit.
+
+        Returns True when the sweep can stop (see fit).
+        '''
+        with self._lock:
+            self.points[distance] = float(metricValue)
+            converged = self.fit()
+        if converged and self.onConverged is not None:
+            self.onConverged(self)
+        return self.converged
+
+    def frameCallback(self, fileName, result):
+        '''
+        fitsDirectoryWatcher frameCallback: add result[metric] for the frame.
+        '''
+        self.addFrame(fileName, result[self.metric])
+
+    def fit(self):
+        '''
+        Refit the focus curve to every point so far: quadratic fit (xyPolyFit) to
+        split the points, then the left/right linear intercept (linearIntercept).
+        Sets bestFocus, bestFocusError, splitPoint, bracketed and converged.
+
+        Returns True if the fit has just converged (bracketed, bestFocus inside the
+        sweep and bestFocusError <= interceptTolerance, after the previous fit was not).
+        '''
+        fC = focusCurve()
+        wasConverged = self.converged
+        self.converged = False
+        sortedX, sortedY = fC.zipAndSort(list(self.points), list(self.points.values()))
+        if len(sortedX) < 2*self.minimumPointsPerSide:
+            return False
+
+        ###########################################################################
+        ###Split at the quadratic's turning point, then intercept the linear fits
+        ###########################################################################
+        _, _, _, self.splitPoint = fC.xyPolyFit(sortedX, sortedY, 2)
+        numberLeft = int(np.searchsorted(sortedX, self.splitPoint, side = 'right'))
+        self.bracketed = min(numberLeft, len(sortedX) - numberLeft) >= self.minimumPointsPerSide
+        if not self.bracketed:
+            return False
+        self.bestFocus, _, self.bestFocusError, _, _ = fC.linearIntercept(sortedX, sortedY, self.splitPoint)
+
+        ###########################################################################
+        ###Converged once the best focus is inside the sweep and known well enough
+        ###########################################################################
+        self.converged = bool(sortedX[0] <= self.bestFocus <= sortedX[-1] and
+                              self.bestFocusError <= self.interceptTolerance)
+        return self.converged and not wasConverged
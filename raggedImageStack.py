@@ -0,0 +1,115 @@
+'''
+@title raggedImageStack
+@author: agent
+Updated on Oct 18, 2026
+Created on Oct 18, 2026
+
+raggedImageStack
+This module holds a stack of CCDOps planet mode subframes that do not all have
+the same dimensions. numpy.array() of such a list silently becomes a slow object
+array; here the frames are instead packed end to end in one contiguous buffer,
+each with its shape, sub frame origin (XORGSUBF/YORGSUBF) and binning. Frames are
+returned as 2D views into the buffer, per-frame statistics are computed without
+copying the buffer, and frame coordinates can be mapped to full frame pixels
+without padding every frame to the full sensor size.
+
+Modules:
+__getitem__
+    Return a frame as a 2D view (no copy).
+frameStatistics
+    Per-frame pixel count, mean, standard deviation, minimum and maximum for every frame.
+toFullFrame
+    Map (x, y) frame coordinates to full frame pixel coordinates.
+'''
+
+# Import #######################################################################################
+import numpy as np
+from focusCurve import focusCurve
+################################################################################################
+
+class raggedImageStack(object):
+
+    def __init__(self, frames, headers):
+        '''
+        Constructor
+
+        frames - list of 2D numpy arrays (any shapes)
+        headers - list of header dictionaries (one per frame) with XORGSUBF, YORGSUBF,
+                  XBINNING and YBINNING (see fitsHeaderIndex)
+        '''
+        self.frameShapes = np.array([np.shape(frame) for frame in frames], dtype = np.int64).reshape(-1, 2)
+        self.sizes = self.frameShapes[:, 0]*self.frameShapes[:, 1]
+        self.offsets = np.concatenate(([0], np.cumsum(self.sizes)[:-1])).astype(np.int64)
+
+        #pack every frame end to end in one buffer
+        dataType = np.result_type(*[np.asarray(frame).dtype for frame in frames]) if len(frames) else np.float64
+        self.data = np.empty(int(self.sizes.sum()), dtype = dataType)
+        for ii, frame in enumerate(frames):
+            self.data[self.offsets[ii]:self.offsets[ii] + self.sizes[ii]] = np.asarray(frame).ravel()
+
+        #sub frame origins, in the same pixel units readFitsHeader returns
+        self.binning = np.array([[self._headerValue(header, 'XBINNING', 1), self._headerValue(header, 'YBINNING', 1)]
+                                 for header in headers], dtype = np.float64).reshape(-1, 2)
+        self.origins = np.array([[self._headerValue(header, 'XORGSUBF', 0), self._headerValue(header, 'YORGSUBF', 0)]
+                                 for header in headers], dtype = np.float64).reshape(-1, 2)/self.binning
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def __getitem__(self, index):
+        '''
+        Return frame index as a 2D view into the packed buffer.
+        '''
+        index = int(index)
+        if index < 0:
+            index += len(self.sizes)
+        start = self.offsets[index]
+        return self.data[start:start + self.sizes[index]].reshape(self.frameShapes[index])
+
+    def __iter__(self):
+        for ii in range(len(self.sizes)):
+            yield self[ii]
+
+    @property
+    def shape(self):
+        '''
+        (number of frames,). Use frameShape for the dimensions of a frame.
+        '''
+        return (len(self.sizes),)
+
+    def frameShape(self, index):
+        return tuple(self.frameShapes[index])
+
+    def frameStatistics(self):
+        '''
+        Return (count, mean, std, minimum, maximum), each an array with one value per
+        frame. The mean and std of each frame come from focusCurve.frameStatistics
+        (blocks of rows, so no copy of the packed buffer is made); the minimum and
+        maximum are segmented numpy reductions over the packed buffer.
+        '''
+        if len(self.sizes) == 0:
+            empty = np.zeros(0)
+            return empty, empty, empty, empty, empty
+        fC = focusCurve()
+        statistics = np.array([fC.frameStatistics(frame) for frame in self], dtype = np.float64).reshape(-1, 3)
+        counts, means, stds = statistics[:, 0], statistics[:, 1], statistics[:, 2]
+        minimums = np.minimum.reduceat(self.data, self.offsets)
+        maximums = np.maximum.reduceat(self.data, self.offsets)
+        return counts, means, stds, minimums, maximums
+
+    def toFullFrame(self, index, x, y):
+        '''
+        Map frame coordinates to full frame pixel coordinates.
+
+        index - frame index (or array of frame indexes, one per point)
+        x, y - column and row in the frame (scalars or arrays)
+
+        Returns (xFull, yFull) = (x + xOffset, y + yOffset), with the same offsets
+        readFitsHeader applies (XORGSUBF/XBINNING, YORGSUBF/YBINNING).
+        '''
+        index = np.asarray(index)
+        return np.asarray(x) + self.origins[index, 0], np.asarray(y) + self.origins[index, 1]
+
+    def _headerValue(self, header, keyword, default):
+        value = header.get(keyword) if header is not None else None
+        return default if value is None else value
@@ -15,7 +15,7 @@ from fileAndArrayHandling import fileAndArrayHandling
 from focusCurve import focusCurve
 import numpy as np
 from centroidFIF import centroidFIF
-from alternateCentroidMethods import gmsCentroid
+from centroidMethods import centroidMethods
 from CCDOpsPlanetMode import CCDOpsPlanetMode
 import math
 ################################################################################################
@@ -407,10 +407,13 @@ class tipTiltZCCD(object):
         xOffsetB, yOffsetB, _ = pM.readFitsHeader(imageB, filelistB, consoleLog, logFile)
         xOffsetC, yOffsetC, _ = pM.readFitsHeader(imageC, filelistC, consoleLog, logFile)
         
-        xcenB, ycenB, _, _ = gmsCentroid(imageB, maxLocB[1], maxLocB[0], 
-                                                         int(round(subArrayBoxSizeB/2)), int(round(subArrayBoxSizeB/2)), axis='both', verbose=False)
-        xcenC, ycenC, _, _ = gmsCentroid(imageC, maxLocC[1], maxLocC[0], 
-                                                         int(round(subArrayBoxSizeC/2)), int(round(subArrayBoxSizeC/2)), axis='both', verbose=False)
+        cM = centroidMethods()
+        centroidB = cM.centroid(imageB, [maxLocB], int(round(subArrayBoxSizeB/2)), workflow = 'tipTilt')
+        centroidC = cM.centroid(imageC, [maxLocC], int(round(subArrayBoxSizeC/2)), workflow = 'tipTilt')
+        cM.checkCentroids(centroidB, [maxLocB], 'point B', consoleLog, logFile)
+        cM.checkCentroids(centroidC, [maxLocC], 'point C', consoleLog, logFile)
+        xcenB, ycenB = centroidB['x'][0], centroidB['y'][0]
+        xcenC, ycenC = centroidC['x'][0], centroidC['y'][0]
         
         angleRz = -1*math.degrees(np.arctan(((ycenC + yOffsetC)- (ycenB + yOffsetB))/((xcenC + xOffsetC) - (xcenB + xOffsetB))))
 
@@ -452,13 +455,17 @@ class tipTiltZCCD(object):
         xOffsetB, yOffsetB, pixelSizeB = pM.readFitsHeader(imageArray4DB, filelistB, consoleLog, logFile)
         xOffsetC, yOffsetC, pixelSizeC = pM.readFitsHeader(imageArray4DC, filelistC, consoleLog, logFile)
 
-        #GMS Bisector       
-        Ax, Ay, _, _ = gmsCentroid(imageArray4DA[aa], maxLocA[1], maxLocA[0], 
-                                                         int(round(subArrayBoxSizeA/2)), int(round(subArrayBoxSizeA/2)), axis='both', verbose=False)
-        Bx, By, _, _ = gmsCentroid(imageArray4DB[bb], maxLocB[1], maxLocB[0], 
-                                                         int(round(subArrayBoxSizeB/2)), int(round(subArrayBoxSizeB/2)), axis='both', verbose=False)
-        Cx, Cy, _, _ = gmsCentroid(imageArray4DC[cc], maxLocC[1], maxLocC[0], 
-                                                         int(round(subArrayBoxSizeC/2)), int(round(subArrayBoxSizeC/2)), axis='both', verbose=False)
+        #Centroid (method from centroidMethods.workflowMethods)
+        cM = centroidMethods()
+        centroidA = cM.centroid(imageArray4DA[aa], [maxLocA], int(round(subArrayBoxSizeA/2)), workflow = 'tipTilt')
+        centroidB = cM.centroid(imageArray4DB[bb], [maxLocB], int(round(subArrayBoxSizeB/2)), workflow = 'tipTilt')
+        centroidC = cM.centroid(imageArray4DC[cc], [maxLocC], int(round(subArrayBoxSizeC/2)), workflow = 'tipTilt')
+        cM.checkCentroids(centroidA, [maxLocA], 'point A', consoleLog, logFile)
+        cM.checkCentroids(centroidB, [maxLocB], 'point B', consoleLog, logFile)
+        cM.checkCentroids(centroidC, [maxLocC], 'point C', consoleLog, logFile)
+        Ax, Ay = centroidA['x'][0], centroidA['y'][0]
+        Bx, By = centroidB['x'][0], centroidB['y'][0]
+        Cx, Cy = centroidC['x'][0], centroidC['y'][0]
         
         ###########################################################################
         ###Calculate Delta Distance (measured size of sides)